@@ -7,14 +7,24 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from gcp_secrets.secrets import get_secret
-from scraper import scrape_player_matches
+from scraper import scrape_player_matches, scrape_player_matches_pool, scrape_player_matches_api
+from utr_common.api_fetch import fetch_mode_from_env, api_concurrency_from_env
+from utr_common.browser import SESSION_FILE
+from utr_common.page_parse import short_name
+from utr_common.dataset import PartitionedDataset
+from utr_common.dedupe import store_new_matches, MATCH_KEY_COLUMNS
+from utr_common.freshness import Watermarks, incremental_from_env, match_watermarks, MATCH_WATERMARKS_FILE
+from utr_common.history import AsOfUtrIndex
+from utr_common.scrape_pool import workers_from_env, page_interval_from_env
+from utr_common.profiles import download_profile_state, upload_profile_state, sync_with_dataset, PROFILE_STATE_FILE
+from utr_common.storage import open_bucket, read_csv, LocalStore
+from utr_common.sinks import file_sink
+from utr_common.tables import read_table
 import pandas as pd
-from google.cloud import storage
-import csv
-import io
+import shutil
+import tempfile
 import logging
 import traceback
-from google.oauth2 import service_account
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
@@ -27,9 +37,9 @@ logger = logging.getLogger(__name__)
 MATCHES_BUCKET_NAME = os.getenv("GCS_MATCHES_BUCKET_NAME", "matches-scraper-bucket")
 UTR_BUCKET_NAME = os.getenv("GCS_UTR_BUCKET_NAME", "utr_scraper_bucket")
 
-# GCS File Paths
-UTR_HISTORY_FILE = "utr_history.csv"
-MATCHES_OUTPUT_FILE = "atp_utr_tennis_matches.csv"
+# GCS File Paths (utr_history is <name>.parquet with a <name>.csv copy, matches are partitions under <name>/)
+UTR_HISTORY_TABLE = "utr_history"
+MATCHES_TABLE = "atp_utr_tennis_matches"
 PROFILE_ID_FILE = "profile_id.csv"
 
 # Get credentials from Secret Manager
@@ -41,64 +51,26 @@ except Exception as e:
     sys.exit(1)
 
 
-def download_csv_from_gcs(bucket, file_path):
-    """Downloads a CSV from GCS and returns a pandas DataFrame."""
-    try:
-        blob = bucket.blob(file_path)
-        data = blob.download_as_string()
-        df = pd.read_csv(io.BytesIO(data))
-        logger.info(f"Successfully downloaded and read {file_path}")
-        return df
-    except Exception as e:
-        logger.error(f"Error downloading or reading CSV from GCS: {str(e)}")
-        logger.error(traceback.format_exc())
-        raise
-
-def upload_df_to_gcs(df, bucket, file_path):
-    """Uploads a pandas DataFrame to GCS as a CSV."""
-    try:
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False, encoding='utf-8')
-        blob = bucket.blob(file_path)
-        blob.upload_from_string(csv_buffer.getvalue(), content_type='text/csv')
-        logger.info(f"Successfully uploaded {file_path} to GCS")
-        return True
-    except Exception as e:
-        logger.error(f"Error uploading DataFrame to GCS: {str(e)}")
-        logger.error(traceback.format_exc())
-        return False
-
 def get_player_history(utr_history):
-    history = {}
-    for i in range(len(utr_history)):
-        if utr_history['first_name'][i]+' '+utr_history['last_name'][i] not in history.keys():
-            history[utr_history['first_name'][i]+' '+utr_history['last_name'][i]] = [[utr_history['utr'][i], utr_history['date'][i]]]
-        else:
-            history[utr_history['first_name'][i]+' '+utr_history['last_name'][i]].append([utr_history['utr'][i], utr_history['date'][i]])
-
-    return history
+    """As-of UTR index (player, match date -> UTR) used to enrich scraped matches."""
+    return AsOfUtrIndex.from_frame(utr_history)
 
 try:
-    # # Initialize GCS client using default credentials for GCP or explicit file if provided
-    logger.info("Initializing GCS client...")
-    
-    # client = storage.Client.from_service_account_json("credentials.json")
-    
-    # if client:
-    #     # Use explicit credentials from file (for local development)
-    #     logger.info(f"Using credentials from file: 'credentials.json'")
+    # Bucket stores share one GCS client (default credentials on the GCP VM).
+    # Set UTR_STORAGE=local:<dir> to run against local files instead
+    logger.info("Initializing storage...")
+    matches_store = open_bucket(MATCHES_BUCKET_NAME)
+    utr_store = open_bucket(UTR_BUCKET_NAME)
     
-    # Use default credentials (for GCP VM)
-    logger.info("Using default GCP credentials")
-    client = storage.Client()
+    # The first run moves the single matches file into the first partition
+    matches_dataset = PartitionedDataset(matches_store, MATCHES_TABLE)
+    matches_dataset.migrate()
     
-    matches_bucket = client.bucket(MATCHES_BUCKET_NAME)
-    utr_bucket = client.bucket(UTR_BUCKET_NAME)
-    
-    # Download required files from GCS (equivalent to original pd.read_csv calls)
-    profile_ids = download_csv_from_gcs(utr_bucket, PROFILE_ID_FILE)
-    utr_history = download_csv_from_gcs(utr_bucket, UTR_HISTORY_FILE)
-    prev_matches = download_csv_from_gcs(matches_bucket, MATCHES_OUTPUT_FILE)
+    # Download required files from GCS (Parquet tables, CSV if there is no Parquet copy yet)
+    # Only the key columns of the previous matches are needed to skip duplicates
+    profile_ids = read_csv(utr_store, PROFILE_ID_FILE)
+    utr_history = read_table(utr_store, UTR_HISTORY_TABLE)
+    prev_matches = matches_dataset.read(columns=MATCH_KEY_COLUMNS)
     
     # print row count of three read in dfs 
     logger.info(f"Profile IDs: {len(profile_ids)}")
@@ -108,36 +80,43 @@ try:
     # Ensure all profile ids are in utr_history (must check first and last name existence)
     profile_ids = profile_ids[profile_ids['f_name'].isin(utr_history['first_name']) & profile_ids['l_name'].isin(utr_history['last_name'])]
     
-    # Ensure all names in prev_matches (cols p1 and p2) are in utr_history (cols f_name and l_name). 
-    # p1 and p2 are strings with full names, f name and l name are separated by a space    
-    # Create full name column once
+    # Only matches where both players are in utr_history are stored.
+    # p1 and p2 are 'Last F.' short names, so the full names of utr_history are converted the same way
     utr_history['full_name'] = utr_history['first_name'].str.strip() + ' ' + utr_history['last_name'].str.strip()
-
-    # Filter prev_matches by whether p1 and p2 are in full_name list
-    prev_matches = prev_matches[
-        prev_matches['p1'].isin(utr_history['full_name']) &
-        prev_matches['p2'].isin(utr_history['full_name'])
-    ]
-
-    # print length of prev_matches
-    logger.info(f"Prev Matches post filtering: {len(prev_matches)}")
+    full_names = utr_history['full_name'].unique()
+    known_players = pd.Series(full_names).map(short_name).unique()
     
-    # Process UTR history exactly as in original
+    # Index UTR history by player and date for the as-of lookups
     utr_history = get_player_history(utr_history)
 
-    # Use StringIO to capture new matches data in memory (equivalent to original file writing)
-    new_matches_buffer = io.StringIO()
-    writer = csv.writer(new_matches_buffer)
-    
-    # Write the header row first
-    writer.writerow(['tournament','date','series','court','surface','round','best_of','p1','p1_utr','p2','p2_utr','winner','p1_games','p2_games','score','p_win'])
-
-    # Run scraping exactly as in original
-    scrape_player_matches(profile_ids, utr_history, prev_matches, email, password, offset=0, stop=-1, writer=writer)
+    # Scraped matches stream into a typed Parquet file on local disk, one batch of rows in memory at a time
+    scratch_dir = tempfile.mkdtemp(prefix="new_matches-")
+    writer = file_sink(LocalStore(scratch_dir), "new_matches", MATCHES_TABLE)
+
+    # SCRAPER_INCREMENTAL=1: stop reading each profile at its stored latest match date, recently active players first
+    incremental = incremental_from_env()
+    watermarks = Watermarks.load(matches_store, MATCH_WATERMARKS_FILE)
+    scrape_ids = watermarks.prioritize(profile_ids) if incremental else profile_ids.reset_index(drop=True)
+    scrape_marks = watermarks if incremental else None
+
+    # Run scraping exactly as in original, over SCRAPER_WORKERS browser sessions when set,
+    # or as JSON requests with the signed-in session's cookies when SCRAPER_FETCH_MODE=api.
+    # Login cookies are kept in the matches bucket, so sessions only sign in again once they expire
+    workers = workers_from_env()
+    cookies = (MATCHES_BUCKET_NAME, SESSION_FILE)
+    if fetch_mode_from_env() == "api":
+        scrape_player_matches_api(scrape_ids, utr_history, email, password, writer,
+                                  concurrency=api_concurrency_from_env(), page_interval=page_interval_from_env(), cookies=cookies)
+    elif workers > 1:
+        scrape_player_matches_pool(scrape_ids, utr_history, email, password, workers, writer,
+                                   page_interval=page_interval_from_env(), watermarks=scrape_marks, cookies=cookies)
+    else:
+        scrape_player_matches(scrape_ids, utr_history, prev_matches, email, password, offset=0, stop=-1,
+                              writer=writer, page_interval=page_interval_from_env(), watermarks=scrape_marks, cookies=cookies)
 
-    # Read the newly scraped matches and process exactly as in original
-    new_matches_buffer.seek(0)
-    matches = pd.read_csv(new_matches_buffer)
+    # Read the newly scraped matches back as a typed frame and process exactly as in original
+    matches = writer.frame()
+    shutil.rmtree(scratch_dir, ignore_errors=True)
     
     # Log DataFrame info for debugging
     logger.info(f"DataFrame columns: {matches.columns.tolist()}")
@@ -160,30 +139,32 @@ try:
         logger.info(f"Prev Matches Row Count: {len(prev_matches)}")
         logger.info(f"Matches Row Count: {len(matches)}")
                 
-        # gcs write matches and prev_matches to csv
-        upload_df_to_gcs(matches, matches_bucket, "matches.csv")
-        upload_df_to_gcs(prev_matches, matches_bucket, "prev_matches.csv")
-        
-        ##### Make sure prev_matches rows are not already in matches
-        
-        # Convert prev_matches to list of its rows
-        prev_match_rows = prev_matches.values.tolist()
-        initial_prev_match_row_count = len(prev_match_rows)
-
-        # initialize append matches as empty dataframe with same columns as matches
-        append_matches = pd.DataFrame(columns=matches.columns)
-
-        for index, row in matches.iterrows():
-            row_as_list = row.values.tolist() # convert current row to list
-
-            if row_as_list not in prev_match_rows:
-                # logger.info(f"Appending Match: {row_as_list}")
-                prev_matches = pd.concat([prev_matches, pd.DataFrame([row])], ignore_index=True)
-                
-        # Upload to GCS (equivalent to original to_csv)
-        upload_df_to_gcs(prev_matches, matches_bucket, MATCHES_OUTPUT_FILE)
+        # Keep matches between players in utr_history (the filter the stored matches had), skip the
+        # rows already stored (anti-join on hashed keys) and write the rest as one partition of this run
+        stored, unknown, duplicates, partition = store_new_matches(matches_dataset, prev_matches, matches, known_players)
+        if partition is not None:
+            logger.info(f"Successfully uploaded {MATCHES_TABLE}/{partition['file']} to GCS")
         
-        logger.info(f"Matches added: {len(prev_matches)-initial_prev_match_row_count}")
+        logger.info(f"Matches added: {len(stored)}, duplicates skipped: {duplicates}, unknown players skipped: {unknown}")
+
+        # Only rows written to the dataset move the watermarks, so the next incremental run stops at
+        # stored dates; filtered rows (or a failed append, which raises above) are scraped again
+        if partition is not None:
+            marks, skipped = match_watermarks(stored, profile_ids, full_names)
+            for p_id, match_date in marks.items():
+                watermarks.update(p_id, match_date=match_date)
+            watermarks.save(matches_store, MATCH_WATERMARKS_FILE)
+            logger.info(f"Match watermarks updated for {len(marks)} profiles ({skipped} skipped, short name shared with another player)")
+
+        # Fold the appended rows into the saved player profiles (only partitions it has not seen are read)
+        try:
+            profile_state = download_profile_state(matches_store, PROFILE_STATE_FILE)
+            absorbed = sync_with_dataset(profile_state, matches_dataset)
+            upload_profile_state(profile_state, matches_store, PROFILE_STATE_FILE)
+            logger.info(f"Profile state updated with {absorbed} rows ({len(profile_state)} players)")
+        except Exception as e:
+            logger.error(f"Error updating profile state: {str(e)}")
+            logger.error(traceback.format_exc())
     else:
         logger.warning("No new matches found in the scraping process")
 
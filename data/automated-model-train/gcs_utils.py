@@ -1,16 +1,13 @@
-import pandas as pd
-import io
+from utr_common.storage import read_csv
 
-def download_csv_from_gcs(log_traceback, bucket, file_path):
-    """Downloads a CSV from GCS and returns a pandas DataFrame."""
+def download_csv_from_gcs(log_traceback, store, file_path):
+    """Downloads a CSV from a bucket store and returns a pandas DataFrame."""
     
     logger = log_traceback[0]
     traceback = log_traceback[1]
     
     try:
-        blob = bucket.blob(file_path)
-        data = blob.download_as_string()
-        df = pd.read_csv(io.BytesIO(data))
+        df = read_csv(store, file_path)
         logger.info(f"Successfully downloaded and read {file_path}")
         return df
     except Exception as e:
@@ -18,15 +15,14 @@ def download_csv_from_gcs(log_traceback, bucket, file_path):
         logger.error(traceback.format_exc())
         raise
     
-def upload_model_to_gcs(log_traceback, model_binary, bucket, file_path):
-    """Uploads a binary model object to GCS."""
+def upload_model_to_gcs(log_traceback, model_binary, store, file_path):
+    """Uploads a binary model object to a bucket store."""
     
     logger = log_traceback[0]
     traceback = log_traceback[1]
     
     try:
-        blob = bucket.blob(file_path)
-        blob.upload_from_string(model_binary, content_type='application/octet-stream')
+        store.write_bytes(file_path, model_binary, content_type='application/octet-stream')
         logger.info(f"Successfully uploaded binary model to {file_path} in GCS")
         return True
     except Exception as e:
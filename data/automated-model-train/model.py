@@ -1,3 +1,11 @@
+import sys
+import os
+
+# Add project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
 import numpy as np
 import pandas as pd
 import torch
@@ -7,16 +15,19 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from torch.utils.data import DataLoader, TensorDataset
 import joblib
-from network import get_player_profiles, get_player_history, preprocess_match_data
 from sklearn.metrics import accuracy_score
 import matplotlib.pyplot as plt
-from network import TennisPredictor
-from google.cloud import storage
-from gcs_utils import upload_model_to_gcs, download_csv_from_gcs
+from network import TennisPredictor, get_player_profiles
+from gcs_utils import upload_model_to_gcs
+from utr_common.dataset import PartitionedDataset
+from utr_common.features import match_feature_matrix
+from utr_common.history import latest_utr
+from utr_common.profiles import ProfileStore
+from utr_common.storage import open_bucket
+from utr_common.tables import read_table
 import logging
 import traceback
 import io
-import os
 
 class EarlyStopping:
     """
@@ -47,52 +58,37 @@ MODEL_BUCKET_NAME = "utr-model-training-bucket"
 UTR_BUCKET_NAME = "utr_scraper_bucket"
 MATCHES_BUCKET_NAME = "matches-scraper-bucket"
 MODEL_FILE_NAME = "model.sav"  # file to upload to GCS after training
-UTR_HISTORY_FILE = "utr_history.csv"
-MATCHES_FILE = "atp_utr_tennis_matches.csv"
-
+UTR_HISTORY_TABLE = "utr_history"
+MATCHES_TABLE = "atp_utr_tennis_matches"
 
-# Initialize GCS client with credentials file
-# credentials_path = "credentials.json"
-# client = storage.Client.from_service_account_json(credentials_path)
 
-# Use default credentials (for GCP VM)
+# Bucket stores share one GCS client (default credentials on the GCP VM).
+# Set UTR_STORAGE=local:<dir> to train from local files instead
 logger.info("Using default GCP credentials")
-client = storage.Client()
-
-model_bucket = client.bucket(MODEL_BUCKET_NAME)
-utr_bucket = client.bucket(UTR_BUCKET_NAME)
-matches_bucket = client.bucket(MATCHES_BUCKET_NAME)
-
-upload_blob = model_bucket.blob(MODEL_FILE_NAME)
-utr_blob = utr_bucket.blob(UTR_HISTORY_FILE)
-matches_blob = matches_bucket.blob(MATCHES_FILE)
+model_store = open_bucket(MODEL_BUCKET_NAME)
+utr_store = open_bucket(UTR_BUCKET_NAME)
+matches_store = open_bucket(MATCHES_BUCKET_NAME)
 
 logger_traceback = [logger, traceback]
 
-utr_history = download_csv_from_gcs(logger_traceback, utr_bucket, UTR_HISTORY_FILE)
-matches = download_csv_from_gcs(logger_traceback, matches_bucket, MATCHES_FILE)
+# Parquet tables (CSV if there is no Parquet copy yet), only the columns training uses.
+# Match partitions are read in parallel
+utr_history = read_table(utr_store, UTR_HISTORY_TABLE, columns=["first_name", "last_name", "utr", "date"])
+matches = PartitionedDataset(matches_store, MATCHES_TABLE).read(columns=["date", "p1", "p1_utr", "p2", "p2_utr", "winner", "p_win"])
 
 logger.info("Getting player history...")
-history = get_player_history(utr_history)
+history = latest_utr(utr_history)
 
 logger.info("Getting player profiles...")
-player_profiles = get_player_profiles(matches, history) 
+# Training keeps the profile definitions the model has always been fit on (network.get_player_profiles);
+# the app's accumulated profiles average wvl/wvh_utr and recent10 differently
+profile_store = ProfileStore.from_profiles(get_player_profiles(matches, history))
 
 # Log start of training
 logger.info("Starting training...")
 
-X = []
-for i in range(len(matches)):
-    X.append(preprocess_match_data(matches.iloc[i], player_profiles))
-vector = np.array(X)
-
-# Extract target variable (e.g., match result, assuming `p_win` indicates win/loss)
-y = matches['p_win'].values  # 1 for win, 0 for loss (or whatever your target variable is)
-
-X = []
-for i in range(len(matches)):
-    X.append(preprocess_match_data(matches.iloc[i], player_profiles)) # log_prop?
-vector = np.array(X)
+# Feature matrix built column-wise for all matches at once (same feature columns the UI predicts with)
+X = match_feature_matrix(matches, profile_store)
 
 # Extract target variable (e.g., match result, assuming `p_win` indicates win/loss)
 y = matches['p_win'].values  # 1 for win, 0 for loss (or whatever your target variable is)
@@ -168,7 +164,7 @@ joblib.dump(model, buffer)
 # Get the binary content
 model_binary = buffer.getvalue()
 
-upload_model_to_gcs(logger_traceback, model_binary, model_bucket, MODEL_FILE_NAME)    
+upload_model_to_gcs(logger_traceback, model_binary, model_store, MODEL_FILE_NAME)    
 
 
 # # === Evaluate model ===#
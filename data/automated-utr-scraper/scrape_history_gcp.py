@@ -8,8 +8,15 @@ if project_root not in sys.path:
 
 from gcp_secrets.secrets import get_secret
 from scraper import *
+from utr_common.storage import open_bucket, read_csv
+from utr_common.log_sink import LogSink
+from utr_common.scrape_pool import workers_from_env, page_interval_from_env
+from utr_common.api_fetch import fetch_mode_from_env, api_concurrency_from_env, HISTORY_COLUMNS
+from utr_common.checkpoint import ProgressLedger, resume_from_env
+from utr_common.browser import SESSION_FILE
+from utr_common.freshness import Watermarks, incremental_from_env, latest_per_player, merge_history, HISTORY_WATERMARKS_FILE
+from utr_common.tables import read_table, to_typed, write_table
 import pandas as pd
-from google.cloud import storage
 import csv
 import io
 from selenium import webdriver
@@ -18,8 +25,6 @@ import time
 from google.cloud import compute_v1
 from datetime import datetime
 import traceback
-from collections import deque
-import threading
 import requests
 import socket
 
@@ -29,7 +34,9 @@ logger = logging.getLogger(__name__)
 
 # Set bucket name from environment variable
 BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "utr_scraper_bucket")
-UPLOAD_FILE_NAME = "utr_history.csv"  # file to upload to GCS after scraping
+UTR_HISTORY_TABLE = "utr_history"  # table uploaded to GCS after scraping (.csv and .parquet)
+LOG_PREFIX = "logs/runs"  # one directory of log segments per run
+CHECKPOINT_PREFIX = "checkpoints/utr_history"  # progress ledger and row chunks of the run in progress
 LOCAL_PROFILE_FILE = "profile_id.csv"  # profile file bundled with the Docker image
 
 # Get credentials from Secret Manager
@@ -41,153 +48,25 @@ except Exception as e:
     sys.exit(1)
 
 
-# Initialize GCS client ### Use credentials file for local testing
-client = storage.Client()
-
-bucket = client.bucket(BUCKET_NAME)
-upload_blob = bucket.blob(UPLOAD_FILE_NAME)
+# Bucket store (shared GCS client; set UTR_STORAGE=local:<dir> for local testing)
+store = open_bucket(BUCKET_NAME)
 
 # Create and initialize StringIO object to write CSV data
 csv_buffer = io.StringIO()
 writer = csv.writer(csv_buffer) # take file like object (csv_buffer) and prepares it for writing
 writer.writerow(['f_name', 'l_name', 'date', 'utr']) # write headers to csv
 
-# Log buffer/limit (prevents errors in logging and missing statements)
-log_buffer = deque(maxlen=100)  # Store up to 100 log messages
-log_buffer_lock = threading.Lock()
-last_log_upload_time = time.time()
-LOG_UPLOAD_INTERVAL = 5  # Upload logs every 5 seconds
-
-def upload_to_gcs(source_file_name, destination_blob_name):
-    """Uploads a file to the bucket."""
-    try:
-        # First verify the file exists and has content
-        if not os.path.exists(source_file_name):
-            logger.error(f"File {source_file_name} does not exist")
-            save_logs_to_gcs(f"Error: File {source_file_name} does not exist")
-            return False
-            
-        file_size = os.path.getsize(source_file_name)
-        if file_size == 0:
-            logger.error(f"File {source_file_name} is empty (0 bytes)")
-            save_logs_to_gcs(f"Error: File {source_file_name} is empty (0 bytes)")
-            return False
-            
-        logger.info(f"Starting upload of {source_file_name} ({file_size} bytes) to {BUCKET_NAME}")
-        
-        # Log file content for debugging
-        try:
-            with open(source_file_name, 'r') as f:
-                content_sample = f.read(1000)  # Read first 1000 chars
-                lines = content_sample.count('\n') + 1
-                logger.info(f"File content sample (first {lines} lines): {content_sample[:200]}...")
-                save_logs_to_gcs(f"File content sample: {lines} lines, starts with: {content_sample[:100]}...")
-        except Exception as e:
-            logger.warning(f"Could not read file content: {str(e)}")
-            
-        blob = bucket.blob(destination_blob_name)
-        blob.upload_from_filename(source_file_name)
-        logger.info(f"Successfully uploaded {source_file_name} to {BUCKET_NAME}/{destination_blob_name}")
-        return True
-    except Exception as e:
-        logger.error(f"Error uploading file: {str(e)}")
-        logger.error(traceback.format_exc())
-        save_logs_to_gcs(f"Error uploading file: {str(e)}")
-        return False
+# Run log: messages are queued and a background thread ships them as new segment objects
+# under logs/runs/<run id>/ (read a run back with `python -m utr_common.log_sink merge --bucket ...`)
+log_sink = LogSink(store, LOG_PREFIX)
 
 def save_logs_to_gcs(log_message):
-    """Buffers log messages and periodically writes them to GCS to avoid rate limits."""
-    global last_log_upload_time # tracker for last time logs were uploaded
-    
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    formatted_message = f"[{timestamp}] {log_message}"
-    
-    with log_buffer_lock:
-        # Add the message to our buffer
-        log_buffer.append(formatted_message)
-        
-        # Only upload logs if enough time has passed since the last upload
-        current_time = time.time()
-        if current_time - last_log_upload_time >= LOG_UPLOAD_INTERVAL:
-            try:
-                # Get the log file or create a new one
-                log_blob = bucket.blob('logs/scraper_log.txt')
-                
-                try:
-                    # Try to download existing log content
-                    current_log = log_blob.download_as_text()
-                except Exception:
-                    current_log = ""
-                
-                # Add all buffered logs
-                buffered_logs = "\n".join(log_buffer)
-                updated_log = f"{current_log}\n{buffered_logs}" if current_log else buffered_logs
-                
-                # Upload updated log
-                log_blob.upload_from_string(updated_log)
-                logger.info(f"Uploaded {len(log_buffer)} log messages to GCS")
-                
-                # Clear the buffer after successful upload
-                log_buffer.clear()
-                
-                # Update the last upload time
-                last_log_upload_time = current_time
-            except Exception as e:
-                logger.error(f"Error saving logs to GCS: {str(e)}")
-                # Don't clear buffer on error - we'll try again later
+    """Queues a log message for the bucket; never blocks on the upload."""
+    log_sink.write(log_message)
 
 def flush_logs():
-    """Force all buffered logs to be written to GCS."""
-    global last_log_upload_time
-    
-    with log_buffer_lock:
-        if not log_buffer:
-            return  # Nothing to flush
-            
-        try:
-            # Get the log file or create a new one
-            log_blob = bucket.blob('logs/scraper_log.txt')
-            
-            try:
-                # Try to download existing log content
-                current_log = log_blob.download_as_text()
-            except Exception:
-                current_log = ""
-            
-            # Add all buffered logs
-            buffered_logs = "\n".join(log_buffer)
-            updated_log = f"{current_log}\n{buffered_logs}" if current_log else buffered_logs
-            
-            # Upload updated log
-            log_blob.upload_from_string(updated_log)
-            logger.info(f"Flushed {len(log_buffer)} log messages to GCS")
-            
-            # Clear the buffer after successful upload
-            log_buffer.clear()
-            
-            # Update the last upload time
-            last_log_upload_time = time.time()
-        except Exception as e:
-            logger.error(f"Error flushing logs to GCS: {str(e)}")
-
-def download_csv_from_gcs(log_traceback, bucket, file_path):
-    """Downloads a CSV from GCS and returns a pandas DataFrame."""
-    
-    logger = log_traceback[0]
-    traceback = log_traceback[1]
-    
-    try:
-        blob = bucket.blob(file_path)
-        data = blob.download_as_string()
-        df = pd.read_csv(io.BytesIO(data))
-        logger.info(f"Successfully downloaded and read {file_path}")
-        return df
-    except Exception as e:
-        logger.error(f"Error downloading or reading CSV from GCS: {str(e)}")
-        logger.error(traceback.format_exc())
-        raise
-
-
+    """Force all queued logs to be written to GCS."""
+    log_sink.flush()
 
 ########## Run the scraper ##########
 start_time = time.time()
@@ -211,12 +90,10 @@ if not email or not password:
     save_logs_to_gcs("UTR credentials not found in environment variables")
     exit(1)
 
-logger_traceback = [logger, traceback]
-
 # Read the local CSV file bundled with the Docker image
 try:        
     # Read the CSV file
-    profile_ids = download_csv_from_gcs(logger_traceback, bucket, LOCAL_PROFILE_FILE)
+    profile_ids = read_csv(store, LOCAL_PROFILE_FILE)
     
     # Log read in file
     logger.info(f"Successfully read {len(profile_ids)} profiles from local file")
@@ -274,16 +151,58 @@ except Exception as e:
     save_logs_to_gcs(f"Error reading profile CSV file: {str(e)}")
     exit(1)
 
-# Create output file
-output_file = 'utr_history.csv'
-
 # Scrape UTR history for all profiles and get the resulting dataframe
 logger.info(f"Processing {len(profile_ids)} profiles")
 save_logs_to_gcs(f"Processing {len(profile_ids)} profiles")
 
 try:
-    # Set stop=-1 to process all profiles (ie. no limit)
-    results_df = scrape_utr_history(profile_ids, email, password, offset=0, stop=-1, writer=None)
+    # Progress is checkpointed to the bucket as the run goes; a run after a crash skips the
+    # profiles already done (SCRAPER_RESUME=0 discards the checkpoint and starts over)
+    ledger = ProgressLedger(store, CHECKPOINT_PREFIX, HISTORY_COLUMNS)
+    all_profiles = profile_ids
+
+    # SCRAPER_INCREMENTAL=1: read each profile only down to its stored watermark, recently active players first
+    incremental = incremental_from_env()
+    watermarks = Watermarks.load(store, HISTORY_WATERMARKS_FILE)
+    if incremental:
+        profile_ids = watermarks.prioritize(profile_ids)
+        logger.info(f"Incremental run: {len(watermarks)} profiles have watermarks")
+        save_logs_to_gcs(f"Incremental run: {len(watermarks)} profiles have watermarks")
+    if resume_from_env():
+        done = ledger.completed()
+        if done:
+            profile_ids = profile_ids[~profile_ids['p_id'].isin(done)]
+            logger.info(f"Resuming: {len(done)} profiles already done, {len(profile_ids)} left")
+            save_logs_to_gcs(f"Resuming: {len(done)} profiles already done, {len(profile_ids)} left")
+    else:
+        ledger.clear()
+
+    # Set stop=-1 to process all profiles (ie. no limit); SCRAPER_WORKERS > 1 shards them over browser sessions,
+    # SCRAPER_FETCH_MODE=api requests the rating histories as JSON instead of rendering pages.
+    # Login cookies are kept in the bucket, so sessions only sign in again once they expire
+    workers = workers_from_env()
+    cookies = (BUCKET_NAME, SESSION_FILE)
+    if fetch_mode_from_env() == "api":
+        scrape_utr_history_api(profile_ids.reset_index(drop=True), email, password, concurrency=api_concurrency_from_env(),
+                               page_interval=page_interval_from_env(), ledger=ledger, cookies=cookies)
+    elif workers > 1:
+        scrape_utr_history_pool(profile_ids.reset_index(drop=True), email, password, workers, page_interval=page_interval_from_env(),
+                                checkpoint=(BUCKET_NAME, CHECKPOINT_PREFIX), watermarks=watermarks if incremental else None,
+                                cookies=cookies)
+    else:
+        scrape_utr_history(profile_ids.reset_index(drop=True), email, password, offset=0, stop=-1, writer=None,
+                           page_interval=page_interval_from_env(), ledger=ledger, watermarks=watermarks if incremental else None,
+                           cookies=cookies)
+
+    # Rows of this run and of the interrupted runs it resumed (the ledger keeps them as text)
+    results_df = to_typed(ledger.read_rows(), UTR_HISTORY_TABLE)
+
+    # Incremental runs only scraped the new rows: add them to the stored history
+    if incremental and store.exists(f"{UTR_HISTORY_TABLE}.csv"):
+        new_rows = len(results_df)
+        results_df = merge_history(read_table(store, UTR_HISTORY_TABLE), results_df)
+        logger.info(f"Incremental run: {new_rows} rows scraped, history now has {len(results_df)} rows")
+        save_logs_to_gcs(f"Incremental run: {new_rows} rows scraped, history now has {len(results_df)} rows")
     
     if results_df is None or len(results_df) == 0:
         logger.error("Scraping returned empty results")
@@ -304,30 +223,28 @@ try:
     logger.info(f"Scraping completed. Found {len(results_df)} UTR records")
     save_logs_to_gcs(f"Scraping completed. Found {len(results_df)} UTR records")
     
-    # Save dataframe to local CSV file
-    results_df.to_csv(output_file, index=False)
-    logger.info(f"Saved {len(results_df)} records to local file {output_file}")
-    
-    # Verify the file was created and has content
-    if os.path.exists(output_file):
-        file_size = os.path.getsize(output_file)
-        logger.info(f"Output file size: {file_size} bytes")
-        
-        if file_size == 0:
-            logger.error("Output file is empty (0 bytes)")
-            save_logs_to_gcs("Error: Output file is empty (0 bytes)")
-    else:
-        logger.error(f"Output file {output_file} was not created")
-        save_logs_to_gcs(f"Error: Output file {output_file} was not created")
-    
-    # Upload the CSV file to GCS bucket
-    upload_success = upload_to_gcs(output_file, UPLOAD_FILE_NAME)
-    if upload_success:
-        logger.info(f"Successfully uploaded {output_file} to {BUCKET_NAME}/{UPLOAD_FILE_NAME}")
-        save_logs_to_gcs(f"Successfully uploaded {len(results_df)} records to {BUCKET_NAME}/{UPLOAD_FILE_NAME}")
-    else:
-        logger.error("Failed to upload results to GCS")
-        save_logs_to_gcs("Failed to upload results to GCS")
+    # Stream utr_history.csv and the typed Parquet copy straight to the bucket in chunks
+    # (no local file and no second in-memory copy of the table)
+    try:
+        written = write_table(store, UTR_HISTORY_TABLE, results_df)
+        for name in written:
+            logger.info(f"Successfully uploaded {name} ({store.size(name)} bytes) to {BUCKET_NAME}")
+        save_logs_to_gcs(f"Successfully uploaded {len(results_df)} records to {BUCKET_NAME}/{', '.join(written)}")
+
+        # The table is complete, so the next run starts from the first profile again
+        ledger.clear()
+
+        # Newest stored date and rating of every profile, for the next incremental run
+        latest = latest_per_player(results_df, ("first_name", "last_name"), value_col="utr")
+        for p_id, f_name, l_name in all_profiles[['p_id', 'f_name', 'l_name']].itertuples(index=False):
+            if (str(f_name), str(l_name)) in latest:
+                history_date, utr = latest[(str(f_name), str(l_name))]
+                watermarks.update(p_id, history_date=history_date, utr=float(utr))
+        watermarks.save(store, HISTORY_WATERMARKS_FILE)
+    except Exception as e:
+        logger.error(f"Failed to upload results to GCS: {str(e)}")
+        logger.error(traceback.format_exc())
+        save_logs_to_gcs(f"Failed to upload results to GCS: {str(e)}")
     
 except Exception as e:
     logger.error(f"Error in scraping or upload process: {str(e)}")
@@ -350,3 +267,6 @@ if shutdown_success == "going to happen":
 else:
     logger.error("Failed to shut down VM")
     save_logs_to_gcs("Failed to shut down VM") 
+
+# Make sure the last messages reach the bucket before the VM goes away
+flush_logs()
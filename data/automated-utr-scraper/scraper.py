@@ -1,7 +1,6 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
 import time
 import csv
 from datetime import date
@@ -14,48 +13,35 @@ from webdriver_manager.chrome import ChromeDriverManager
 import numpy as np
 from datetime import datetime
 import random
-from dateutil.relativedelta import relativedelta
 import pandas as pd
 import os
 import logging
 import traceback
+from utr_common.scrape_pool import RateLimiter, run_sharded
+from utr_common.api_fetch import session_from_driver, fetch_player_matches, fetch_utr_history, API_CONCURRENCY, HISTORY_COLUMNS
+from utr_common.checkpoint import ProgressLedger, DONE, FAILED
+from utr_common.storage import open_bucket
+from utr_common.browser import BrowserSession, SavedCookies, get_chrome_options
+from utr_common.sinks import MemorySink
+from utr_common.page_parse import parse_history, parse_matches, best_of, short_name
+from utr_common.waits import (wait_for, try_wait_for, present, document_ready, signed_in, height_changed, more_than,
+                              log_wait_summary, STEP_TIMEOUTS, LOGIN_FORM, TOURNAMENT_ITEMS, SHOW_ALL, HISTORY_ROWS,
+                              HISTORY_DATES)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
-# Function to get configured Chrome options for headless mode in Docker
-def get_chrome_options():
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    
-    # Add user agent to avoid detection
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    
-    # Disable images to save bandwidth and speed up scraping
-    prefs = {"profile.managed_default_content_settings.images": 2}
-    chrome_options.add_experimental_option("prefs", prefs)
-    
-    logger.info("Chrome options configured for headless mode")
-    return chrome_options
-
-
 ### Sign In UTR ###
 def sign_in(driver, log_in_url, email, password):
     logger.info(f"Attempting to sign in to UTR with email: {email[:3]}***")
     try:
         driver.get(log_in_url)
-        time.sleep(2)  # Increased from 1 to ensure page loads
 
-        # Verify page loaded correctly
-        page_source = driver.page_source
-        if "emailInput" not in page_source:
-            logger.error("Login page elements not found. Page source: " + page_source[:200] + "...")
+        # Wait for the login form rather than a fixed sleep
+        if try_wait_for(driver, "login_form", present(LOGIN_FORM)) is None:
+            logger.error("Login page elements not found. Page source: " + driver.page_source[:200] + "...")
             raise Exception("Login page not loaded correctly")
         
         email_box = driver.find_element(By.ID, 'emailInput')
@@ -70,12 +56,12 @@ def sign_in(driver, log_in_url, email, password):
         password_box.send_keys(password)
         logger.info("Password entered successfully")
         
-        time.sleep(0.5)
+        wait_for(driver, "login_button", EC.element_to_be_clickable(login_button))
         login_button.click()
         logger.info("Login button clicked")
         
-        # Wait longer for login to complete - especially important in headless mode
-        time.sleep(4)  # Increased from 2.5
+        # Wait until the login form is gone or the post-login markers appear
+        try_wait_for(driver, "sign_in", signed_in)
 
         # Verify login success by checking for elements that would only appear post-login
         if "Sign Out" in driver.page_source or "My Account" in driver.page_source:
@@ -88,6 +74,16 @@ def sign_in(driver, log_in_url, email, password):
         logger.error(traceback.format_exc())
         raise
 
+### Browser Session ###
+def open_browser(email, password, cookies=None):
+    """
+    BrowserSession that signs in with sign_in. With cookies=(bucket name, object name)
+    the login cookies are saved there and reused by later drivers, workers and runs.
+    """
+    saved = SavedCookies(open_bucket(cookies[0]), cookies[1]) if cookies else None
+    return BrowserSession(sign_in, email, password, cookies=saved)
+###
+
 ### URL Modification ###
 def edit_url(city, state, lat, long):
     d = str(date.today())
@@ -98,31 +94,16 @@ def edit_url(city, state, lat, long):
     return url
 ###
 
-### Formats Match Scores ###
-def collect_scores(all_scores):
-    score = ''
-    p1_games = 0
-    p2_games = 0
-    for i in range(int(len(all_scores) / 2)):
-        if len(all_scores[i].text) == 1:
-            score = score + all_scores[i].text + '-' + all_scores[i+(int(len(all_scores) / 2))].text + ' '
-            p1_games += int(all_scores[i].text)
-            p2_games += int(all_scores[i+(int(len(all_scores) / 2))].text)
-        else:
-            score = score + all_scores[i].text[0] + '-' + all_scores[i+(int(len(all_scores) / 2))].text[0] + ' '
-            p1_games += int(all_scores[i].text[0])
-            p2_games += int(all_scores[i+int(len(all_scores) / 2)].text[0])
-    score = score[:-1]
-    return score, p1_games, p2_games
-###
-
 ### Loads The Page ###
-def load_page(driver, url):
-    logger.info(f"Loading page: {url}")
+def load_page(browser, url, ready=None, step="page_load"):
+    """
+    Open url in the session's driver and wait until the document is loaded and,
+    if given, the `ready` element is present (adaptive timeout per step). A page
+    without the element (e.g. a profile with no results) still counts as loaded.
+    A crashed driver is restarted and an expired session signed in again first.
+    """
     try:
-        driver.get(url)
-        time.sleep(2)  # Increased from 1 for more reliable loading
-        logger.info(f"Page loaded successfully: {url[:60]}...")
+        browser.load(url, ready=ready, step=step)
         return True
     except Exception as e:
         logger.error(f"Error loading page {url}: {str(e)}")
@@ -132,7 +113,6 @@ def load_page(driver, url):
 
 ### Scrolls The Page ###
 def scroll_page(driver):
-    logger.info("Starting page scroll")
     try:
         previous_height = driver.execute_script("return document.body.scrollHeight")
         scroll_count = 0
@@ -140,11 +120,9 @@ def scroll_page(driver):
         
         while scroll_count < max_scrolls:
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(0.5)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            
-            if new_height == previous_height:
-                logger.info(f"Scrolling complete after {scroll_count+1} scrolls")
+            # Stop as soon as the page stops growing instead of sleeping after every scroll
+            new_height = try_wait_for(driver, "scroll", height_changed(previous_height))
+            if new_height is None:
                 break
                 
             previous_height = new_height
@@ -158,28 +136,22 @@ def scroll_page(driver):
 ###
 
 ### Get UTR Rating ###
-def scrape_player_matches(profile_ids, utr_history, matches, email, password, offset=0, stop=1, writer=None):
-    # Initialize the Selenium WebDriver with headless options for Docker
+def scrape_player_matches(profile_ids, utr_history, matches, email, password, offset=0, stop=1, writer=None, page_interval=0.0, watermarks=None,
+                          cookies=None):
+    # Start a signed-in Chrome session (saved cookies when still valid) for player matches scraping
     logger.info("Initializing Chrome driver for player matches scraping")
-    chrome_options = get_chrome_options()
-    
+    browser = open_browser(email, password, cookies)
     try:
-        driver = webdriver.Chrome(options=chrome_options)
+        browser.start()
         logger.info("Chrome driver initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize Chrome driver: {str(e)}")
+        logger.error(f"Failed to start a signed-in Chrome driver, aborting scraping: {str(e)}")
         logger.error(traceback.format_exc())
+        browser.quit(save=False)
         return None
-        
-    url = 'https://app.utrsports.net/'
-    today = date.today()
 
-    try:
-        sign_in(driver, url, email, password)
-    except Exception as e:
-        logger.error(f"Sign in failed, aborting scraping: {str(e)}")
-        driver.quit()
-        return None
+    today = date.today()
+    limiter = RateLimiter(page_interval)  # per-session spacing between profile pages
 
     y = 1
     for i in range(len(profile_ids)):
@@ -196,219 +168,72 @@ def scrape_player_matches(profile_ids, utr_history, matches, email, password, of
             logger.error(f"Error accessing profile ID at index {i+offset}: {str(e)}")
             continue
 
-        if not load_page(driver, search_url):
+        limiter.wait()
+        if not load_page(browser, search_url, ready=TOURNAMENT_ITEMS, step="matches_page"):
             logger.warning(f"Skipping profile {profile_ids['p_id'][i+offset]} due to page load failure")
             continue
+        driver = browser.driver  # replaced when the session restarted or recycled it
             
         scroll_page(driver)
 
-        # Now that the page is rendered, parse the page with BeautifulSoup
-        logger.info("Parsing page content with BeautifulSoup")
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        tournaments = soup.find_all("div", class_="eventItem__eventItem__2Xpsd")
-        logger.info(f"Found {len(tournaments)} tournaments for profile {profile_ids['p_id'][i+offset]}")
-       
-        '''
-        For each tournament, grab the data specified from each match in the tournament.
-        Rework some data based on winners vs losers and errors that need exceptions.
-        '''
-        for tourney in tournaments:
+        # Now that the page is rendered, parse it with lxml into match records (newest first)
+        records = parse_matches(driver.page_source, today)
+        logger.info(f"Found {len(records)} matches for profile {profile_ids['p_id'][i+offset]}")
+
+        for record in records:
+            # Incremental mode: the rest of the profile is already stored
+            if watermarks is not None and watermarks.older(profile_ids['p_id'][i+offset], "match_date", record.date):
+                break
+
+            # UTR in force on the match date (binary search in the as-of index)
             try:
-                tourney_name = tourney.find("span", class_="").text
-            except:
-                logger.warning("Could not find tournament name, skipping")
+                w_utr = utr_history.lookup(record.winner, record.date)
+                l_utr = utr_history.lookup(record.loser, record.date)
+            except Exception as e:
+                logger.error(f"Error getting UTR data: {str(e)}")
                 continue
-          
-            if ',' in tourney_name:
-                for j in range(len(tourney_name)):
-                    if tourney_name[j] == ',':
-                        tourney_name = tourney_name[:j]
-                        break
-            surface = "Hard"
-            if tourney_name == "Wimbledon":
-                slam = "Grand Slam"
-                surface = "Grass"
-            elif tourney_name == "French Open":
-                slam = "Grand Slam"
-                surface = "Clay"
-            elif tourney_name == "US Open" or tourney_name == "Austrlian Open":
-                slam = "Grand Slam"
-                surface = "Hard"
+
+            data_row = [record.tournament, record.date, record.series, 'Outdoor', record.surface, record.round, best_of(record.sets)]
+            winner_name1, loser_name1 = short_name(record.winner), short_name(record.loser)
+
+            ri = random.randint(0,1)
+            if ri == 0:
+                data_row += [winner_name1, w_utr, loser_name1, l_utr, winner_name1, record.winner_games, record.loser_games, record.score, 0]
             else:
-                temp = ''
-                _ = False
-                slam = ''
-                for ch in tourney_name:
-                    if temp == 'ATP' and not _:
-                        _ = True
-                    elif ch == ' ' and _:
-                        slam = temp
-                        temp = ''
-                        _ = False
-                    temp = temp + ch
-                if temp != '':
-                    tourney_name = temp
-
-                if tourney_name[0] == ' ':
-                    tourney_name = tourney_name[1:]
-
-            matches = tourney.find_all("div", class_="d-none d-md-block")
-            logger.info(f"Found {len(matches)} matches in tournament: {tourney_name}")
-
-            for match in matches:
-                try:
-                    tround = match.find("div", class_="scorecard__header__2iDdF").text
-                    r = ''
-                    for j in range(len(tround)):
-                        if tround[-j-1] != '|':
-                            r = tround[-1*j-1] + r
-                        else:
-                            r = r[1:]
-                            break
-                    
-                    start = -1
-                    end = -1
-                    for j in range(len(tround)):
-                        if tround[j] == '|' and start == -1:
-                            start = j
-                        elif tround[j] == '|' and start != -1:
-                            end = j
-                    if end == -1:
-                        match_date_str = tround[(start+2):j]
-                    else:
-                        match_date_str = tround[(start+2):(end-1)]
-
-                    match_date = datetime.strptime(match_date_str, "%b %d").replace(year=datetime.now().year).date()
-                    if match_date > today:
-                        match_date = match_date - relativedelta(year=datetime.now().year-1)
-
-                    data_row = [tourney_name, match_date, slam, 'Outdoor', surface, r]
-                    is_tie = False
-
-                    try:
-                        winner_name = match.find("a", class_="flex-column player-name winner").text # throws error when TIE (COLLEGE MATCHES)
-                        loser_name = match.find("a", class_="flex-column player-name").text
-                    except:
-                        tie = match.find_all("a", class_="flex-column player-name")
-                        if len(tie) >= 2:
-                            winner_name, loser_name = tie[0].text, tie[1].text
-                            is_tie = True
-                        else:
-                            logger.warning("Could not find player names in match, skipping")
-                            continue
-
-                    try:
-                        temp = False
-                        for utrdata in utr_history[winner_name]:
-                            if datetime.strptime(utrdata[1], '%Y-%m-%d').date() <= match_date:
-                                w_utr = utrdata[0]
-                                temp = True
-                                break
-                        if not temp:
-                            w_utr = utr_history[winner_name][len(utr_history[winner_name])-1][0]
-                        temp = False
-                        for utrdata in utr_history[loser_name]:
-                            if datetime.strptime(utrdata[1], '%Y-%m-%d').date() <= match_date:
-                                l_utr = utrdata[0]
-                                temp = True
-                                break
-                        if not temp:
-                            l_utr = utr_history[loser_name][len(utr_history[loser_name])-1][0]
-                    except Exception as e:
-                        logger.error(f"Error getting UTR data: {str(e)}")
-                        continue
-
-                    all_scores = match.find_all("div", "score-item")
-                    score, p1_games, p2_games = collect_scores(all_scores)
-                    score = score if score else 'W'
-                    if score == 'W':
-                        continue
-
-                    sets = 0
-                    num_sets = 0
-                    for j in range(len(score)):
-                        if j % 4 == 0:
-                            num_sets += 1
-                            try:
-                                if int(score[j]) > int(score[j+2]):
-                                    sets += 1
-                                else:
-                                    sets -= 1
-                            except:
-                                continue
-                    if num_sets < 3:
-                        best_of = 3
-                    elif num_sets == 3 and abs(sets) == 1:
-                        best_of = 3
-                    else:
-                        best_of = 5
-
-                    data_row += [best_of]
-
-                    winner_name1 = ''
-                    a = False
-                    for ch in winner_name:
-                        if ch == ' ':
-                            a = True
-                        elif a:
-                            winner_name1 = winner_name1 + ch
-                    winner_name1 = winner_name1 + ' ' + winner_name[0] + '.'
-
-                    loser_name1 = ''
-                    a = False
-                    for ch in loser_name:
-                        if ch == ' ':
-                            a = True
-                        elif a:
-                            loser_name1 = loser_name1 + ch
-                    loser_name1 = loser_name1 + ' ' + loser_name[0] + '.'
-
-                    ri = random.randint(0,1)
-                    if ri == 0:
-                        data_row += [winner_name1, w_utr, loser_name1, l_utr, winner_name1, p1_games, p2_games, score, 0]
-                    else:
-                        data_row += [loser_name1, l_utr, winner_name1, w_utr, winner_name1, p1_games, p2_games, score, 1]
-
-                    if is_tie:
-                        data_row[-1] = 0.5  # Mark ties properly
-
-                    writer.writerow(data_row)
-                    logger.info(f"Processed match: {winner_name} vs {loser_name}")
-                except Exception as e:
-                    logger.error(f"Error processing match: {str(e)}")
-                    logger.error(traceback.format_exc())
-                    continue
+                data_row += [loser_name1, l_utr, winner_name1, w_utr, winner_name1, record.winner_games, record.loser_games, record.score, 1]
+
+            if record.is_tie:
+                data_row[-1] = 0.5  # Mark ties properly
+
+            writer.writerow(data_row)
+            logger.info(f"Processed match: {record.winner} vs {record.loser}")
 
     # Close the driver
     logger.info("Closing Chrome driver after scraping player matches")
-    driver.quit()
+    log_wait_summary()
+    browser.log_summary()
+    browser.quit()
 ###
 
 ### Get UTR History ###
-def scrape_utr_history(df, email, password, offset=0, stop=1, writer=None):
-    # Initialize the Selenium WebDriver with headless options for Docker
+def scrape_utr_history(df, email, password, offset=0, stop=1, writer=None, page_interval=0.0, ledger=None, watermarks=None,
+                       cookies=None):
+    # Start a signed-in Chrome session (saved cookies when still valid) for UTR history scraping
     logger.info("Initializing Chrome driver for UTR history scraping")
-    chrome_options = get_chrome_options()
-    
+    browser = open_browser(email, password, cookies)
     try:
-        driver = webdriver.Chrome(options=chrome_options)
+        browser.start()
         logger.info("Chrome driver initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize Chrome driver: {str(e)}")
+        logger.error(f"Failed to start a signed-in Chrome driver, aborting scraping: {str(e)}")
         logger.error(traceback.format_exc())
-        return pd.DataFrame(columns=['first_name', 'last_name', 'date', 'utr'])
-    
-    # Create a list to store data rows
-    data_rows = []
-    url = 'https://app.utrsports.net/'
-    
-    try:
-        sign_in(driver, url, email, password)
-    except Exception as e:
-        logger.error(f"Sign in failed, aborting scraping: {str(e)}")
-        driver.quit()
+        browser.quit(save=False)
         return pd.DataFrame(columns=['first_name', 'last_name', 'date', 'utr'])
 
+    # Rows go to writer (a RecordSink) if given, otherwise they are kept in memory and returned as a DataFrame
+    sink = writer if writer is not None else MemorySink("utr_history")
+    limiter = RateLimiter(page_interval)  # per-session spacing between profile pages
+
     # Determine the actual number of profiles to process
     if stop == -1:
         end_idx = len(df)
@@ -436,13 +261,21 @@ def scrape_utr_history(df, email, password, offset=0, stop=1, writer=None):
             logger.error(f"Error preparing URL for profile at index {i}: {str(e)}")
             continue
 
-        if not load_page(driver, search_url):
+        limiter.wait()
+        if not load_page(browser, search_url, ready=SHOW_ALL, step="history_page"):
             # logger.warning(f"Skipping profile {df['f_name'][i]} {df['l_name'][i]} due to page load failure")
+            if ledger:
+                ledger.record(df['p_id'][i], [], FAILED)
             processed_count += 1
             continue
+        driver = browser.driver  # replaced when the session restarted or recycled it
 
-        time.sleep(0.5)  # Increased from 0.25
-        scroll_page(driver)
+        # Incremental mode: when the newest visible rows already reach the stored watermark,
+        # everything new is on screen, so the page is neither scrolled nor expanded with "Show all"
+        expand = watermarks is None or not any(watermarks.reached(df['p_id'][i], "history_date", e.text)
+                                               for e in driver.find_elements(*HISTORY_DATES))
+        if expand:
+            scroll_page(driver)
 
         # Take a screenshot for debugging if needed
         try:
@@ -459,107 +292,178 @@ def scrape_utr_history(df, email, password, offset=0, stop=1, writer=None):
 
         # Look for "Show all" button
         show_all_found = False
-        try:
-            logger.info("Looking for 'Show all' button")
-            time.sleep(1)
-            show_all = driver.find_element(By.LINK_TEXT, 'Show all')
-            show_all.click()
-            logger.info("Clicked 'Show all' button")
-            show_all_found = True
-        except Exception as e:
-            logger.warning(f"First attempt to find 'Show all' button failed: {str(e)}")
-            
+        if expand:
             try:
-                # Try again with a longer wait
-                logger.info("Making second attempt to find 'Show all' button")
-                time.sleep(3)
-                show_all = driver.find_element(By.LINK_TEXT, 'Show all')
+                logger.info("Looking for 'Show all' button")
+                rows_before = len(driver.find_elements(*HISTORY_ROWS))
+                show_all = wait_for(driver, "show_all", EC.element_to_be_clickable(SHOW_ALL))
                 show_all.click()
-                logger.info("Clicked 'Show all' button on second attempt")
+                logger.info("Clicked 'Show all' button")
                 show_all_found = True
-            except Exception as e2:
-                logger.error(f"Could not find 'Show all' button: {str(e2)}")
-                logger.error(f"Debug info - Current URL: {driver.current_url}")
-                logger.error(f"Page title: {driver.title}")
+            except Exception as e:
+                logger.warning(f"First attempt to find 'Show all' button failed: {str(e)}")
+            
+                try:
+                    # Try again with the longest wait
+                    logger.info("Making second attempt to find 'Show all' button")
+                    show_all = wait_for(driver, "show_all", EC.element_to_be_clickable(SHOW_ALL), timeout=STEP_TIMEOUTS.maximum)
+                    show_all.click()
+                    logger.info("Clicked 'Show all' button on second attempt")
+                    show_all_found = True
+                except Exception as e2:
+                    logger.error(f"Could not find 'Show all' button: {str(e2)}")
+                    logger.error(f"Debug info - Current URL: {driver.current_url}")
+                    logger.error(f"Page title: {driver.title}")
                 
-                # Check if we're still logged in
-                if "Sign In" in driver.page_source or "Log In" in driver.page_source:
-                    logger.error("Session appears to have expired, attempting to log in again")
-                    try:
-                        sign_in(driver, url, email, password)
-                        # Try loading the profile again
-                        load_page(driver, search_url)
-                    except:
-                        logger.error("Re-login attempt failed")
+                    # Check if we're still logged in
+                    if "Sign In" in driver.page_source or "Log In" in driver.page_source:
+                        logger.error("Session appears to have expired, attempting to log in again")
+                        try:
+                            browser.authenticate()
+                            # Try loading the profile again
+                            limiter.wait()
+                            load_page(browser, search_url, ready=SHOW_ALL, step="history_page")
+                        except:
+                            logger.error("Re-login attempt failed")
                 
-                processed_count += 1
-                continue
+                    if ledger:
+                        ledger.record(df['p_id'][i], [], FAILED)
+                    processed_count += 1
+                    continue
         
         if show_all_found:
-            time.sleep(1.5)  # Increased wait time after clicking "Show all"
+            # Wait for the full history rows to render after clicking "Show all"
+            try_wait_for(driver, "history_rows", more_than(HISTORY_ROWS, rows_before))
             scroll_page(driver)
 
-        # Now that the page is rendered, parse the page with BeautifulSoup
-        logger.info("Parsing page content with BeautifulSoup")
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        # Now that the page is rendered, parse it with lxml
+        logger.info("Parsing page content with lxml")
+        page_source = driver.page_source
+        entries = parse_history(page_source)
 
         # Debug page content
-        if "UTR History" not in driver.page_source:
+        if "UTR History" not in page_source:
             logger.warning("UTR History section might be missing from the page")
         
-        # Find the UTR history container
-        container = soup.find("div", class_="newStatsTabContent__section__1TQzL p0 bg-transparent")
-        
-        if not container:
+        # None when the UTR history container is missing
+        if entries is None:
             logger.warning(f"UTR history container not found for {df['f_name'][i]} {df['l_name'][i]}")
+            if ledger:
+                ledger.record(df['p_id'][i], [], FAILED)
             processed_count += 1
             continue
             
-        utrs = container.find_all("div", class_="row")
-        logger.info(f"Found {len(utrs)} UTR history entries")
+        logger.info(f"Found {len(entries)} UTR history entries")
         
-        # Count how many records we're actually collecting
-        record_count = 0
+        # Rows of this profile, newest first
+        profile_rows = []
         
-        for j in range(len(utrs)):
-            if j == 0:
-                continue
-                
-            try:
-                utr = utrs[j].find("div", class_="newStatsTabContent__historyItemRating__GQUXw").text
-                utr_date = utrs[j].find("div", class_="newStatsTabContent__historyItemDate__jFJyD").text
-                
-                logger.info(f"Found UTR: {utr} from date: {utr_date}")
-                
-                # Create data row with first_name, last_name (for compatibility with both column naming schemes)
-                data_row = [df['f_name'][i], df['l_name'][i], utr_date, utr]
-                
-                # Add to data rows list
-                data_rows.append(data_row)
-                record_count += 1
-                
-                # If writer is provided, still write to CSV for backward compatibility
-                if writer:
-                    writer.writerow(data_row)
-            except Exception as e:
-                logger.error(f"Error extracting UTR data from row {j}: {str(e)}")
-                continue
-                
+        for utr_date, utr in entries:
+            # Incremental mode: rows are newest first, so the rest is already stored
+            if watermarks is not None and watermarks.older(df['p_id'][i], "history_date", utr_date):
+                break
+            
+            logger.info(f"Found UTR: {utr} from date: {utr_date}")
+            
+            # Create data row with first_name, last_name (for compatibility with both column naming schemes)
+            profile_rows.append([df['f_name'][i], df['l_name'][i], utr_date, utr])
+        
+        # Emit the profile's rows into the sink
+        sink.writerows(profile_rows)
+        record_count = len(profile_rows)
+            
         logger.info(f"Extracted {record_count} UTR records for {df['f_name'][i]} {df['l_name'][i]}")
+        if ledger:
+            ledger.record(df['p_id'][i], profile_rows, DONE)
         processed_count += 1
         if record_count > 0:
             success_count += 1
 
     # Close the driver
     logger.info(f"Closing Chrome driver after scraping UTR history. Processed {processed_count} profiles with {success_count} successful extractions.")
-    driver.quit()
+    if ledger:
+        ledger.flush()
+    log_wait_summary()
+    browser.log_summary()
+    browser.quit()
     
+    # Rows sent to a writer stay there (a file sink holds at most one batch in memory)
+    if writer is not None:
+        writer.flush()
+        return None
+
     # # Create DataFrame from collected data
-    # if not data_rows:
+    # if not sink.rows:
     #     logger.warning("No UTR history data was collected!")
     #     return pd.DataFrame(columns=['first_name', 'last_name', 'date', 'utr'])
         
-    df_result = pd.DataFrame(data_rows, columns=['first_name', 'last_name', 'date', 'utr'])
+    df_result = sink.frame()
     logger.info(f"Created DataFrame with {len(df_result)} total UTR records")
     return df_result
 ###
+
+### Worker Pool ###
+# Sessions in a pool start this many seconds apart so they do not all sign in at once
+SIGN_IN_STAGGER = 2.0
+
+
+def _player_matches_shard(profile_ids, utr_history, email, password, page_interval, watermarks=None, cookies=None):
+    random.seed()  # forked workers would otherwise share the p1/p2 coin flips
+    rows = MemorySink("atp_utr_tennis_matches")  # returned to the parent process as a typed frame
+    scrape_player_matches(profile_ids, utr_history, None, email, password, offset=0, stop=-1, writer=rows, page_interval=page_interval,
+                          watermarks=watermarks, cookies=cookies)
+    return rows.frame()
+
+
+def scrape_player_matches_pool(profile_ids, utr_history, email, password, workers, writer, page_interval=0.0, max_concurrency=None,
+                               watermarks=None, cookies=None):
+    """scrape_player_matches over `workers` browser sessions; rows reach `writer` (a RecordSink) in profile order."""
+    shard_frames = run_sharded(_player_matches_shard, profile_ids, workers, utr_history, email, password, page_interval, watermarks, cookies,
+                               max_concurrency=max_concurrency, start_stagger=SIGN_IN_STAGGER)
+    for frame in shard_frames:
+        writer.write_frame(frame)
+
+
+def _utr_history_shard(df, email, password, page_interval, checkpoint=None, watermarks=None, cookies=None):
+    # Stores do not cross process boundaries: each worker opens its own ledger from (bucket, prefix)
+    ledger = ProgressLedger(open_bucket(checkpoint[0]), checkpoint[1], HISTORY_COLUMNS) if checkpoint else None
+    return scrape_utr_history(df, email, password, offset=0, stop=-1, writer=None, page_interval=page_interval, ledger=ledger,
+                              watermarks=watermarks, cookies=cookies)
+
+
+def scrape_utr_history_pool(df, email, password, workers, page_interval=0.0, max_concurrency=None, checkpoint=None, watermarks=None,
+                            cookies=None):
+    """
+    scrape_utr_history over `workers` browser sessions, merged into one DataFrame in profile order.
+    With checkpoint=(bucket name, prefix) every worker records its progress in a ledger there.
+    """
+    frames = run_sharded(_utr_history_shard, df, workers, email, password, page_interval, checkpoint, watermarks, cookies,
+                         max_concurrency=max_concurrency, start_stagger=SIGN_IN_STAGGER)
+    return pd.concat(frames, ignore_index=True)
+###
+
+
+### API Fetch Mode ###
+def api_session(email, password, concurrency=API_CONCURRENCY, cookies=None):
+    """Sign in once in Chrome and return an HTTP session carrying its cookies (the browser is closed)."""
+    logger.info("Initializing Chrome driver to sign in for API fetch mode")
+    browser = open_browser(email, password, cookies)
+    try:
+        return session_from_driver(browser.start(), concurrency)
+    finally:
+        browser.quit()
+
+
+def scrape_player_matches_api(profile_ids, utr_history, email, password, writer, concurrency=API_CONCURRENCY, page_interval=0.0,
+                              cookies=None):
+    """scrape_player_matches without page rendering: results are requested as JSON."""
+    session = api_session(email, password, concurrency, cookies)
+    fetch_player_matches(session, profile_ids, utr_history, writer, concurrency, limiter=RateLimiter(page_interval))
+
+
+def scrape_utr_history_api(df, email, password, writer=None, concurrency=API_CONCURRENCY, page_interval=0.0, ledger=None,
+                           cookies=None):
+    """scrape_utr_history without page rendering: rating histories are requested as JSON."""
+    session = api_session(email, password, concurrency, cookies)
+    return fetch_utr_history(session, df, writer, concurrency, limiter=RateLimiter(page_interval), ledger=ledger)
+###
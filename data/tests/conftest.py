@@ -0,0 +1,7 @@
+import sys
+import os
+
+# Add the data directory (utr_common) to the Python path
+data_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if data_root not in sys.path:
+    sys.path.insert(0, data_root)
@@ -0,0 +1,30 @@
+"""Scraped UTR history rows from the progress ledger into the typed table."""
+import pandas as pd
+
+from utr_common.api_fetch import HISTORY_COLUMNS
+from utr_common.checkpoint import ProgressLedger
+from utr_common.storage import MemoryStore
+from utr_common.tables import read_table, to_typed, write_table
+
+UTR_HISTORY_TABLE = "utr_history"
+
+
+def test_ledger_rows_write_typed_history():
+    store = MemoryStore()
+    ledger = ProgressLedger(store, "checkpoints/utr_history", HISTORY_COLUMNS)
+    ledger.record(1, [["Jack", "Sock", "2025-01-06", "15"], ["Jack", "Sock", "2024-12-30", "15.48"]])
+    ledger.record(2, [["Adrian", "Mannarino", "2025-01-06", "15.33"]])
+    ledger.flush()
+
+    rows = ledger.read_rows()
+    assert all(pd.api.types.is_string_dtype(rows[col]) for col in HISTORY_COLUMNS)
+
+    # As scrape_history_gcp.py writes the table at the end of a run
+    written = write_table(store, UTR_HISTORY_TABLE, to_typed(rows, UTR_HISTORY_TABLE))
+    assert f"{UTR_HISTORY_TABLE}.parquet" in written
+
+    table = read_table(store, UTR_HISTORY_TABLE)
+    assert table["utr"].dtype == "float64"
+    assert table["utr"].tolist() == [15.0, 15.48, 15.33]
+    assert pd.api.types.is_datetime64_any_dtype(table["date"])
+    assert table["last_name"].astype(str).tolist() == ["Sock", "Sock", "Mannarino"]
@@ -0,0 +1,64 @@
+"""Match watermarks come from stored rows, one per profile."""
+import pandas as pd
+
+from utr_common.dataset import PartitionedDataset
+from utr_common.dedupe import MATCH_KEY_COLUMNS, store_new_matches
+from utr_common.freshness import Watermarks, match_watermarks, merge_history
+from utr_common.storage import MemoryStore
+from test_match_store import MATCHES_TABLE, UTR_HISTORY, known_players, scraped_frame, scraped_row
+
+PROFILE_IDS = pd.DataFrame({
+    "p_id": [101, 102, 103],
+    "f_name": ["Adrian", "Jack", "Carlos"],
+    "l_name": ["Mannarino", "Sock", "Alcaraz Garfia"],
+})
+
+
+def test_filtered_rows_do_not_move_watermarks():
+    dataset = PartitionedDataset(MemoryStore(), MATCHES_TABLE)
+    new = scraped_frame([
+        scraped_row("Jack Sock", "Adrian Mannarino", day="2025-01-07"),
+        # Newer, but against a player without UTR history: never stored
+        scraped_row("Jack Sock", "Unknown Player", day="2025-03-01"),
+    ])
+    stored, _, _, _ = store_new_matches(dataset, new.iloc[:0][MATCH_KEY_COLUMNS], new, known_players(UTR_HISTORY))
+
+    marks, skipped = match_watermarks(stored, PROFILE_IDS)
+    assert marks == {101: "2025-01-07", 102: "2025-01-07"}
+    assert skipped == 0
+
+    watermarks = Watermarks()
+    for p_id, match_date in marks.items():
+        watermarks.update(p_id, match_date=match_date)
+    assert watermarks.older(102, "match_date", "2025-01-06")
+    assert not watermarks.older(102, "match_date", "2025-02-01")
+    assert watermarks.mark(103, "match_date") is None
+
+
+def test_shared_short_name_gets_no_watermark():
+    stored = scraped_frame([scraped_row("Jack Sock", "Adrian Mannarino", day="2025-01-07")])
+    # 'Jill Sock' is also 'Sock J.', so the rows of Jack Sock cannot be told apart
+    marks, skipped = match_watermarks(stored, PROFILE_IDS, full_names=["Jack Sock", "Jill Sock", "Adrian Mannarino"])
+    assert marks == {101: "2025-01-07"}
+    assert skipped == 1
+
+
+def test_merged_history_is_grouped_newest_first():
+    previous = pd.DataFrame({
+        "first_name": ["Adrian", "Adrian", "Jack"],
+        "last_name": ["Mannarino", "Mannarino", "Sock"],
+        "date": ["2025-01-06", "2024-12-30", "2025-01-06"],
+        "utr": [15.33, 15.3, 15.48],
+    })
+    new = pd.DataFrame({
+        "first_name": ["Jack", "Adrian", "Adrian"],
+        "last_name": ["Sock", "Mannarino", "Mannarino"],
+        "date": ["2025-01-13", "2025-01-13", "2025-01-06"],
+        "utr": ["15.5", "15.4", "15.33"],
+    })
+
+    merged = merge_history(previous, new)
+    assert merged["last_name"].astype(str).tolist() == ["Mannarino"] * 3 + ["Sock"] * 2
+    assert merged["date"].dt.strftime("%Y-%m-%d").tolist() == [
+        "2025-01-13", "2025-01-06", "2024-12-30", "2025-01-13", "2025-01-06"]
+    assert merged["utr"].tolist() == [15.4, 15.33, 15.3, 15.5, 15.48]
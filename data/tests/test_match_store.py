@@ -0,0 +1,70 @@
+"""Scraped match rows through the known-player filter and into a partition."""
+import pandas as pd
+
+from utr_common.dataset import PartitionedDataset
+from utr_common.dedupe import MATCH_KEY_COLUMNS, store_new_matches
+from utr_common.page_parse import short_name
+from utr_common.sinks import MemorySink
+from utr_common.storage import MemoryStore
+
+MATCHES_TABLE = "atp_utr_tennis_matches"
+
+UTR_HISTORY = pd.DataFrame({
+    "first_name": ["Adrian", "Jack", "Carlos"],
+    "last_name": ["Mannarino", "Sock", "Alcaraz Garfia"],
+    "utr": [15.33, 15.48, 16.2],
+    "date": ["2025-01-06", "2025-01-06", "2025-01-06"],
+})
+
+
+def known_players(utr_history):
+    """As matches.py builds them: short names of the UTR history players."""
+    full_name = utr_history["first_name"].str.strip() + " " + utr_history["last_name"].str.strip()
+    return full_name.map(short_name).unique()
+
+
+def scraped_row(winner, loser, day="2025-01-07", score="6-3 6-4"):
+    """One row as scrape_player_matches writes it (page names shortened, winner listed first)."""
+    w, l = short_name(winner), short_name(loser)
+    return ["Heineken Open", day, "ATP250", "Outdoor", "Hard", "1st Round", 3, w, 15.3, l, 15.4, w, 12, 7, score, 0]
+
+
+def scraped_frame(rows):
+    sink = MemorySink(MATCHES_TABLE)
+    sink.writerows(rows)
+    return sink.frame()
+
+
+def test_known_players_are_short_names():
+    assert set(known_players(UTR_HISTORY)) == {"Mannarino A.", "Sock J.", "AlcarazGarfia C."}
+
+
+def test_scraped_row_lands_in_partition():
+    dataset = PartitionedDataset(MemoryStore(), MATCHES_TABLE)
+    new = scraped_frame([
+        scraped_row("Jack Sock", "Adrian Mannarino"),
+        scraped_row("Carlos Alcaraz Garfia", "Jack Sock", day="2025-01-08"),
+        scraped_row("Jack Sock", "Unknown Player", day="2025-01-09"),
+    ])
+
+    stored, unknown, duplicates, partition = store_new_matches(dataset, new.iloc[:0][MATCH_KEY_COLUMNS], new, known_players(UTR_HISTORY))
+
+    assert (len(stored), unknown, duplicates) == (2, 1, 0)
+    assert partition is not None and partition["rows"] == 2
+    table = dataset.read()
+    assert list(table["p1"].astype(str)) == ["Sock J.", "AlcarazGarfia C."]
+    assert list(table["p2"].astype(str)) == ["Mannarino A.", "Sock J."]
+
+
+def test_stored_rows_are_not_appended_again():
+    dataset = PartitionedDataset(MemoryStore(), MATCHES_TABLE)
+    first = scraped_frame([scraped_row("Jack Sock", "Adrian Mannarino")])
+    store_new_matches(dataset, first.iloc[:0][MATCH_KEY_COLUMNS], first, known_players(UTR_HISTORY))
+
+    again = scraped_frame([scraped_row("Jack Sock", "Adrian Mannarino"),
+                           scraped_row("Adrian Mannarino", "Jack Sock", day="2025-02-01")])
+    stored, unknown, duplicates, partition = store_new_matches(dataset, dataset.read(columns=MATCH_KEY_COLUMNS), again,
+                                                               known_players(UTR_HISTORY))
+
+    assert (len(stored), unknown, duplicates) == (1, 0, 1)
+    assert dataset.num_rows() == 2 and len(dataset.manifest()["partitions"]) == 2
@@ -0,0 +1,62 @@
+"""Extraction from the saved profile pages in utr_common/fixtures."""
+import os
+from datetime import date
+
+import pytest
+
+from utr_common.page_parse import FIXTURES_DIR, HistoryEntry, parse_history, parse_matches, short_name
+
+TODAY = date(2024, 11, 1)
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        return f.read()
+
+
+def test_parse_history():
+    assert parse_history(fixture("profile_stats.html")) == [
+        HistoryEntry("2024-10-27", "16.04"),
+        HistoryEntry("2024-10-20", "15.97"),
+        HistoryEntry("2024-10-13", "15.97"),
+        HistoryEntry("2024-10-06", "15.88"),
+        HistoryEntry("2024-09-29", "15.90"),
+        HistoryEntry("2024-09-22", "15.81"),
+    ]
+
+
+def test_parse_matches():
+    records = parse_matches(fixture("profile_results.html"), TODAY)
+
+    # The event without a readable name is skipped, the rest keep page order (newest first)
+    assert [(r.tournament, r.round, r.date) for r in records] == [
+        ("Basel", "Final", date(2024, 10, 27)),
+        ("Basel", "Semifinals", date(2024, 10, 26)),
+        ("Wimbledon", "Final", date(2024, 7, 14)),
+        ("Wimbledon", "Semifinals", date(2024, 7, 12)),
+        ("French Open", "Final", date(2024, 6, 9)),
+        ("NCAA Team Championship", "Round 1", date(2024, 5, 18)),
+    ]
+
+    final = records[0]
+    assert (final.series, final.surface) == ("ATP 500", "Hard")
+    assert (final.winner, final.loser) == ("Giovanni Mpetshi Perricard", "Ben Shelton")
+    assert final.sets == ((6, 4), (7, 6))
+    assert (final.score, final.winner_games, final.loser_games) == ("6-4 7-6", 13, 10)
+    assert not final.is_tie
+
+    five_sets = records[4]
+    assert five_sets.score == "6-3 2-6 5-7 6-1 6-2"
+    assert (five_sets.winner_games, five_sets.loser_games) == (25, 19)
+
+    college = records[5]
+    assert college.is_tie and college.series == ""
+    assert college.sets == ((6, 4), (5, 6))
+
+
+@pytest.mark.parametrize("full_name, expected", [
+    ("Ben Shelton", "Shelton B."),
+    ("Giovanni Mpetshi Perricard", "MpetshiPerricard G."),
+])
+def test_short_name(full_name, expected):
+    assert short_name(full_name) == expected
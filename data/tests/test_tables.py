@@ -0,0 +1,60 @@
+"""Typed tables written from untyped (all-text) frames and read back."""
+import io
+
+import pandas as pd
+
+from utr_common.storage import MemoryStore
+from utr_common.tables import TableWriter, read_table, to_typed, write_frame, write_table
+
+MATCH_ROWS = [
+    ["Heineken Open", "2025-01-07", "ATP250", "Outdoor", "Hard", "1st Round", "3", "Sock J.", "15", "Mannarino A.", "15.33", "Sock J.", "12", "7", "6-3 6-4", "0"],
+    ["Basel", "2025-01-08", "ATP 500", "Outdoor", "Hard", "Final", "3", "Fils A.", "15.9", "Sock J.", "15.48", "Sock J.", "13", "10", "6-4 7-6", "1"],
+    ["NCAA Team Championship", "2025-01-09", "", "Outdoor", "Hard", "Round 1", "3", "Quinn E.", "13.1", "Spizzirri E.", "13.4", "Quinn E.", "11", "10", "6-4 5-6", "0.5"],
+]
+MATCH_COLUMNS = ["tournament", "date", "series", "court", "surface", "round", "best_of", "p1", "p1_utr", "p2", "p2_utr",
+                 "winner", "p1_games", "p2_games", "score", "p_win"]
+
+
+def text_frame(rows, columns):
+    """Every column as text, like a CSV read with dtype=str or the rows of a progress ledger."""
+    return pd.DataFrame(rows, columns=columns, dtype=str)
+
+
+def assert_round_trip(written, read, table):
+    expected = to_typed(written, table)
+    pd.testing.assert_frame_equal(read.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+    for col in ("p1_utr", "p2_utr", "utr"):
+        if col in read.columns:
+            assert read[col].dtype == "float64"
+
+
+def test_text_history_round_trip():
+    # Whole-number ratings first: a schema inferred from them would be int64 and truncate 12.3
+    history = text_frame([["Jack", "Sock", "2025-01-06", "15"], ["Jack", "Sock", "2024-12-30", "12.3"]],
+                         ["first_name", "last_name", "date", "utr"])
+    store = MemoryStore()
+    write_table(store, "utr_history", history, keep_csv=False)
+    assert_round_trip(history, read_table(store, "utr_history"), "utr_history")
+
+
+def test_text_matches_in_batches():
+    matches = text_frame(MATCH_ROWS, MATCH_COLUMNS)
+    store = MemoryStore()
+    # An empty first batch (no rows to infer text or float columns from), then one row per batch
+    with TableWriter(store, "matches.parquet", "atp_utr_tennis_matches") as writer:
+        writer.write(matches.iloc[:0])
+        for i in range(len(matches)):
+            writer.write(matches.iloc[i:i + 1])
+
+    read = pd.read_parquet(io.BytesIO(store.read_bytes("matches.parquet")))
+    assert_round_trip(matches.astype({"best_of": "int64", "p1_games": "int64", "p2_games": "int64", "p_win": "float64"}),
+                      read, "atp_utr_tennis_matches")
+    assert list(read["p_win"]) == [0.0, 1.0, 0.5]
+
+
+def test_empty_table_round_trip():
+    store = MemoryStore()
+    write_frame(store, "empty.parquet", text_frame([], MATCH_COLUMNS), "atp_utr_tennis_matches")
+    read = pd.read_parquet(io.BytesIO(store.read_bytes("empty.parquet")))
+    assert list(read.columns) == MATCH_COLUMNS and len(read) == 0
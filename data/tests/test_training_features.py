@@ -0,0 +1,47 @@
+"""Training features from network.get_player_profiles, built column-wise."""
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utr_common.features import match_feature_matrix
+from utr_common.profiles import ProfileStore
+
+pytest.importorskip("torch")
+
+# Loaded by path: the UI has a network.py of its own
+NETWORK_FILE = os.path.join(os.path.dirname(__file__), "..", "automated-model-train", "network.py")
+spec = importlib.util.spec_from_file_location("model_train_network", NETWORK_FILE)
+network = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(network)
+
+
+def training_matches(n_matches, n_players, seed):
+    """Matches frame with the columns model.py reads, including UTR ties and repeated pairs."""
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Player {i}" for i in range(n_players)], dtype=object)
+    a = rng.integers(0, n_players, n_matches)
+    b = (a + rng.integers(1, n_players, n_matches)) % n_players
+    p1_utr = np.round(rng.uniform(11, 16.5, n_matches), 2)
+    p2_utr = np.round(rng.uniform(11, 16.5, n_matches), 2)
+    p2_utr[::7] = p1_utr[::7]
+    p_win = (rng.random(n_matches) < 0.5).astype(int)
+    return pd.DataFrame({
+        "p1": names[a], "p2": names[b],
+        "p1_utr": p1_utr, "p2_utr": p2_utr,
+        "winner": np.where(p_win == 1, names[a], names[b]),
+        "p_win": p_win,
+    })
+
+
+@pytest.mark.parametrize("n_matches, n_players, seed", [(1, 2, 0), (300, 5, 1), (1000, 40, 2)])
+def test_feature_matrix_matches_preprocess_loop(n_matches, n_players, seed):
+    matches = training_matches(n_matches, n_players, seed)
+    history = {name: 14.0 for name in matches["p1"].unique()[::3]}
+    profiles = network.get_player_profiles(matches, history)
+
+    expected = np.array([network.preprocess_match_data(matches.iloc[i], profiles) for i in range(len(matches))])
+    actual = match_feature_matrix(matches, ProfileStore.from_profiles(profiles))
+    np.testing.assert_allclose(actual, expected, rtol=1e-6, atol=1e-6)
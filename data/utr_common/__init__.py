@@ -0,0 +1,2 @@
+# This file makes the utr_common directory a Python package.
+# Shared data helpers used by the scrapers, model training and the Streamlit app.
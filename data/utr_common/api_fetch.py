@@ -0,0 +1,255 @@
+"""
+Direct JSON fetch mode for the scrapers.
+
+Instead of rendering every profile page in Chrome, the browser signs in once
+and its session cookies are handed to a pooled requests.Session, which asks
+the UTR API for the same profile data the pages are built from. Requests run
+with bounded concurrency (asyncio over a thread pool the size of the HTTP
+connection pool) and the rows go to the same writer as the browser path.
+
+The endpoints are configuration, not discovered here: UTR_API_BASE selects
+the host (point it at a utr_common.fixture_server for offline runs) and the
+*_PATH templates below the resources. Set UTR_API_RECORD_DIR to save every
+response so the fixture server can replay it.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import quote
+
+from utr_common.page_parse import best_of, short_name, tournament_fields
+
+logger = logging.getLogger(__name__)
+
+FETCH_MODE_ENV = "SCRAPER_FETCH_MODE"  # "browser" (default) or "api"
+API_BASE_ENV = "UTR_API_BASE"
+API_RECORD_DIR_ENV = "UTR_API_RECORD_DIR"
+API_CONCURRENCY_ENV = "SCRAPER_API_CONCURRENCY"
+
+API_BASE = "https://api.utrsports.net"
+RATING_HISTORY_PATH = "/v1/player/{p_id}/stats?type=singles&resultType=verified&fetchAllRatingHistory=true"
+RESULTS_PATH = "/v4/player/{p_id}/results"
+
+# Cookie holding the session token; it is also sent as a bearer token
+AUTH_COOKIE = "jwt"
+
+API_CONCURRENCY = 8
+REQUEST_TIMEOUT = 30
+# Profiles fetched per batch; rows of a batch are written before the next one starts
+BATCH_SIZE = 256
+
+HISTORY_COLUMNS = ['first_name', 'last_name', 'date', 'utr']
+
+
+def fetch_mode_from_env(default="browser"):
+    return os.getenv(FETCH_MODE_ENV, default)
+
+
+def api_concurrency_from_env(default=API_CONCURRENCY):
+    return max(1, int(os.getenv(API_CONCURRENCY_ENV, default)))
+
+
+def api_base():
+    return os.getenv(API_BASE_ENV, API_BASE).rstrip("/")
+
+
+### HTTP Session ###
+def make_session(concurrency=API_CONCURRENCY, cookies=(), user_agent=None):
+    """
+    requests.Session with a connection pool of `concurrency` connections,
+    retries with backoff on 429/5xx, and the given browser cookies.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept"] = "application/json"
+    if user_agent:
+        session.headers["User-Agent"] = user_agent
+    for cookie in cookies:
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        if cookie["name"] == AUTH_COOKIE:
+            session.headers["Authorization"] = f"Bearer {cookie['value']}"
+    return session
+
+
+def session_from_driver(driver, concurrency=API_CONCURRENCY):
+    """Session carrying the cookies and user agent of a signed-in Selenium driver."""
+    return make_session(concurrency, driver.get_cookies(), driver.execute_script("return navigator.userAgent"))
+###
+
+
+### Fetching ###
+def fixture_name(path):
+    """File name a response for `path` (with query string) is recorded under."""
+    return quote(path, safe="") + ".json"
+
+
+def _get_json(session, path, limiter=None):
+    """Parsed JSON for `path`, or None (logged) on any failure."""
+    if limiter is not None:
+        limiter.wait()
+    try:
+        response = session.get(api_base() + path, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        payload = response.json()
+    except Exception as e:
+        logger.error(f"API request failed for {path}: {str(e)}")
+        return None
+
+    record_dir = os.getenv(API_RECORD_DIR_ENV)
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+        with open(os.path.join(record_dir, fixture_name(path)), "w") as f:
+            json.dump(payload, f)
+    return payload
+
+
+async def _fetch_batch(session, paths, concurrency, limiter):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        async def fetch(path):
+            async with semaphore:
+                return await loop.run_in_executor(pool, _get_json, session, path, limiter)
+        return await asyncio.gather(*(fetch(path) for path in paths))
+
+
+def fetch_json(session, paths, concurrency=API_CONCURRENCY, limiter=None, batch_size=BATCH_SIZE):
+    """
+    Yield (index, payload) for every path in order, at most `concurrency`
+    requests in flight. Paths are fetched `batch_size` at a time so only one
+    batch of responses is held in memory. Failed requests yield None.
+    """
+    for start in range(0, len(paths), batch_size):
+        batch = paths[start:start + batch_size]
+        for k, payload in enumerate(asyncio.run(_fetch_batch(session, batch, concurrency, limiter))):
+            yield start + k, payload
+###
+
+
+### Rows ###
+def history_rows(payload, f_name, l_name):
+    """[first_name, last_name, date, utr] rows from a rating-history response."""
+    history = (payload.get("extendedRatingProfile") or {}).get("history") or payload.get("ratingHistory") or []
+    rows = []
+    for item in history:
+        try:
+            rows.append([f_name, l_name, str(item["date"])[:10], f"{float(item['rating']):.2f}"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return rows
+
+
+def _player_name(player):
+    return f"{player.get('firstName', '').strip()} {player.get('lastName', '').strip()}".strip()
+
+
+def match_rows(payload, utr_history, today=None):
+    """
+    Rows in the matches table layout from a player results response. UTRs are
+    looked up as of the match date; matches with an unknown player or without
+    a score (walkovers) are skipped, as on the page path.
+    """
+    today = today or date.today()
+    rows = []
+    for event in payload.get("events") or []:
+        tourney_name, slam, surface = tournament_fields(event.get("name") or "")
+        for draw in event.get("draws") or []:
+            for result in draw.get("results") or []:
+                try:
+                    match_date = datetime.fromisoformat(str(result["date"])[:10]).date()
+                    if match_date > today:
+                        continue
+                    players = result["players"]
+                    winner_name, loser_name = _player_name(players["winner1"]), _player_name(players["loser1"])
+                    w_utr = utr_history.lookup(winner_name, match_date)
+                    l_utr = utr_history.lookup(loser_name, match_date)
+
+                    sets = [(int(s["winner"]), int(s["loser"])) for _, s in sorted((result.get("score") or {}).items())
+                            if s and s.get("winner") is not None]
+                    if not sets:
+                        continue
+                    score = ' '.join(f"{w}-{l}" for w, l in sets)
+                    p1_games, p2_games = sum(w for w, _ in sets), sum(l for _, l in sets)
+                    round_name = (result.get("round") or {}).get("name", '')
+
+                    row = [tourney_name, match_date, slam, 'Outdoor', surface, round_name, best_of(sets)]
+                    winner, loser = short_name(winner_name), short_name(loser_name)
+                    if random.randint(0, 1) == 0:
+                        row += [winner, w_utr, loser, l_utr, winner, p1_games, p2_games, score, 0]
+                    else:
+                        row += [loser, l_utr, winner, w_utr, winner, p1_games, p2_games, score, 1]
+                    if result.get("isTie"):
+                        row[-1] = 0.5
+                    rows.append(row)
+                except Exception as e:
+                    logger.debug(f"Skipping result: {str(e)}")
+                    continue
+    return rows
+###
+
+
+### Scrapes ###
+def fetch_utr_history(session, df, writer=None, concurrency=API_CONCURRENCY, limiter=None, ledger=None):
+    """
+    scrape_utr_history over the API: same rows, sent to `writer` (a RecordSink)
+    if given, otherwise returned as a DataFrame. Progress goes to `ledger` (a
+    ProgressLedger) if given.
+    """
+    from utr_common.checkpoint import DONE, FAILED
+    from utr_common.sinks import MemorySink
+
+    df = df[df['p_id'].notna()].reset_index(drop=True)
+    paths = [RATING_HISTORY_PATH.format(p_id=int(p_id)) for p_id in df['p_id']]
+    logger.info(f"Fetching UTR history for {len(paths)} profiles over the API ({concurrency} concurrent requests)")
+
+    sink = writer if writer is not None else MemorySink("utr_history")
+    written, failed = 0, 0
+    for i, payload in fetch_json(session, paths, concurrency, limiter):
+        if payload is None:
+            failed += 1
+            if ledger:
+                ledger.record(df['p_id'][i], [], FAILED)
+            continue
+        rows = history_rows(payload, df['f_name'][i], df['l_name'][i])
+        sink.writerows(rows)
+        written += len(rows)
+        if ledger:
+            ledger.record(df['p_id'][i], rows, DONE)
+
+    if ledger:
+        ledger.flush()
+    logger.info(f"API fetch complete: {written} UTR records, {failed} failed profiles")
+    if writer is not None:
+        writer.flush()
+        return None
+    return sink.frame()
+
+
+def fetch_player_matches(session, profile_ids, utr_history, writer, concurrency=API_CONCURRENCY, limiter=None):
+    """scrape_player_matches over the API: match rows go to `writer` in profile order."""
+    paths = [RESULTS_PATH.format(p_id=int(round(p_id))) for p_id in profile_ids['p_id']]
+    logger.info(f"Fetching results for {len(paths)} profiles over the API ({concurrency} concurrent requests)")
+
+    written, failed = 0, 0
+    for _, payload in fetch_json(session, paths, concurrency, limiter):
+        if payload is None:
+            failed += 1
+            continue
+        for row in match_rows(payload, utr_history):
+            writer.writerow(row)
+            written += 1
+
+    logger.info(f"API fetch complete: {written} match rows, {failed} failed profiles")
+###
+
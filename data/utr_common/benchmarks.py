@@ -0,0 +1,1040 @@
+"""
+Benchmarks for the data pipeline: storage, tables, the scrapers and their helpers.
+
+Usage (from the data directory):
+    python -m utr_common.benchmarks          # run everything
+    python -m utr_common.benchmarks tables   # run one benchmark by name
+
+The synthetic data helpers are shared with user-interface/benchmarks.py.
+"""
+import sys
+import time
+import random
+import numpy as np
+
+MATCHES_TABLE = "atp_utr_tennis_matches"
+UTR_TABLE = "utr_history"
+
+
+### Synthetic Data ###
+def timed(fn, *args, **kwargs):
+    """Run fn once and return (result, seconds)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def synthetic_matches(n_matches=1_000_000, n_players=20000, seed=0):
+    """Matches frame with the p1 / p2 / p1_utr / p2_utr / winner columns the profile builders read."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Player {i}" for i in range(n_players)], dtype=object)
+    player_utr = rng.uniform(11, 16.5, n_players)
+    a = rng.integers(0, n_players, n_matches)
+    b = (a + rng.integers(1, n_players, n_matches)) % n_players
+    p1_utr = np.round(player_utr[a] + rng.normal(0, 0.3, n_matches), 2)
+    p2_utr = np.round(player_utr[b] + rng.normal(0, 0.3, n_matches), 2)
+    # Some exact ties so the "diff > 0" edge goes through both builders
+    p2_utr[::50] = p1_utr[::50]
+    p1_won = rng.random(n_matches) < 1 / (1 + np.exp(-(p1_utr - p2_utr)))
+    return pd.DataFrame({
+        "p1": names[a], "p2": names[b],
+        "p1_utr": p1_utr, "p2_utr": p2_utr,
+        "winner": np.where(p1_won, names[a], names[b]),
+    })
+
+
+def assert_same_profiles(expected, actual):
+    """Equivalence check between two ProfileStores (floats up to summation order)."""
+    assert list(expected.names) == list(actual.names)
+    for key in expected.features:
+        assert np.allclose(expected.features[key], actual.features[key], rtol=1e-12, atol=1e-12), key
+    for attr in ("h2h_indptr", "h2h_indices", "h2h_wins", "h2h_totals"):
+        assert np.array_equal(getattr(expected, attr), getattr(actual, attr)), attr
+
+
+def synthetic_utr_history(n_rows=3_000_000, n_players=50000, seed=0):
+    """utr_history.csv shaped frame: first_name, last_name, utr, date (newest first per player, like the scraper writes)."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    player = np.sort(rng.integers(0, n_players, n_rows))
+    days = rng.integers(0, 4000, n_rows)
+    order = np.lexsort((-days, player))
+    player, days = player[order], days[order]
+    dates = (np.datetime64("2014-01-01") + days).astype(str)
+    return pd.DataFrame({
+        "first_name": np.char.add("First", player.astype(str)).astype(object),
+        "last_name": np.char.add("Last", (player % 977).astype(str)).astype(object),
+        "utr": np.round(rng.uniform(10, 16.5, n_rows), 2),
+        "date": dates.astype(object),
+    })
+
+
+def synthetic_match_table(n_matches, seed=0):
+    """synthetic_matches plus the other stored columns (tournament, date, score, p_win)."""
+    matches = synthetic_matches(n_matches, seed=seed)
+    rng = np.random.default_rng(seed + 3)
+    matches.insert(0, "tournament", rng.choice(["Australian Open", "Heineken Open", "Qatar Exxon Mobil Open"], n_matches))
+    matches.insert(1, "date", (np.datetime64("2014-01-01") + np.arange(n_matches) // 200).astype(str))
+    matches["score"] = "6-4 6-4"
+    matches["p_win"] = (matches["winner"] == matches["p1"]).astype(int)
+    return matches
+###
+
+
+### As-Of UTR Lookup ###
+def scan_utr(history_lists, name, match_date):
+    """The scraper's linear scan: first rating dated on or before the match, else the last listed."""
+    from datetime import datetime
+    for utrdata in history_lists[name]:
+        if datetime.strptime(utrdata[1], '%Y-%m-%d').date() <= match_date:
+            return utrdata[0]
+    return history_lists[name][len(history_lists[name])-1][0]
+
+
+def bench_asof_utr(n_rows=3_000_000, n_matches=200_000, n_loop=20_000):
+    from datetime import date, timedelta
+    from utr_common.history import UtrHistory, AsOfUtrIndex
+
+    utr_history = synthetic_utr_history(n_rows)
+    history_lists = UtrHistory.from_frame(utr_history).to_lists()
+    index, build_seconds = timed(AsOfUtrIndex.from_frame, utr_history)
+
+    rng = np.random.default_rng(2)
+    names = list(history_lists)
+    match_names = [names[k] for k in rng.integers(0, len(names), n_matches)]
+    match_dates = [date(2013, 6, 1) + timedelta(days=int(d)) for d in rng.integers(0, 4400, n_matches)]
+
+    scanned, scan_seconds = timed(lambda: [scan_utr(history_lists, n, d) for n, d in zip(match_names[:n_loop], match_dates[:n_loop])])
+    single, single_seconds = timed(lambda: [index.lookup(n, d) for n, d in zip(match_names, match_dates)])
+    batch, batch_seconds = timed(index.lookup_many, match_names, match_dates)
+    assert scanned == single[:n_loop]
+    assert np.array_equal(batch, single)
+
+    print(f"index build ({n_rows:,} rows) : {build_seconds:.2f}s")
+    print(f"linear scan + strptime   : {n_loop / scan_seconds:12,.0f} lookups/s")
+    print(f"lookup (binary search)   : {n_matches / single_seconds:12,.0f} lookups/s ({scan_seconds / n_loop * n_matches / single_seconds:.0f}x)")
+    print(f"lookup_many (one join)   : {n_matches / batch_seconds:12,.0f} lookups/s ({scan_seconds / n_loop * n_matches / batch_seconds:.0f}x)")
+###
+
+
+### Match Dedupe / Merge ###
+def loop_merge(prev_matches, matches):
+    """matches.py before the keyed merge: list membership per row, one concat per new row."""
+    import pandas as pd
+    prev_match_rows = prev_matches.values.tolist()
+    for _, row in matches.iterrows():
+        if row.values.tolist() not in prev_match_rows:
+            prev_matches = pd.concat([prev_matches, pd.DataFrame([row])], ignore_index=True)
+    return prev_matches
+
+
+def bench_match_merge(n_master=2_000_000, n_new=5000, n_loop_master=20_000, n_loop_new=500):
+    import pandas as pd
+    from utr_common.dedupe import merge_new_matches
+
+    matches = synthetic_matches(n_master + n_new // 2)
+    matches["date"] = (np.datetime64("2014-01-01") + np.arange(len(matches)) // 200).astype(str).astype(object)
+    matches["score"] = "6-4 6-4"
+    # New batch: half already in the master file (some with the players listed the other way round), half new
+    master = matches.iloc[:n_master].reset_index(drop=True)
+    seen = master.sample(n_new - n_new // 2, random_state=0)
+    flipped = seen.iloc[::2].rename(columns={"p1": "p2", "p2": "p1", "p1_utr": "p2_utr", "p2_utr": "p1_utr"})[seen.columns]
+    new = pd.concat([seen.iloc[1::2], flipped, matches.iloc[n_master:]], ignore_index=True)
+
+    (merged, inserted, duplicates), seconds = timed(merge_new_matches, master, new)
+    assert inserted == n_new // 2 and duplicates == len(new) - n_new // 2 and len(merged) == n_master + inserted
+    print(f"keyed merge: {n_master:,} master + {len(new):,} new rows in {seconds:.2f}s ({inserted:,} inserted, {duplicates:,} duplicates)")
+
+    # The old loop on a small master file, for scale
+    small_master = master.iloc[:n_loop_master]
+    small_new = pd.concat([master.iloc[:n_loop_new // 2], matches.iloc[n_master:n_master + n_loop_new // 2]], ignore_index=True)
+    loop_result, loop_seconds = timed(loop_merge, small_master, small_new)
+    (keyed_result, _, _), keyed_seconds = timed(merge_new_matches, small_master, small_new)
+    assert len(loop_result) == len(keyed_result)
+    print(f"{n_loop_master:,} master + {n_loop_new} new rows: loop {loop_seconds:.2f}s, keyed merge {keyed_seconds:.3f}s ({loop_seconds / keyed_seconds:.0f}x)")
+###
+
+
+### Parquet Tables ###
+def bench_tables(n_matches=1_000_000, n_history=3_000_000):
+    import tempfile
+    import pandas as pd
+    from utr_common.profiles import PROFILE_MATCH_COLUMNS
+    from utr_common.storage import LocalStore
+    from utr_common.tables import write_table, read_table
+
+    matches = synthetic_match_table(n_matches)
+    tables = {MATCHES_TABLE: (matches, PROFILE_MATCH_COLUMNS), UTR_TABLE: (synthetic_utr_history(n_history), ["first_name", "last_name", "utr"])}
+
+    with tempfile.TemporaryDirectory() as root:
+        parquet_store, csv_store = LocalStore(root + "/parquet"), LocalStore(root + "/csv")
+        for table, (df, columns) in tables.items():
+            write_table(parquet_store, table, df, keep_csv=False)
+            # CSV only, so read_table takes the fallback path
+            csv_store.write_bytes(f"{table}.csv", df.to_csv(index=False))
+
+            from_csv, csv_seconds = timed(read_table, csv_store, table)
+            from_parquet, parquet_seconds = timed(read_table, parquet_store, table)
+            subset, subset_seconds = timed(read_table, parquet_store, table, columns)
+            pd.testing.assert_frame_equal(from_csv, from_parquet, check_categorical=False, check_dtype=False)
+            pd.testing.assert_frame_equal(from_parquet[columns], subset)
+
+            print(f"{table} ({len(df):,} rows)")
+            print(f"  size    : csv {csv_store.size(table + '.csv') / 1e6:7.1f} MB, parquet {parquet_store.size(table + '.parquet') / 1e6:7.1f} MB")
+            print(f"  load    : csv {csv_seconds:.2f}s (incl. typing), parquet {parquet_seconds:.2f}s, parquet {len(columns)} columns {subset_seconds:.2f}s")
+###
+
+
+### Partitioned Matches Dataset ###
+def bench_partitioned_matches(n_matches=1_000_000, n_runs=30, run_rows=2_000):
+    import io
+    import tempfile
+    import pandas as pd
+    from utr_common.profiles import PROFILE_MATCH_COLUMNS
+    from utr_common.dataset import PartitionedDataset
+    from utr_common.profiles import ProfileAccumulator, sync_with_dataset
+    from utr_common.storage import LocalStore
+    from utr_common.tables import write_table, read_table
+
+    matches = synthetic_match_table(n_matches + n_runs * run_rows)
+    base, runs = matches.iloc[:n_matches], [matches.iloc[n_matches + i * run_rows:n_matches + (i + 1) * run_rows] for i in range(n_runs)]
+
+    with tempfile.TemporaryDirectory() as root:
+        single, partitioned = LocalStore(root + "/single"), LocalStore(root + "/partitioned")
+        write_table(single, MATCHES_TABLE, base, keep_csv=False)
+        write_table(partitioned, MATCHES_TABLE, base, keep_csv=False)
+        dataset = PartitionedDataset(partitioned, MATCHES_TABLE)
+        dataset.migrate()
+
+        # Every scrape run: read the table, append the run, write it all back vs. write one partition
+        def rewrite(run):
+            write_table(single, MATCHES_TABLE, pd.concat([read_table(single, MATCHES_TABLE), run], ignore_index=True), keep_csv=False)
+        rewrite_seconds = sum(timed(rewrite, run)[1] for run in runs)
+        append_seconds = sum(timed(dataset.append, run)[1] for run in runs)
+        print(f"{n_runs} runs of {run_rows:,} rows on {n_matches:,}: full rewrite {rewrite_seconds / n_runs:.3f}s/run, "
+              f"append partition {append_seconds / n_runs:.4f}s/run ({rewrite_seconds / append_seconds:.0f}x)")
+
+        full, single_seconds = timed(read_table, single, MATCHES_TABLE)
+        serial, serial_seconds = timed(dataset.read, max_workers=1)
+        parallel, parallel_seconds = timed(dataset.read)
+        pd.testing.assert_frame_equal(full, parallel, check_categorical=False)
+        pd.testing.assert_frame_equal(serial, parallel)
+        print(f"read all ({len(full):,} rows): single file {single_seconds:.2f}s, {n_runs + 1} partitions serial {serial_seconds:.2f}s, parallel {parallel_seconds:.2f}s")
+
+        # Profile state saved before the last run only needs the last partition
+        state = io.BytesIO()
+        ProfileAccumulator().absorb(full.iloc[:-run_rows]).save(state)
+
+        def saved_state():
+            state.seek(0)
+            return ProfileAccumulator.load(state)
+        _, full_sync_seconds = timed(lambda: saved_state().sync(dataset.read(columns=PROFILE_MATCH_COLUMNS)))
+        tail_acc = saved_state()
+        absorbed, tail_seconds = timed(sync_with_dataset, tail_acc, dataset)
+        assert absorbed == run_rows
+        assert_same_profiles(ProfileAccumulator().absorb(full).to_store(), tail_acc.to_store())
+        print(f"profile sync of the last run: read full table {full_sync_seconds:.2f}s, read tail partitions {tail_seconds:.3f}s")
+
+        (before, after), compact_seconds = timed(dataset.compact, 2 * n_matches)
+        compacted, compacted_seconds = timed(dataset.read)
+        pd.testing.assert_frame_equal(full, compacted, check_categorical=False)
+        print(f"compaction {before} -> {after} partitions in {compact_seconds:.2f}s, read all after {compacted_seconds:.2f}s")
+###
+
+
+### Object Store ###
+def fake_service_account():
+    """Service-account dict with a throwaway RSA key (enough to build a client, not to call GCS)."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    return {
+        "type": "service_account", "project_id": "bench", "private_key_id": "0", "private_key": pem.decode(),
+        "client_email": "bench@bench.iam.gserviceaccount.com", "client_id": "0",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+
+
+def check_store(store):
+    """Every store backend behaves the same for the operations the pipelines use."""
+    data = bytes(range(256)) * 16
+    store.write_bytes("a/x.bin", data)
+    with store.open_write("a/y.txt", content_type="text/plain") as f:
+        f.write(b"streamed")
+    assert store.exists("a/x.bin") and not store.exists("a/z.bin")
+    assert store.read_bytes("a/x.bin") == data and store.size("a/x.bin") == len(data)
+    assert store.read_bytes("a/x.bin", 100, 300) == data[100:300] and store.read_bytes("a/x.bin", 4000) == data[4000:]
+    with store.open_read("a/y.txt") as f:
+        assert f.read() == b"streamed"
+    assert store.list("a/") == ["a/x.bin", "a/y.txt"]
+    store.delete("a/y.txt")
+    assert store.list() == ["a/x.bin"]
+
+
+def bench_object_store(n_clients=20, object_mb=200):
+    import os
+    import tempfile
+    from google.cloud import storage
+    from google.oauth2 import service_account
+    from utr_common.storage import LocalStore, MemoryStore, get_client, open_bucket
+
+    with tempfile.TemporaryDirectory() as root:
+        for store in (LocalStore(root), MemoryStore(), open_bucket("bench", backend=f"local:{root}")):
+            check_store(store)
+        print("local, memory backends: same results for read/write/range/stream/list/delete")
+
+        # Client per call (credential parsing + client setup) vs one shared client
+        credentials_dict = fake_service_account()
+
+        def fresh_client():
+            credentials = service_account.Credentials.from_service_account_info(credentials_dict)
+            return storage.Client(credentials=credentials, project=credentials_dict["project_id"]).bucket("bench")
+        _, fresh_seconds = timed(lambda: [fresh_client() for _ in range(n_clients)])
+        _, shared_seconds = timed(lambda: [get_client(credentials_dict).bucket("bench") for _ in range(n_clients)])
+        print(f"{n_clients} bucket handles: new client each {fresh_seconds * 1000:.0f}ms, shared client {shared_seconds * 1000:.1f}ms")
+
+        # Tail of a large object: byte range vs whole object
+        store = LocalStore(root)
+        with store.open_write("big.bin") as f:
+            for _ in range(object_mb):
+                f.write(os.urandom(1 << 20))
+        _, whole_seconds = timed(lambda: store.read_bytes("big.bin")[-4096:])
+        _, range_seconds = timed(store.read_bytes, "big.bin", store.size("big.bin") - 4096)
+        print(f"last 4 KB of {object_mb} MB: whole read {whole_seconds:.3f}s, byte range {range_seconds * 1000:.2f}ms")
+###
+
+
+### Streaming Uploads ###
+def _rss_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+
+
+def _upload_peak(method, n_rows, root, queue):
+    """Child process: build the frame, then report the peak RSS the upload adds on top of it."""
+    import io
+    from utr_common.storage import LocalStore
+    from utr_common.tables import to_typed, write_frame
+
+    df = synthetic_match_table(n_rows)
+    store = LocalStore(root)
+    before = _rss_kb("VmRSS")
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")  # reset the VmHWM peak counter
+
+    if method == "csv buffer":
+        # Previous upload_df_to_gcs: whole CSV in a StringIO, getvalue() copy, then upload
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, encoding="utf-8")
+        store.write_bytes("x.csv", buffer.getvalue())
+    elif method == "parquet buffer":
+        buffer = io.BytesIO()
+        to_typed(df, MATCHES_TABLE).to_parquet(buffer, index=False)
+        store.write_bytes("x.parquet", buffer.getvalue())
+    elif method == "csv stream":
+        write_frame(store, "x.csv", df, MATCHES_TABLE, "csv")
+    else:
+        write_frame(store, "x.parquet", df, MATCHES_TABLE, "parquet")
+    queue.put((_rss_kb("VmHWM") - before) / 1024)
+
+
+def bench_streaming_upload(sizes=(250_000, 1_000_000, 2_000_000)):
+    import multiprocessing
+    import tempfile
+    # Fresh process per measurement so freed memory from an earlier run cannot hide a peak
+    ctx = multiprocessing.get_context("spawn")
+    methods = ("csv buffer", "csv stream", "parquet buffer", "parquet stream")
+    print("peak RSS added by the upload (MB)")
+    print(f"{'rows':>10} " + " ".join(f"{m:>15}" for m in methods))
+    for n_rows in sizes:
+        peaks = []
+        for method in methods:
+            with tempfile.TemporaryDirectory() as root:
+                queue = ctx.Queue()
+                proc = ctx.Process(target=_upload_peak, args=(method, n_rows, root, queue))
+                proc.start()
+                peaks.append(queue.get())
+                proc.join()
+        print(f"{n_rows:>10,} " + " ".join(f"{p:>15.0f}" for p in peaks))
+###
+
+
+### Scraper Worker Pool ###
+def _simulated_shard(profile_ids, seconds_per_profile, sign_in_seconds):
+    """Stand-in for a browser session: fixed sign-in and per-page cost, one row per profile."""
+    time.sleep(sign_in_seconds)
+    rows = []
+    for p_id in profile_ids["p_id"]:
+        time.sleep(seconds_per_profile)
+        rows.append([p_id, p_id % 17])
+    return rows
+
+
+def bench_scraper_pool(n_profiles=240, seconds_per_profile=0.02, sign_in_seconds=0.3, workers=(1, 2, 4, 8)):
+    import pandas as pd
+    from utr_common.scrape_pool import run_sharded, RateLimiter
+
+    # Simulated page costs (no browser here); the pool mechanics and merge order are the real ones
+    profile_ids = pd.DataFrame({"p_id": np.arange(1000, 1000 + n_profiles)})
+    expected = _simulated_shard(profile_ids, 0, 0)
+    base = None
+    for n in workers:
+        shards, seconds = timed(run_sharded, _simulated_shard, profile_ids, n, seconds_per_profile, sign_in_seconds)
+        assert [row for rows in shards for row in rows] == expected
+        base = base or seconds
+        print(f"{n} sessions: {seconds:.2f}s ({base / seconds:.1f}x), rows merged in profile order")
+
+    limiter = RateLimiter(0.05)
+    _, seconds = timed(lambda: [limiter.wait() for _ in range(21)])
+    print(f"rate limiter at 0.05s: 21 pages in {seconds:.2f}s")
+###
+
+
+### Page Waits ###
+class _DelayedPage:
+    """Minimal driver whose target element appears `delay` seconds after get()."""
+    def __init__(self):
+        self.ready_at = 0.0
+
+    def get(self, delay):
+        self.ready_at = time.monotonic() + delay
+
+    def execute_script(self, script):
+        return "complete"
+
+    def find_element(self, by, value):
+        from selenium.common.exceptions import NoSuchElementException
+        if time.monotonic() < self.ready_at:
+            raise NoSuchElementException(value)
+        return object()
+
+    def find_elements(self, by, value):
+        return [object()] if time.monotonic() >= self.ready_at else []
+
+
+def bench_page_waits(n_pages=40, fixed_sleep=2.0, seed=0):
+    from utr_common.waits import StepTimeouts, try_wait_for, present, TOURNAMENT_ITEMS
+
+    # Render times drawn around 0.4s with a slow tail; a few pages never show the element
+    rng = np.random.default_rng(seed)
+    delays = rng.lognormal(np.log(0.4), 0.6, n_pages)
+    delays[rng.random(n_pages) < 0.05] = np.inf
+    driver, timeouts = _DelayedPage(), StepTimeouts()
+
+    def run():
+        for delay in delays:
+            driver.get(delay)
+            try_wait_for(driver, "matches_page", present(TOURNAMENT_ITEMS), timeouts=timeouts)
+    _, seconds = timed(run)
+    missed = int((delays > fixed_sleep).sum() - np.isinf(delays).sum())
+    print(f"{n_pages} pages: fixed {fixed_sleep:g}s sleeps {n_pages * fixed_sleep:.1f}s ({missed} pages not rendered in time), "
+          f"condition waits {seconds:.1f}s (all rendered pages waited for)")
+    for line in timeouts.summary():
+        print(f"  {line}")
+###
+
+
+### API Fetch Mode ###
+def _history_page(history):
+    """Profile stats page markup the browser path parses (header row, then one row per rating)."""
+    rows = "".join(f'<div class="row"><div class="newStatsTabContent__historyItemDate__jFJyD">{d}</div>'
+                   f'<div class="newStatsTabContent__historyItemRating__GQUXw">{r:.2f}</div></div>' for d, r in history)
+    return f'<html><body><div class="newStatsTabContent__section__1TQzL p0 bg-transparent"><div class="row"></div>{rows}</div></body></html>'
+
+
+def bench_api_fetch(n_profiles=200, history_len=40, latency=0.05, concurrency=(1, 4, 16)):
+    import os
+    import pandas as pd
+    from bs4 import BeautifulSoup
+    from utr_common.api_fetch import RATING_HISTORY_PATH, HISTORY_COLUMNS, make_session, fetch_utr_history
+    from utr_common.tables import to_typed
+    from utr_common.fixture_server import FixtureServer
+
+    rng = np.random.default_rng(0)
+    profiles = pd.DataFrame({"p_id": np.arange(1000, 1000 + n_profiles), "f_name": [f"F{i}" for i in range(n_profiles)],
+                             "l_name": [f"L{i}" for i in range(n_profiles)]})
+    dates = pd.date_range("2023-01-01", periods=history_len, freq="W").strftime("%Y-%m-%d")
+    responses, expected = {}, []
+    for p_id, f, l in profiles.itertuples(index=False):
+        history = list(zip(dates, np.round(rng.uniform(8, 14, history_len), 2)))
+        responses[RATING_HISTORY_PATH.format(p_id=p_id)] = {"extendedRatingProfile": {"history": [{"date": d, "rating": r} for d, r in history]}}
+        responses[f"/profiles/{p_id}?t=6"] = _history_page(history).encode("utf-8")
+        expected += [[f, l, d, f"{r:.2f}"] for d, r in history]
+
+    with FixtureServer(responses, latency=latency) as server:
+        os.environ["UTR_API_BASE"] = server.url
+
+        # Page path without rendering: one page after another, parsed with BeautifulSoup as in scrape_utr_history.
+        # A real Selenium run adds rendering, scrolling and the "Show all" click to every page
+        def page_path():
+            session, rows = make_session(1), []
+            for p_id, f, l in profiles.itertuples(index=False):
+                soup = BeautifulSoup(session.get(f"{server.url}/profiles/{p_id}?t=6").text, "html.parser")
+                for row in soup.find("div", class_="newStatsTabContent__section__1TQzL p0 bg-transparent").find_all("div", class_="row")[1:]:
+                    rows.append([f, l, row.find("div", class_="newStatsTabContent__historyItemDate__jFJyD").text,
+                                 row.find("div", class_="newStatsTabContent__historyItemRating__GQUXw").text])
+            return rows
+        page_rows, page_seconds = timed(page_path)
+        assert page_rows == expected
+        print(f"{n_profiles} profiles, {latency * 1000:.0f} ms per response")
+        print(f"  page fetch + BeautifulSoup (no rendering) : {n_profiles / page_seconds:7.1f} profiles/s")
+
+        for c in concurrency:
+            result, seconds = timed(fetch_utr_history, make_session(c), profiles, concurrency=c)
+            pd.testing.assert_frame_equal(result, to_typed(pd.DataFrame(expected, columns=HISTORY_COLUMNS), "utr_history"))
+            print(f"  API fetch, {c:2d} concurrent requests       : {n_profiles / seconds:7.1f} profiles/s")
+        del os.environ["UTR_API_BASE"]
+###
+
+
+### Checkpointed Runs ###
+def _checkpointed_run(ledger, profiles, rows_per_profile, crash_at=None):
+    """Scrape loop stand-in: records every profile in the ledger, dying before profile crash_at."""
+    from utr_common.checkpoint import DONE
+    for k, (p_id, f, l) in enumerate(profiles.itertuples(index=False)):
+        if k == crash_at:
+            raise RuntimeError("VM preempted")
+        ledger.record(p_id, [[f, l, f"2024-01-{d + 1:02d}", f"{10 + d / 10:.2f}"] for d in range(rows_per_profile)])
+    ledger.flush()
+
+
+def bench_checkpoint_resume(n_profiles=5000, rows_per_profile=20, crash_at=3700, flush_rows=5000):
+    import tempfile
+    import pandas as pd
+    from utr_common.checkpoint import ProgressLedger
+    from utr_common.storage import LocalStore
+    from utr_common.api_fetch import HISTORY_COLUMNS
+
+    profiles = pd.DataFrame({"p_id": np.arange(n_profiles), "f_name": [f"F{i}" for i in range(n_profiles)],
+                             "l_name": [f"L{i}" for i in range(n_profiles)]})
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalStore(root)
+        reference = ProgressLedger(store, "reference", HISTORY_COLUMNS, flush_rows=flush_rows, writer="w")
+        _, full_seconds = timed(_checkpointed_run, reference, profiles, rows_per_profile)
+        expected = reference.read_rows()
+
+        first = ProgressLedger(store, "run", HISTORY_COLUMNS, flush_rows=flush_rows, writer="first")
+        try:
+            _checkpointed_run(first, profiles, rows_per_profile, crash_at=crash_at)
+        except RuntimeError:
+            pass
+        resumed = ProgressLedger(store, "run", HISTORY_COLUMNS, flush_rows=flush_rows, writer="second")
+        done = resumed.completed()
+        _checkpointed_run(resumed, profiles[~profiles["p_id"].isin(done)], rows_per_profile)
+        result = resumed.read_rows()
+
+        assert result.sort_values(HISTORY_COLUMNS).reset_index(drop=True).equals(expected.sort_values(HISTORY_COLUMNS).reset_index(drop=True))
+        print(f"{n_profiles} profiles, crash before profile {crash_at}, flush every {flush_rows} rows")
+        print(f"  checkpointed run with ledger: {full_seconds:.2f}s ({len(store.list('reference/'))} objects)")
+        print(f"  after the crash: {len(done)} profiles kept, {crash_at - len(done)} redone "
+              f"(without a ledger all {crash_at} would be redone); {len(result)} rows, same as an uninterrupted run")
+###
+
+
+### Incremental Scraping ###
+def _parse_history_page(html, f, l, stop=None):
+    """Rows of a history page as scrape_utr_history reads them, stopping where stop(date) is True."""
+    from bs4 import BeautifulSoup
+    rows = []
+    container = BeautifulSoup(html, "html.parser").find("div", class_="newStatsTabContent__section__1TQzL p0 bg-transparent")
+    for row in container.find_all("div", class_="row")[1:]:
+        utr_date = row.find("div", class_="newStatsTabContent__historyItemDate__jFJyD").text
+        if stop is not None and stop(utr_date):
+            break
+        rows.append([f, l, utr_date, row.find("div", class_="newStatsTabContent__historyItemRating__GQUXw").text])
+    return rows
+
+
+def bench_incremental_scrape(n_profiles=300, history_len=60, visible=5, changed_share=0.1, seed=0):
+    import pandas as pd
+    from utr_common.freshness import Watermarks, latest_per_player, merge_history
+    from utr_common.tables import to_typed
+
+    rng = np.random.default_rng(seed)
+    weeks = pd.date_range("2023-01-01", periods=history_len + 2, freq="W").strftime("%Y-%m-%d")[::-1]
+    names = [(1000 + k, f"F{k}", f"L{k}") for k in range(n_profiles)]
+    # Yesterday's pages start two weeks back; today a share of players has one or two new ratings on top
+    new_counts = np.where(rng.random(n_profiles) < changed_share, rng.integers(1, 3, n_profiles), 0)
+    ratings = {p_id: np.round(rng.uniform(8, 14, history_len + 2), 2) for p_id, _, _ in names}
+    def page(p_id, skip, limit=None):
+        history = list(zip(weeks[skip:], ratings[p_id][skip:]))[:limit]
+        return _history_page(history)
+
+    stored = to_typed(pd.DataFrame([r for p_id, f, l in names for r in _parse_history_page(page(p_id, 2), f, l)],
+                                   columns=["first_name", "last_name", "date", "utr"]), "utr_history")
+    marks = Watermarks()
+    latest = latest_per_player(stored, ("first_name", "last_name"), value_col="utr")
+    for p_id, f, l in names:
+        marks.update(p_id, history_date=latest[(f, l)][0], utr=float(latest[(f, l)][1]))
+
+    today = {p_id: 2 - n for (p_id, _, _), n in zip(names, new_counts)}
+
+    def full_run():
+        # Every page expanded with "Show all" and parsed to the end
+        return [r for p_id, f, l in names for r in _parse_history_page(page(p_id, today[p_id]), f, l)], len(names)
+
+    def incremental_run():
+        rows, expanded = [], 0
+        for p_id, f, l in names:
+            stop = lambda d, p_id=p_id: marks.older(p_id, "history_date", d)
+            shown = _parse_history_page(page(p_id, today[p_id], visible), f, l)
+            if not any(marks.reached(p_id, "history_date", r[2]) for r in shown):
+                expanded += 1
+                shown = _parse_history_page(page(p_id, today[p_id]), f, l, stop)
+            rows += [r for r in shown if not stop(r[2])]
+        return rows, expanded
+
+    (full_rows, full_expanded), full_seconds = timed(full_run)
+    (inc_rows, inc_expanded), inc_seconds = timed(incremental_run)
+    expected = to_typed(pd.DataFrame(full_rows, columns=["first_name", "last_name", "date", "utr"]), "utr_history")
+    merged = merge_history(stored, pd.DataFrame(inc_rows, columns=["first_name", "last_name", "date", "utr"]))
+    key = ["first_name", "last_name", "date"]
+    assert merged.astype({c: str for c in key[:2]}).sort_values(key).reset_index(drop=True).equals(
+        expected.astype({c: str for c in key[:2]}).sort_values(key).reset_index(drop=True))
+
+    print(f"{n_profiles} profiles, {int((new_counts > 0).sum())} with new ratings")
+    print(f"  full scrape        : {full_expanded:4d} pages expanded, {len(full_rows):6d} rows parsed, {full_seconds:.2f}s")
+    print(f"  incremental scrape : {inc_expanded:4d} pages expanded, {len(inc_rows):6d} rows kept, {inc_seconds:.2f}s; "
+          f"merged history equals the full scrape")
+###
+
+
+### Page Parsing ###
+def bs_history(page_source):
+    """The BeautifulSoup extraction scrape_utr_history used before utr_common.page_parse."""
+    from bs4 import BeautifulSoup
+    container = BeautifulSoup(page_source, 'html.parser').find("div", class_="newStatsTabContent__section__1TQzL p0 bg-transparent")
+    entries = []
+    for row in container.find_all("div", class_="row")[1:]:
+        try:
+            entries.append((row.find("div", class_="newStatsTabContent__historyItemDate__jFJyD").text,
+                            row.find("div", class_="newStatsTabContent__historyItemRating__GQUXw").text))
+        except AttributeError:
+            continue
+    return entries
+
+
+def bs_matches(page_source, today):
+    """The BeautifulSoup extraction scrape_player_matches used before (names, header and score loops as they were)."""
+    from datetime import datetime
+    from bs4 import BeautifulSoup
+    from dateutil.relativedelta import relativedelta
+    out = []
+    for tourney in BeautifulSoup(page_source, 'html.parser').find_all("div", class_="eventItem__eventItem__2Xpsd"):
+        try:
+            tourney_name = tourney.find("span", class_="").text
+        except AttributeError:
+            continue
+        if ',' in tourney_name:
+            tourney_name = tourney_name[:tourney_name.index(',')]
+        surface, slam = "Hard", ''
+        if tourney_name in ("Wimbledon", "French Open", "US Open", "Austrlian Open"):
+            slam, surface = "Grand Slam", {"Wimbledon": "Grass", "French Open": "Clay"}.get(tourney_name, "Hard")
+        else:
+            temp, flag = '', False
+            for ch in tourney_name:
+                if temp == 'ATP' and not flag:
+                    flag = True
+                elif ch == ' ' and flag:
+                    slam, temp, flag = temp, '', False
+                temp = temp + ch
+            if temp != '':
+                tourney_name = temp
+            if tourney_name[0] == ' ':
+                tourney_name = tourney_name[1:]
+        for match in tourney.find_all("div", class_="d-none d-md-block"):
+            try:
+                tround = match.find("div", class_="scorecard__header__2iDdF").text
+                r = ''
+                for j in range(len(tround)):
+                    if tround[-j-1] != '|':
+                        r = tround[-1*j-1] + r
+                    else:
+                        r = r[1:]
+                        break
+                start, end = -1, -1
+                for j in range(len(tround)):
+                    if tround[j] == '|' and start == -1:
+                        start = j
+                    elif tround[j] == '|' and start != -1:
+                        end = j
+                match_date_str = tround[(start+2):j] if end == -1 else tround[(start+2):(end-1)]
+                match_date = datetime.strptime(match_date_str, "%b %d").replace(year=today.year).date()
+                if match_date > today:
+                    match_date = match_date - relativedelta(year=today.year-1)
+                is_tie = False
+                try:
+                    winner_name = match.find("a", class_="flex-column player-name winner").text
+                    loser_name = match.find("a", class_="flex-column player-name").text
+                except AttributeError:
+                    tie = match.find_all("a", class_="flex-column player-name")
+                    if len(tie) < 2:
+                        continue
+                    winner_name, loser_name, is_tie = tie[0].text, tie[1].text, True
+                all_scores = match.find_all("div", "score-item")
+                half = len(all_scores) // 2
+                score = ' '.join(all_scores[k].text[0] + '-' + all_scores[k + half].text[0] for k in range(half))
+                if not score:
+                    continue
+                games = (sum(int(all_scores[k].text[0]) for k in range(half)), sum(int(all_scores[k + half].text[0]) for k in range(half)))
+                out.append((tourney_name, slam, surface, r, match_date, winner_name, loser_name, is_tie, score) + games)
+            except Exception:
+                continue
+    return out
+
+
+def bench_page_parse(repeat=(1, 20)):
+    import logging
+    import os
+    import re
+    from datetime import date
+    from utr_common.page_parse import parse_history, parse_matches, FIXTURES_DIR
+
+    logging.getLogger("utr_common.page_parse").setLevel(logging.ERROR)  # the fixture's unnamed event warns on every parse
+
+    today = date(2024, 11, 1)
+    results = open(os.path.join(FIXTURES_DIR, "profile_results.html")).read()
+    stats = open(os.path.join(FIXTURES_DIR, "profile_stats.html")).read()
+    # Equivalence on the saved pages
+    assert [tuple(e) for e in parse_history(stats)] == bs_history(stats)
+    assert [(m.tournament, m.series, m.surface, m.round, m.date, m.winner, m.loser, m.is_tie, m.score, m.winner_games, m.loser_games)
+            for m in parse_matches(results, today)] == bs_matches(results, today)
+
+    for k in repeat:
+        # Longer profiles: the events and history rows of the fixtures repeated k times
+        events = re.findall(r'  <div class="eventItem__eventItem__2Xpsd">.*?\n  </div>\n', results, re.S)
+        big_results = results.replace("".join(events), "".join(events) * k)
+        rows = re.findall(r'      <div class="row"><div class="col newStatsTabContent.*?</div></div>\n', stats)
+        big_stats = stats.replace("".join(rows), "".join(rows) * k)
+        n = 20 if k > 1 else 200
+        _, bs_m = timed(lambda: [bs_matches(big_results, today) for _ in range(n)])
+        _, lx_m = timed(lambda: [parse_matches(big_results, today) for _ in range(n)])
+        _, bs_h = timed(lambda: [bs_history(big_stats) for _ in range(n)])
+        _, lx_h = timed(lambda: [parse_history(big_stats) for _ in range(n)])
+        print(f"fixtures x{k:<3d} results page ({len(big_results) // 1024} KB): BeautifulSoup {bs_m / n * 1000:6.2f} ms, lxml {lx_m / n * 1000:6.2f} ms ({bs_m / lx_m:.1f}x)")
+        print(f"              stats page   ({len(big_stats) // 1024} KB): BeautifulSoup {bs_h / n * 1000:6.2f} ms, lxml {lx_h / n * 1000:6.2f} ms ({bs_h / lx_h:.1f}x)")
+###
+
+
+### Run Log Shipping ###
+class _SlowStore:
+    """LocalStore with object-store costs: a fixed latency per request plus transfer time per byte."""
+    def __init__(self, store, latency=0.02, mb_per_s=20.0):
+        self.store, self.latency, self.bytes_per_s = store, latency, mb_per_s * 1e6
+        self.moved = 0
+
+    def _cost(self, n_bytes):
+        self.moved += n_bytes
+        time.sleep(self.latency + n_bytes / self.bytes_per_s)
+
+    def read_bytes(self, name):
+        data = self.store.read_bytes(name)
+        self._cost(len(data))
+        return data
+
+    def write_bytes(self, name, data, content_type=None):
+        self._cost(len(data))
+        self.store.write_bytes(name, data, content_type=content_type)
+
+    def exists(self, name):
+        return self.store.exists(name)
+
+    def list(self, prefix=""):
+        return self.store.list(prefix)
+
+
+def _append_log(store, name, lines):
+    """The old save_logs_to_gcs upload: download the whole log, append the buffered lines, upload it again."""
+    try:
+        current = store.read_bytes(name).decode("utf-8")
+    except Exception:
+        current = ""
+    buffered = "\n".join(lines)
+    store.write_bytes(name, f"{current}\n{buffered}" if current else buffered, content_type="text/plain")
+
+
+def bench_log_sink(n_messages=5000, upload_every=50, earlier_runs_mb=5.0):
+    import tempfile
+    from utr_common.log_sink import LogSink, list_runs, read_run
+    from utr_common.storage import LocalStore
+
+    messages = [f"Profile {i}: scraped {i % 40} rows of UTR history" for i in range(n_messages)]
+    with tempfile.TemporaryDirectory() as root:
+        # Old: one log object shared by every run, rewritten on each upload while the scraper waits
+        old = _SlowStore(LocalStore(root + "/old"))
+        old.store.write_bytes("logs/scraper_log.txt", "x" * int(earlier_runs_mb * 1e6))
+        old.moved = 0
+        buffer, blocked = [], 0.0
+        for message in messages:
+            buffer.append(message)
+            if len(buffer) == upload_every:
+                _, seconds = timed(_append_log, old, "logs/scraper_log.txt", buffer)
+                blocked, buffer = blocked + seconds, []
+
+        # New: the caller only queues; the sink's thread writes fresh segments
+        new = _SlowStore(LocalStore(root + "/new"))
+        sink = LogSink(new, max_bytes=16 * 1024)
+        _, queued = timed(lambda: [sink.write(m) for m in messages])
+        _, flushed = timed(sink.flush, 120.0)
+        sink.close()
+
+        run = list_runs(new)[0]
+        shipped = [line.split("] ", 1)[1] for line in read_run(new, run).splitlines()]
+        assert shipped == messages
+
+        print(f"{n_messages} messages, old log already {earlier_runs_mb:.0f} MB from earlier runs")
+        print(f"  download-append-reupload every {upload_every}: scraper blocked {blocked:6.2f}s, {old.moved / 1e6:8.1f} MB moved")
+        print(f"  LogSink segments ({sink.segments} objects) : scraper blocked {queued:6.2f}s, {new.moved / 1e6:8.1f} MB moved "
+              f"(background upload done {flushed:.2f}s later); all lines read back in order")
+###
+
+
+### Browser Sessions ###
+class _FakeSite:
+    """Login server stand-in: one valid session token, replaced (expiring every session) every `expire_every` pages."""
+    def __init__(self, expire_every):
+        self.expire_every, self.pages, self.token = expire_every, 0, 0
+
+    def page(self):
+        self.pages += 1
+        if self.pages % self.expire_every == 0:
+            self.token += 1
+
+
+class _FakeChrome:
+    """Driver stand-in: signed in while its jwt cookie matches the site's token; grows 2 MB per page; can crash."""
+    site, crash_at, drivers = None, set(), []
+
+    def __init__(self, options=None):
+        self.cookie, self.pages, self.dead = None, 0, False
+        _FakeChrome.drivers.append(self)
+
+    def _check(self):
+        from selenium.common.exceptions import WebDriverException
+        if self.dead:
+            raise WebDriverException("chrome not reachable")
+
+    def get(self, url):
+        self._check()
+        if self.site.pages in _FakeChrome.crash_at:
+            _FakeChrome.crash_at.discard(self.site.pages)
+            self.dead = True
+            self._check()
+        self.pages += 1
+        self.site.page()
+
+    def signed_in(self):
+        return self.cookie == self.site.token
+
+    def execute_script(self, script):
+        self._check()
+        return 1 if script == "return 1" else "complete"
+
+    def find_elements(self, by, value):
+        self._check()
+        return [] if self.signed_in() else [object()]
+
+    @property
+    def page_source(self):
+        self._check()
+        return "Sign Out" if self.signed_in() else "Sign In"
+
+    def add_cookie(self, cookie):
+        self.cookie = cookie["value"]
+
+    def get_cookies(self):
+        self._check()
+        return [{"name": "jwt", "value": self.cookie, "path": "/"}]
+
+    def quit(self):
+        pass
+
+    @property
+    def rss_mb(self):
+        return 150 + 2 * self.pages
+
+
+def bench_browser_session(runs=3, pages_per_run=400, expire_every=700, crash_page=650, recycle_pages=150, sign_in_seconds=0.2):
+    import tempfile
+    from unittest import mock
+    from utr_common import browser as browser_module
+    from utr_common.browser import BrowserSession, SavedCookies
+    from utr_common.storage import LocalStore
+    from utr_common.waits import StepTimeouts
+
+    logging_level = browser_module.logger.level
+    browser_module.logger.setLevel("ERROR")
+    counts = {"sign_ins": 0}
+
+    def fake_sign_in(driver, url, email, password):
+        time.sleep(sign_in_seconds)  # the real form and its waits take ~6.5s
+        driver.get(url)
+        driver.cookie = driver.site.token
+        counts["sign_ins"] += 1
+
+    def setup():
+        _FakeChrome.site, _FakeChrome.crash_at, _FakeChrome.drivers = _FakeSite(expire_every), {crash_page}, []
+        counts["sign_ins"] = 0
+
+    # Before: one driver per run signed in with the form; after a crash or expiry every remaining page fails
+    setup()
+    start, done = time.perf_counter(), 0
+    for _ in range(runs):
+        driver = _FakeChrome()
+        fake_sign_in(driver, "", "", "")
+        for _ in range(pages_per_run):
+            try:
+                driver.get("profile")
+                done += driver.signed_in()
+            except Exception:
+                pass
+    old = (done, counts["sign_ins"], time.perf_counter() - start, max(d.rss_mb for d in _FakeChrome.drivers))
+
+    # After: BrowserSession with saved cookies, health checks, re-authentication and recycling
+    setup()
+    with tempfile.TemporaryDirectory() as root, mock.patch.object(browser_module.webdriver, "Chrome", _FakeChrome), \
+            mock.patch.object(browser_module, "try_wait_for", lambda d, step, cond, *a, **k: cond(d) or None):
+        cookies = SavedCookies(LocalStore(root))
+        start, done, stats = time.perf_counter(), 0, {}
+        for _ in range(runs):
+            session = BrowserSession(fake_sign_in, "", "", cookies=cookies, recycle_pages=recycle_pages, options=lambda profile: None)
+            for _ in range(pages_per_run):
+                try:
+                    driver = session.load("profile")
+                    done += driver.signed_in()
+                except Exception:
+                    pass
+            session.quit()
+            stats = {k: stats.get(k, 0) + v for k, v in session.stats.items()}
+        new = (done, counts["sign_ins"], time.perf_counter() - start, max(d.rss_mb for d in _FakeChrome.drivers))
+    browser_module.logger.setLevel(logging_level)
+
+    total = runs * pages_per_run
+    print(f"{runs} runs x {pages_per_run} pages; session expires every {expire_every} site pages, driver crash at page {crash_page}")
+    for label, (done, sign_ins, seconds, rss) in (("driver per run", old), ("BrowserSession", new)):
+        print(f"  {label:15s}: {done}/{total} pages signed in, {sign_ins} form sign-ins, {seconds:5.2f}s, peak driver {rss} MB")
+    print(f"  session totals: " + " ".join(f"{k}={v}" for k, v in stats.items()))
+###
+
+
+### Chrome Profiles ###
+def bench_chrome_profiles(repeat=3):
+    """Load the saved profile pages with the standard and light Chrome profiles (needs Chrome and chromedriver)."""
+    import os
+    from utr_common.browser import compare_profiles, comparison_report
+    from utr_common.page_parse import FIXTURES_DIR
+
+    urls = [f"file://{os.path.join(FIXTURES_DIR, name)}" for name in ("profile_results.html", "profile_stats.html")]
+    try:
+        results = compare_profiles(urls, repeat=repeat)
+    except Exception as e:
+        print(f"Chrome is not available here ({type(e).__name__}); on the scraper image run "
+              f"`python -m utr_common.browser compare <profile urls> --bucket <bucket>` instead")
+        return
+    for line in comparison_report(results):
+        print(line)
+###
+
+
+### Record Sinks ###
+def _match_rows(n_rows, seed=0):
+    """Rows as scrape_player_matches emits them: date objects, float UTRs (None when unknown), ties as 0.5."""
+    from datetime import date, timedelta
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        p1, p2 = f"Player{i % 900} A.", f"Player{(i * 7 + 1) % 900} B."
+        rows.append([f"Tournament {i % 60}", date(2024, 1, 1) + timedelta(days=rng.randint(0, 365)), "ATP 250", "Outdoor", "Hard",
+                     "Round of 32", 3, p1, rng.choice([11.8, 12.4, None]), p2, 13.05, p1, 12, 7, "6-3 6-4", rng.choice([0, 1, 1, 0.5])])
+    return rows
+
+
+def bench_record_sinks(n_rows=200_000, batch_rows=10_000):
+    import csv
+    import io
+    import tempfile
+    import tracemalloc
+    import pandas as pd
+    from utr_common.sinks import MemorySink, ParquetSink, CsvSink
+    from utr_common.storage import LocalStore
+    from utr_common.tables import TABLES, to_typed
+
+    rows = _match_rows(n_rows)
+
+    def write_phase(make_writer):
+        """Seconds to write the rows, then the peak Python heap (tracemalloc) of a second, traced pass."""
+        def write():
+            writer = make_writer()
+            for row in rows:
+                writer.writerow(row)
+            if hasattr(writer, "close"):
+                writer.close()  # a file sink is complete once closed
+            return writer
+        _, seconds = timed(write)
+        tracemalloc.start()
+        writer = write()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return writer, seconds, peak
+
+    # Before: csv.writer over a StringIO, then pd.read_csv of the whole text in matches.py
+    buffers = []
+
+    def old_writer():
+        buffers.append(io.StringIO())
+        writer = csv.writer(buffers[-1])
+        writer.writerow(TABLES["atp_utr_tennis_matches"]["columns"])
+        return writer
+    _, old_write, old_peak = write_phase(old_writer)
+    start = time.perf_counter()
+    buffers[-1].seek(0)
+    expected = to_typed(pd.read_csv(buffers[-1]), "atp_utr_tennis_matches")
+    old_read = time.perf_counter() - start
+
+    print(f"{n_rows:,} match rows, batches of {batch_rows:,} (peak = Python heap while writing; pyarrow buffers are not traced)")
+    print(f"  {'StringIO + read_csv':20s}: write {old_write:5.2f}s, read back {old_read:5.2f}s, peak {old_peak / 1e6:7.1f} MB")
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalStore(root)
+        sinks = (("MemorySink", lambda: MemorySink("atp_utr_tennis_matches", batch_rows)),
+                 ("ParquetSink", lambda: ParquetSink(store, "m.parquet", "atp_utr_tennis_matches", batch_rows)),
+                 ("CsvSink", lambda: CsvSink(store, "m.csv", "atp_utr_tennis_matches", batch_rows)))
+        for label, make in sinks:
+            sink, write, peak = write_phase(make)
+            frame, read = timed(sink.frame)
+            # Same values as the CSV round trip (p_win is always a float in a sink)
+            pd.testing.assert_frame_equal(frame.astype(str), expected.astype(str))
+            print(f"  {label:20s}: write {write:5.2f}s, read back {read:5.2f}s, peak {peak / 1e6:7.1f} MB")
+###
+
+
+BENCHMARKS = {
+    'asof_utr': bench_asof_utr,
+    'match_merge': bench_match_merge,
+    'tables': bench_tables,
+    'partitioned_matches': bench_partitioned_matches,
+    'object_store': bench_object_store,
+    'streaming_upload': bench_streaming_upload,
+    'scraper_pool': bench_scraper_pool,
+    'page_waits': bench_page_waits,
+    'api_fetch': bench_api_fetch,
+    'checkpoint_resume': bench_checkpoint_resume,
+    'incremental_scrape': bench_incremental_scrape,
+    'page_parse': bench_page_parse,
+    'log_sink': bench_log_sink,
+    'browser_session': bench_browser_session,
+    'chrome_profiles': bench_chrome_profiles,
+    'record_sinks': bench_record_sinks,
+}
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        print(f"=== {name}")
+        BENCHMARKS[name]()
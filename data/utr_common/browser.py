@@ -0,0 +1,389 @@
+"""
+Chrome sessions for the browser scrapers.
+
+BrowserSession owns the webdriver of one scrape and keeps it usable:
+
+- the cookies of a signed-in driver are saved to the bucket and restored
+  into the next driver (recycled drivers, pool workers, the next run), so
+  the login form is only filled in when they have expired;
+- every page load checks the driver first; a crashed one is replaced (and
+  its session restored) and the page is tried once more;
+- a page that comes back with the login form signs in again and reloads;
+- the driver is replaced every `recycle_pages` pages to cap Chrome's
+  memory growth on long runs.
+
+SCRAPER_CHROME_PROFILE picks the Chrome setup per scraper: "standard" (the
+options the scrapers always used) or "light" (eager page loads, smaller
+window, memory-saving flags, and ad/analytics hosts, web fonts and media
+blocked). Compare them on real pages with
+
+    python -m utr_common.browser compare <url> [<url> ...] [--bucket utr_scraper_bucket] [--ready matches]
+
+The saved cookies sign in as the scraper account: keep them in the
+scraper's own (private) bucket.
+"""
+import json
+import logging
+import os
+import time
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from utr_common.waits import try_wait_for, present, document_ready, session_state, LOGIN_FORM, TOURNAMENT_ITEMS, SHOW_ALL
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = 'https://app.utrsports.net/'
+SESSION_FILE = "sessions/utr_cookies.json"  # saved login cookies, in the scraper's bucket
+
+RECYCLE_PAGES_ENV = "SCRAPER_RECYCLE_PAGES"  # pages per driver before it is replaced ("0" never)
+
+CHROME_PROFILE_ENV = "SCRAPER_CHROME_PROFILE"  # "standard" or "light"
+PROFILES = ("standard", "light")
+
+# Fields webdriver accepts back in add_cookie
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "expiry", "sameSite")
+
+
+def recycle_pages_from_env(default=250):
+    return max(0, int(os.getenv(RECYCLE_PAGES_ENV, default)))
+
+
+def chrome_profile_from_env(default="standard"):
+    profile = os.getenv(CHROME_PROFILE_ENV, default)
+    if profile not in PROFILES:
+        raise ValueError(f"{CHROME_PROFILE_ENV} must be one of {PROFILES}, got {profile!r}")
+    return profile
+
+
+### Light Profile ###
+# Third-party hosts for ads, analytics, session replay, chat widgets and web fonts.
+# The light profile resolves them to nothing, so their requests fail at once
+BLOCKED_HOSTS = (
+    "*.google-analytics.com", "*.googletagmanager.com", "*.doubleclick.net", "*.googlesyndication.com",
+    "*.googleadservices.com", "*.facebook.net", "*.facebook.com", "*.hotjar.com", "*.segment.io", "*.segment.com",
+    "*.intercom.io", "*.intercomcdn.com", "*.fullstory.com", "*.mixpanel.com", "*.amplitude.com", "*.branch.io",
+    "*.clarity.ms", "*.nr-data.net", "*.newrelic.com", "fonts.googleapis.com", "fonts.gstatic.com", "use.typekit.net",
+)
+
+# First-party resources nothing is scraped from, blocked by URL pattern over DevTools. Stylesheets
+# stay: "Show all" must be clickable and the history list grows on scroll, both of which need the layout
+BLOCKED_URLS = ("*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*.ico", "*.mp4", "*.webm", "*.mp3")
+
+LIGHT_ARGS = (
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--renderer-process-limit=2",
+    "--disk-cache-size=1",
+    "--js-flags=--max-old-space-size=512",
+    "--blink-settings=imagesEnabled=false",
+)
+###
+
+
+# Function to get configured Chrome options for headless mode in Docker
+def get_chrome_options(profile="standard"):
+    light = profile == "light"
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    # Still wide enough for the desktop layout (the match lists are hidden below 768px)
+    chrome_options.add_argument("--window-size=1280,800" if light else "--window-size=1920,1080")
+
+    # Add user agent to avoid detection
+    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+
+    # Disable images to save bandwidth and speed up scraping
+    prefs = {"profile.managed_default_content_settings.images": 2}
+    if light:
+        prefs["profile.managed_default_content_settings.notifications"] = 2
+        # get() returns at DOMContentLoaded; the scrapers wait for the elements they need anyway
+        chrome_options.page_load_strategy = "eager"
+        for arg in LIGHT_ARGS:
+            chrome_options.add_argument(arg)
+        chrome_options.add_argument("--host-resolver-rules=" + ", ".join(f"MAP {host} ~NOTFOUND" for host in BLOCKED_HOSTS))
+    chrome_options.add_experimental_option("prefs", prefs)
+
+    logger.info(f"Chrome options configured for headless mode ({profile} profile)")
+    return chrome_options
+
+
+def new_driver(profile="standard", options=get_chrome_options):
+    """Chrome driver with the profile's options (and, for "light", its URL blocklist)."""
+    driver = webdriver.Chrome(options=options(profile))
+    if profile == "light":
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(BLOCKED_URLS)})
+        except Exception as e:
+            logger.warning(f"Could not set the URL blocklist: {str(e)}")
+    return driver
+
+
+def chrome_rss_mb(driver):
+    """
+    Resident memory of chromedriver and every process under it (Chrome, its
+    renderers and helpers), in MB, from Linux /proc. Shared pages count once per process.
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb, stack = 0, [driver.service.process.pid]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                total_kb += next((int(line.split()[1]) for line in f if line.startswith("VmRSS")), 0)
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+class SavedCookies:
+    """Login cookies kept in a store object between drivers and runs."""
+    def __init__(self, store, name=SESSION_FILE):
+        self.store = store
+        self.name = name
+
+    def load(self):
+        try:
+            if not self.store.exists(self.name):
+                return []
+            return json.loads(self.store.read_bytes(self.name))
+        except Exception as e:
+            logger.warning(f"Could not read saved session cookies: {str(e)}")
+            return []
+
+    def save(self, cookies):
+        try:
+            self.store.write_bytes(self.name, json.dumps(cookies), content_type="application/json")
+        except Exception as e:
+            logger.warning(f"Could not save session cookies: {str(e)}")
+
+
+class BrowserSession:
+    """
+    One signed-in Chrome driver at a time. sign_in(driver, url, email,
+    password) fills in the login form; cookies is a SavedCookies or None.
+    """
+    def __init__(self, sign_in, email, password, cookies=None, recycle_pages=None, profile=None, options=get_chrome_options,
+                 url=BASE_URL):
+        self.sign_in = sign_in
+        self.email = email
+        self.password = password
+        self.cookies = cookies
+        self.recycle_pages = recycle_pages_from_env() if recycle_pages is None else recycle_pages
+        self.profile = profile or chrome_profile_from_env()
+        self.options = options
+        self.url = url
+        self.driver = None
+        self.pages = 0  # pages loaded by the current driver
+        self.stats = {"pages": 0, "sign_ins": 0, "restored": 0, "restarts": 0, "recycles": 0}
+
+    ### Driver ###
+    def start(self):
+        """A new driver, signed in from the saved cookies while they are valid, else with the login form."""
+        self.driver = new_driver(self.profile, self.options)
+        self.pages = 0
+        if self._restore():
+            self.stats["restored"] += 1
+            logger.info("Signed in with the saved session cookies")
+        else:
+            self.authenticate()
+        return self.driver
+
+    def alive(self):
+        """Health check: the driver answers a trivial script."""
+        try:
+            return self.driver is not None and self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def restart(self, reason):
+        logger.warning(f"Restarting Chrome driver: {reason}")
+        self.stats["restarts"] += 1
+        self.quit(save=False)
+        return self.start()
+
+    def recycle(self):
+        """Replace a driver that has loaded recycle_pages pages; the new one reuses the session."""
+        logger.info(f"Recycling Chrome driver after {self.pages} pages")
+        self.stats["recycles"] += 1
+        self.quit()
+        return self.start()
+
+    def quit(self, save=True):
+        if self.driver is None:
+            return
+        if save:
+            self._save()
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing Chrome driver: {str(e)}")
+        self.driver = None
+    ###
+
+    ### Session ###
+    def authenticate(self):
+        """Sign in with the login form and save the new session cookies."""
+        self.sign_in(self.driver, self.url, self.email, self.password)
+        self.stats["sign_ins"] += 1
+        self._save()
+
+    def expired(self):
+        """The current page shows the login form (the session is gone)."""
+        try:
+            return bool(self.driver.find_elements(*LOGIN_FORM))
+        except WebDriverException:
+            return False
+
+    def _restore(self):
+        saved = self.cookies.load() if self.cookies else []
+        if not saved:
+            return False
+        try:
+            restore_cookies(self.driver, saved, self.url)
+            self.driver.get(self.url)
+            return try_wait_for(self.driver, "session_restore", session_state) == "in"
+        except WebDriverException as e:
+            logger.warning(f"Could not restore the saved session: {str(e)}")
+            return False
+
+    def _save(self):
+        if self.cookies is None:
+            return
+        try:
+            self.cookies.save(self.driver.get_cookies())
+        except WebDriverException as e:
+            logger.warning(f"Could not read session cookies from the driver: {str(e)}")
+    ###
+
+    ### Pages ###
+    def _get(self, url, ready, step):
+        self.driver.get(url)
+        self.pages += 1
+        self.stats["pages"] += 1
+        if try_wait_for(self.driver, step, present(ready) if ready else document_ready) is None:
+            logger.warning(f"{step}: page not ready within timeout: {url[:60]}...")
+
+    def load(self, url, ready=None, step="page_load"):
+        """
+        Open url in a healthy, signed-in driver and wait until it is loaded and,
+        if given, the `ready` element is present. Returns the driver (which may
+        be a new one); raises if the page fails again after a restart.
+        """
+        if self.driver is None:
+            self.start()
+        elif self.recycle_pages and self.pages >= self.recycle_pages:
+            self.recycle()
+        elif not self.alive():
+            self.restart("driver not responding")
+
+        try:
+            self._get(url, ready, step)
+        except WebDriverException:
+            if self.alive():
+                raise
+            self.restart("driver crashed during page load")
+            self._get(url, ready, step)
+
+        if self.expired():
+            logger.warning("Session expired, signing in again")
+            self.authenticate()
+            self._get(url, ready, step)
+        return self.driver
+    ###
+
+    def log_summary(self):
+        logger.info("browser " + " ".join(f"{k}={v}" for k, v in self.stats.items()))
+
+
+### Profile Comparison ###
+READY_ELEMENTS = {"matches": TOURNAMENT_ITEMS, "history": SHOW_ALL}
+
+
+def restore_cookies(driver, cookies, url=BASE_URL):
+    """Load saved session cookies into a fresh driver (pages then render signed in while they are valid)."""
+    driver.get(url)
+    for cookie in cookies:
+        driver.add_cookie({k: v for k, v in cookie.items() if k in COOKIE_FIELDS})
+
+
+def compare_profiles(urls, profiles=PROFILES, ready=None, cookies=None, repeat=1):
+    """
+    Load every url `repeat` times in a fresh driver per profile. Returns
+    {profile: [(url, load seconds, driver RSS MB after the page), ...]}; a
+    page counts as loaded once the document is ready and, if given, `ready` is present.
+    """
+    results = {}
+    for profile in profiles:
+        driver = new_driver(profile)
+        try:
+            if cookies:
+                restore_cookies(driver, cookies)
+            results[profile] = []
+            for _ in range(repeat):
+                for url in urls:
+                    start = time.perf_counter()
+                    driver.get(url)
+                    try_wait_for(driver, f"compare_{profile}", present(ready) if ready else document_ready)
+                    results[profile].append((url, time.perf_counter() - start, chrome_rss_mb(driver)))
+        finally:
+            driver.quit()
+    return results
+
+
+def comparison_report(results):
+    """Lines of a per-profile summary (load time mean/p90, RSS mean/peak) followed by the per-page numbers."""
+    import numpy as np
+
+    lines = [f"{'profile':10s} {'pages':>5s} {'mean s':>7s} {'p90 s':>7s} {'RSS MB':>7s} {'peak MB':>8s}"]
+    for profile, pages in results.items():
+        seconds, rss = np.array([p[1] for p in pages]), np.array([p[2] for p in pages])
+        lines.append(f"{profile:10s} {len(pages):5d} {seconds.mean():7.2f} {np.percentile(seconds, 90):7.2f} "
+                     f"{rss.mean():7.0f} {rss.max():8.0f}")
+    lines.append("")
+    for profile, pages in results.items():
+        for url, seconds, rss in pages:
+            lines.append(f"{profile:10s} {seconds:6.2f}s {rss:6.0f} MB  {url}")
+    return lines
+###
+
+
+if __name__ == "__main__":
+    import argparse
+    from utr_common.storage import open_bucket
+
+    parser = argparse.ArgumentParser(description="Compare page load time and Chrome memory of the scraping profiles")
+    parser.add_argument("command", choices=["compare"])
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--bucket", help="bucket with saved session cookies, to load the pages signed in")
+    parser.add_argument("--ready", choices=sorted(READY_ELEMENTS), help="element that marks the page as loaded")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=list(PROFILES))
+    args = parser.parse_args()
+
+    saved = SavedCookies(open_bucket(args.bucket)).load() if args.bucket else None
+    results = compare_profiles(args.urls, args.profiles, READY_ELEMENTS.get(args.ready), saved, args.repeat)
+    for line in comparison_report(results):
+        print(line)
@@ -0,0 +1,130 @@
+"""
+Progress ledger for resumable scrape runs.
+
+Each scraping process records, per profile id, whether it finished, how
+many rows it produced and when. Rows are buffered and flushed to the store
+as numbered CSV chunks every `flush_rows` rows or `flush_seconds` seconds;
+the ledger entries of those profiles are written right after their chunk,
+so a profile only counts as done once its rows are durable. After a crash
+the next run skips the done profiles and loses only the unflushed ones.
+
+Every process writes under its own `<prefix>/<writer>/` so pooled workers
+never overwrite each other; readers merge all writers:
+
+    <prefix>/<writer>/ledger.json        {p_id: {"state", "rows", "at", "chunk"}}
+    <prefix>/<writer>/chunk-00001.csv
+"""
+import io
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+RESUME_ENV = "SCRAPER_RESUME"  # "0" starts over even if a checkpoint exists
+LEDGER_FILE = "ledger.json"
+
+DONE = "done"
+FAILED = "failed"
+
+
+def resume_from_env(default=True):
+    return os.getenv(RESUME_ENV, "1" if default else "0") != "0"
+
+
+class ProgressLedger:
+    def __init__(self, store, prefix, columns, flush_rows=5000, flush_seconds=60.0, writer=None):
+        self.store = store
+        self.prefix = prefix.rstrip("/")
+        self.columns = list(columns)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.writer = writer or f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}"
+        self.entries = {}
+        self._pending_rows = []
+        self._pending_entries = {}
+        self._chunks = 0
+        self._last_flush = time.monotonic()
+
+    def _name(self, file):
+        return f"{self.prefix}/{self.writer}/{file}"
+
+    ### Reading ###
+    def _ledgers(self):
+        """{writer: ledger dict} for every writer that has flushed under the prefix."""
+        ledgers = {}
+        for name in self.store.list(self.prefix + "/"):
+            if name.endswith("/" + LEDGER_FILE):
+                writer = name[len(self.prefix) + 1:-len(LEDGER_FILE) - 1]
+                ledgers[writer] = json.loads(self.store.read_bytes(name))
+        return ledgers
+
+    def merged(self):
+        """{p_id: entry (with its writer)} over all writers; the latest entry of a profile wins."""
+        merged = {}
+        for writer, ledger in self._ledgers().items():
+            for p_id, entry in ledger.items():
+                if p_id not in merged or entry["at"] > merged[p_id]["at"]:
+                    merged[p_id] = dict(entry, writer=writer)
+        return merged
+
+    def completed(self):
+        """Profile ids (as ints) already done in this or an earlier run."""
+        return {int(p_id) for p_id, entry in self.merged().items() if entry["state"] == DONE}
+
+    def read_rows(self):
+        """All rows of done profiles, as the scraper produced them (strings), in chunk order."""
+        merged = self.merged()
+        keep = {}
+        for p_id, entry in merged.items():
+            if entry["state"] == DONE and entry.get("chunk"):
+                keep.setdefault(f"{self.prefix}/{entry['writer']}/{entry['chunk']}", set()).add(p_id)
+
+        frames = []
+        for name in sorted(keep):
+            frame = pd.read_csv(io.BytesIO(self.store.read_bytes(name)), dtype=str, keep_default_na=False)
+            frames.append(frame[frame["_p_id"].isin(keep[name])])
+        if not frames:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(frames, ignore_index=True)[self.columns]
+    ###
+
+    ### Writing ###
+    def record(self, p_id, rows, state=DONE):
+        """Queue the rows and state of one profile; flushes when the buffer is full or old enough."""
+        p_id = str(int(p_id))
+        self._pending_rows.extend([p_id] + list(row) for row in rows)
+        self._pending_entries[p_id] = {"state": state, "rows": len(rows),
+                                       "at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+        if len(self._pending_rows) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows as the next chunk, then the ledger entries that point at it."""
+        if not self._pending_entries:
+            return
+        chunk = None
+        if self._pending_rows:
+            self._chunks += 1
+            chunk = f"chunk-{self._chunks:05d}.csv"
+            frame = pd.DataFrame(self._pending_rows, columns=["_p_id"] + self.columns)
+            self.store.write_bytes(self._name(chunk), frame.to_csv(index=False), content_type="text/csv")
+        for entry in self._pending_entries.values():
+            entry["chunk"] = chunk if entry["rows"] else None
+        self.entries.update(self._pending_entries)
+        self.store.write_bytes(self._name(LEDGER_FILE), json.dumps(self.entries), content_type="application/json")
+        logger.info(f"Checkpoint: {len(self._pending_entries)} profiles, {len(self._pending_rows)} rows flushed "
+                    f"({len(self.entries)} profiles in {self.writer})")
+        self._pending_rows, self._pending_entries = [], {}
+        self._last_flush = time.monotonic()
+
+    def clear(self):
+        """Delete every checkpoint under the prefix (after the final table is safely written)."""
+        for name in self.store.list(self.prefix + "/"):
+            self.store.delete(name)
+    ###
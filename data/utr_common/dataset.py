@@ -0,0 +1,185 @@
+"""
+Append-only partitioned table.
+
+Each scrape run writes its new rows as one partition file under
+`<table>/` and records it in `<table>/_manifest.json` (file, format, row
+count, date range). Readers list the partitions from the manifest and fetch
+them in parallel; the row order is the manifest order, so it never changes
+for rows already written. `compact` merges runs of small consecutive
+partitions into one.
+
+    python -m utr_common.dataset compact --bucket matches-scraper-bucket --min-rows 50000
+    python -m utr_common.dataset compact --local ./data-dir --min-rows 50000
+"""
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from utr_common.tables import frame_from_bytes, parquet_available, read_table, write_frame
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "_manifest.json"
+READ_WORKERS = 8
+
+
+class PartitionedDataset:
+    def __init__(self, store, table):
+        self.store = store
+        self.table = table
+
+    def _name(self, file):
+        return f"{self.table}/{file}"
+
+    def manifest(self):
+        """The manifest dict, or None when the table has not been partitioned yet."""
+        if not self.store.exists(self._name(MANIFEST_FILE)):
+            return None
+        return json.loads(self.store.read_bytes(self._name(MANIFEST_FILE)))
+
+    def _write_manifest(self, partitions):
+        manifest = {"table": self.table, "partitions": partitions}
+        self.store.write_bytes(self._name(MANIFEST_FILE), json.dumps(manifest, indent=1), content_type="application/json")
+
+    def _write_partition(self, df, label):
+        fmt = "parquet" if parquet_available() else "csv"
+        file = f"part-{label}.{fmt}"
+        write_frame(self.store, self._name(file), df, self.table, fmt)
+        dates = pd.to_datetime(df["date"], errors="coerce") if "date" in df.columns else pd.Series(dtype="datetime64[ns]")
+        return {
+            "file": file,
+            "format": fmt,
+            "rows": len(df),
+            "min_date": None if dates.isna().all() else dates.min().strftime("%Y-%m-%d"),
+            "max_date": None if dates.isna().all() else dates.max().strftime("%Y-%m-%d"),
+        }
+
+    def _read_partition(self, partition, columns=None):
+        data = self.store.read_bytes(self._name(partition["file"]))
+        return frame_from_bytes(data, self.table, partition["format"], columns)
+
+    def migrate(self):
+        """First partition from the single-file table (`<table>.parquet` / `.csv`) if there is no manifest yet."""
+        if self.manifest() is not None:
+            return False
+        legacy = read_table(self.store, self.table)
+        self._write_manifest([self._write_partition(legacy, "00000-legacy")])
+        logger.info(f"Partitioned {self.table}: {len(legacy)} existing rows in the first partition")
+        return True
+
+    def append(self, df, label=None):
+        """Write `df` as a new partition at the end of the table. Returns the partition entry."""
+        partitions = (self.manifest() or {"partitions": []})["partitions"]
+        label = label or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        entry = self._write_partition(df, label)
+        # The manifest is written after the partition, so readers never see a missing file
+        self._write_manifest(partitions + [entry])
+        return entry
+
+    def read(self, columns=None, start_row=0, max_workers=READ_WORKERS):
+        """
+        Rows from `start_row` on (all by default), reading only the partitions
+        that hold them, in parallel. Without a manifest the single-file table
+        is read instead.
+        """
+        manifest = self.manifest()
+        if manifest is None:
+            return read_table(self.store, self.table, columns).iloc[start_row:].reset_index(drop=True)
+
+        needed, offset = [], 0
+        for partition in manifest["partitions"]:
+            if offset + partition["rows"] > start_row:
+                needed.append((partition, offset))
+            offset += partition["rows"]
+        if not needed:
+            return self._read_partition(manifest["partitions"][-1], columns).iloc[:0]
+
+        first_offset = start_row - needed[0][1]
+        if all(p["format"] == "parquet" for p, _ in needed):
+            # Arrow tables concat without copying and share one dictionary per name column
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            def read_arrow(p):
+                return pq.read_table(io.BytesIO(self.store.read_bytes(self._name(p[0]["file"]))), columns=columns)
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                tables = list(pool.map(read_arrow, needed))
+            tables[0] = tables[0].slice(first_offset)
+            return pa.concat_tables(tables).unify_dictionaries().to_pandas()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(lambda p: self._read_partition(p[0], columns), needed))
+        frames[0] = frames[0].iloc[first_offset:]
+        # Categories differ between partitions; union them so names stay categorical
+        for col in frames[0].columns:
+            if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+                categories = pd.api.types.union_categoricals([f[col] for f in frames]).categories
+                for f in frames:
+                    f[col] = f[col].cat.set_categories(categories)
+        return pd.concat(frames, ignore_index=True)
+
+    def num_rows(self):
+        manifest = self.manifest()
+        return sum(p["rows"] for p in manifest["partitions"]) if manifest else None
+
+    def compact(self, min_rows=50_000):
+        """
+        Merge runs of consecutive partitions until each holds at least
+        `min_rows` rows (the last may hold fewer). Row order is unchanged.
+        Run it while no scraper is appending. Returns (before, after) counts.
+        """
+        partitions = self.manifest()["partitions"]
+        groups, current = [], []
+        for partition in partitions:
+            current.append(partition)
+            if sum(p["rows"] for p in current) >= min_rows:
+                groups.append(current)
+                current = []
+        if current:
+            groups.append(current)
+
+        compacted, obsolete = [], []
+        for group in groups:
+            if len(group) == 1:
+                compacted.append(group[0])
+                continue
+            frames = [self._read_partition(p) for p in group]
+            label = f"{group[0]['file'].split('.')[0][5:]}-compacted"
+            compacted.append(self._write_partition(pd.concat(frames, ignore_index=True), label))
+            obsolete.extend(p["file"] for p in group)
+
+        self._write_manifest(compacted)
+        for file in obsolete:
+            if file not in {p["file"] for p in compacted}:
+                self.store.delete(self._name(file))
+        logger.info(f"Compacted {self.table}: {len(partitions)} -> {len(compacted)} partitions")
+        return len(partitions), len(compacted)
+
+
+if __name__ == "__main__":
+    import argparse
+    from utr_common.storage import LocalStore, open_bucket
+
+    parser = argparse.ArgumentParser(description="Maintain a partitioned table")
+    parser.add_argument("command", choices=["compact", "migrate", "info"])
+    parser.add_argument("--table", default="atp_utr_tennis_matches")
+    parser.add_argument("--bucket", help="GCS bucket holding the table")
+    parser.add_argument("--local", help="local directory holding the table (instead of --bucket)")
+    parser.add_argument("--min-rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = LocalStore(args.local) if args.local else open_bucket(args.bucket)
+
+    dataset = PartitionedDataset(store, args.table)
+    if args.command == "compact":
+        dataset.compact(args.min_rows)
+    elif args.command == "migrate":
+        dataset.migrate()
+    manifest = dataset.manifest()
+    if manifest:
+        print(f"{args.table}: {len(manifest['partitions'])} partitions, {dataset.num_rows():,} rows")
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Columns match_keys needs; reading only these is enough to deduplicate
+MATCH_KEY_COLUMNS = ["date", "p1", "p2", "winner", "score"]
+
+
+def _column_hash(values):
+    """64-bit hash per value; each distinct value is hashed once."""
+    codes, distinct = pd.factorize(values, use_na_sentinel=False)
+    if isinstance(distinct, pd.DatetimeIndex):
+        # Dates hash the same whether read as text (CSV) or as datetimes (Parquet)
+        distinct = distinct.strftime("%Y-%m-%d")
+    return pd.util.hash_array(np.asarray(distinct, dtype=object))[codes]
+
+
+def match_keys(df):
+    """
+    64-bit hash of the canonical key of every match row: date, the two
+    players in sorted order, winner and score.
+
+    Players are ordered by their hash rather than by name, which gives the
+    same key whichever side each player was listed on.
+    """
+    h1, h2 = _column_hash(df["p1"]), _column_hash(df["p2"])
+    parts = [_column_hash(df["date"]), np.minimum(h1, h2), np.maximum(h1, h2),
+             _column_hash(df["winner"]), _column_hash(df["score"])]
+
+    # Fold the column hashes together (FNV-style multiply / xor)
+    keys = np.zeros(len(df), dtype=np.uint64)
+    for part in parts:
+        keys = (keys * np.uint64(0x100000001B3)) ^ part
+    return keys
+
+
+def find_new_matches(master, new):
+    """
+    Boolean mask of the rows of `new` whose match key is not in `master`
+    (anti-join on hashed keys), excluding repeats inside `new` as well.
+    `master` only needs the MATCH_KEY_COLUMNS.
+    """
+    new_keys = pd.Series(match_keys(new))
+    fresh = ~new_keys.isin(match_keys(master)) & ~new_keys.duplicated()
+    return fresh.to_numpy()
+
+
+def merge_new_matches(master, new):
+    """
+    Append the rows of `new` not already in `master` (see find_new_matches)
+    with a single concat.
+
+    Returns (merged, inserted, duplicates).
+    """
+    fresh = find_new_matches(master, new)
+    inserted = int(fresh.sum())
+    if inserted:
+        merged = pd.concat([master, new[fresh]], ignore_index=True)
+    else:
+        merged = master.reset_index(drop=True)
+    return merged, inserted, len(new) - inserted
+
+
+def store_new_matches(dataset, prev_matches, new, known_players):
+    """
+    Append the rows of `new` played between two known players (names in the
+    p1 / p2 'Last F.' format) and not already in `prev_matches` as one
+    partition of `dataset`.
+
+    Returns (stored rows, rows with an unknown player, duplicates, partition entry or None).
+    """
+    known = (new["p1"].isin(known_players) & new["p2"].isin(known_players)).to_numpy()
+    candidates = new[known]
+    fresh = find_new_matches(prev_matches, candidates)
+    stored = candidates[fresh]
+    partition = dataset.append(stored) if len(stored) else None
+    return stored, int((~known).sum()), len(candidates) - len(stored), partition
@@ -0,0 +1,60 @@
+"""
+Model input features, shared by training (model.py) and the UI.
+
+Every feature is a p1-minus-p2 difference, built for all matches (or player
+pairs) at once from a ProfileStore: names are mapped to profile indices
+once, then each column is one array operation. The result is the float32
+matrix the network takes, so training and prediction cannot drift apart.
+"""
+import numpy as np
+import pandas as pd
+
+# Column order of the feature matrix
+FEATURES = ("utr_diff", "win_vs_lower_diff", "win_vs_higher_diff", "recent10_diff", "wvl_utr_diff", "wvh_utr_diff", "h2h_diff")
+N_FEATURES = len(FEATURES)
+
+# Profile features that enter the matrix as a plain p1 - p2 difference
+DIFF_FEATURES = ("win_vs_lower", "win_vs_higher", "recent10", "wvl_utr", "wvh_utr")
+
+
+def player_codes(profiles, names):
+    """Profile indices of an array of player names; KeyError for a name without a profile."""
+    if not isinstance(getattr(names, "dtype", None), pd.CategoricalDtype):
+        return np.fromiter((profiles.index[name] for name in names), dtype=np.int64, count=len(names))
+    # Categorical column: one lookup per distinct name, then a gather through the category codes
+    lookup = np.array([profiles.index.get(name, -1) for name in names.cat.categories], dtype=np.int64)
+    codes = names.cat.codes.to_numpy()
+    codes = np.where(codes < 0, -1, lookup[codes])
+    if (codes < 0).any():
+        raise KeyError(f"no profile for {names.iloc[int(np.argmax(codes < 0))]!r}")
+    return codes
+
+
+def h2h_ratios(profiles, i, j):
+    """Win ratio of players i against players j, 0 for pairs that never met."""
+    wins, totals = profiles.h2h_many(i, j)
+    return wins / np.where(totals == 0, 1, totals)
+
+
+def feature_matrix(profiles, p1, p2, utr_diff=None):
+    """
+    Features of p1 against p2 (arrays of names) as an (n, N_FEATURES) float32
+    matrix. `utr_diff` is the UTR gap at match time; without it (predicting
+    an upcoming match) the gap of the profile UTRs is used.
+    """
+    i = player_codes(profiles, p1)
+    j = player_codes(profiles, p2)
+    f = profiles.features
+
+    X = np.empty((len(i), N_FEATURES), dtype=np.float32)
+    X[:, 0] = f["utr"][i] - f["utr"][j] if utr_diff is None else utr_diff
+    for col, k in enumerate(DIFF_FEATURES, start=1):
+        X[:, col] = f[k][i] - f[k][j]
+    X[:, -1] = h2h_ratios(profiles, i, j) - h2h_ratios(profiles, j, i)
+    return X
+
+
+def match_feature_matrix(matches, profiles):
+    """Training features for every row of the matches frame (UTR gap from the p1_utr / p2_utr columns)."""
+    utr_diff = matches["p1_utr"].to_numpy(dtype=np.float64) - matches["p2_utr"].to_numpy(dtype=np.float64)
+    return feature_matrix(profiles, matches["p1"], matches["p2"], utr_diff)
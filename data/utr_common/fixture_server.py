@@ -0,0 +1,103 @@
+"""
+Local HTTP stand-in for the UTR API, replaying recorded responses.
+
+Responses are keyed by request path and query string. They come from a dict
+({path: payload}) or from a directory of files recorded by api_fetch with
+UTR_API_RECORD_DIR set. An optional per-request latency approximates the
+real API. Point UTR_API_BASE at `server.url` to run the API fetch mode offline:
+
+    python -m utr_common.fixture_server --dir fixtures/ --port 8765 --latency 0.2
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from utr_common.api_fetch import fixture_name
+
+
+def load_fixtures(directory):
+    """{path: raw JSON bytes} for every response recorded in `directory`."""
+    fixtures = {}
+    for file in os.listdir(directory):
+        if file.endswith(".json"):
+            with open(os.path.join(directory, file), "rb") as f:
+                fixtures[unquote(file[:-len(".json")])] = f.read()
+    return fixtures
+
+
+class FixtureServer:
+    """Threaded HTTP server on localhost; use as a context manager or call start()/stop()."""
+    def __init__(self, responses, latency=0.0, port=0):
+        self.responses = {path: body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+                          for path, body in responses.items()}
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so pooled connections are reused
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.responses.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    body = b"{}"
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded UTR API responses")
+    parser.add_argument("--dir", required=True, help="directory recorded with UTR_API_RECORD_DIR")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    server = FixtureServer(load_fixtures(args.dir), latency=args.latency, port=args.port)
+    print(f"Serving {len(server.responses)} recorded responses at {server.url} (set UTR_API_BASE to this)")
+    server.serve_forever()
@@ -0,0 +1,173 @@
+"""
+Per-profile watermarks for incremental scraping.
+
+A watermark file keeps, for every profile id, the newest data already
+stored (latest UTR history date and rating, latest match date) and when
+the profile last changed. In incremental mode the scrapers stop reading a
+profile at the first entry older than its watermark (pages list the newest
+entries first), skip expanding pages whose visible rows already reach it,
+and visit recently active players first.
+
+    {"<p_id>": {"history_date": "2025-03-02", "utr": 12.41, "match_date": "2025-02-27",
+                "changed": "2025-03-03", "checked": "2025-03-03"}}
+"""
+import json
+import logging
+import os
+from datetime import date, datetime
+from functools import lru_cache
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_ENV = "SCRAPER_INCREMENTAL"  # "1" enables change detection
+
+HISTORY_WATERMARKS_FILE = "watermarks/utr_history.json"
+MATCH_WATERMARKS_FILE = "watermarks/matches.json"
+
+
+def incremental_from_env(default=False):
+    return os.getenv(INCREMENTAL_ENV, "1" if default else "0") == "1"
+
+
+@lru_cache(maxsize=4096)
+def _parse_day(text):
+    from dateutil import parser
+    try:
+        return parser.parse(text).date()
+    except (ValueError, OverflowError):
+        return None
+
+
+def to_day(value):
+    """date from a date, datetime or date string as shown on the pages; None if unreadable."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value is None or value != value:
+        return None
+    return _parse_day(str(value).strip())
+
+
+class Watermarks:
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, store, name):
+        """Watermarks saved at `name`; empty (everything is new) if there are none yet."""
+        if not store.exists(name):
+            return cls()
+        return cls(json.loads(store.read_bytes(name)))
+
+    def save(self, store, name):
+        store.write_bytes(name, json.dumps(self.entries), content_type="application/json")
+
+    def mark(self, p_id, field):
+        """Stored day of `field` for a profile, or None."""
+        return to_day((self.entries.get(str(int(p_id))) or {}).get(field))
+
+    def older(self, p_id, field, value):
+        """True when `value` is older than the profile's watermark (already stored; stop reading here)."""
+        mark, day = self.mark(p_id, field), to_day(value)
+        return mark is not None and day is not None and day < mark
+
+    def reached(self, p_id, field, value):
+        """True when `value` is at or before the watermark (everything newer is above it on the page)."""
+        mark, day = self.mark(p_id, field), to_day(value)
+        return mark is not None and day is not None and day <= mark
+
+    def update(self, p_id, today=None, **fields):
+        """Set the profile's fields; `changed` moves to today when any of them differs from before."""
+        today = (today or date.today()).isoformat()
+        entry = self.entries.setdefault(str(int(p_id)), {})
+        if any(entry.get(k) != v for k, v in fields.items() if v is not None):
+            entry["changed"] = today
+        entry.update({k: v for k, v in fields.items() if v is not None})
+        entry["checked"] = today
+
+    def prioritize(self, profile_ids):
+        """
+        profile_ids reordered for scraping: profiles never seen first, then by
+        most recent change (active players before dormant ones). Re-indexed from 0.
+        """
+        keys = profile_ids["p_id"].astype("int64").astype(str)
+        changed = pd.to_datetime(keys.map(lambda k: (self.entries.get(k) or {}).get("changed")), errors="coerce")
+        order = pd.DataFrame({"unseen": ~keys.isin(self.entries), "changed": changed}, index=profile_ids.index)
+        order = order.sort_values(["unseen", "changed"], ascending=False, na_position="last", kind="stable")
+        return profile_ids.loc[order.index].reset_index(drop=True)
+
+
+def latest_per_player(df, name_cols, date_col="date", value_col=None):
+    """
+    {(name parts...): (latest date 'YYYY-MM-DD', value at that date)} from a
+    table, one entry per distinct combination of name_cols.
+    """
+    days = pd.to_datetime(df[date_col], errors="coerce", format="mixed")
+    frame = pd.DataFrame({"day": days, "value": df[value_col] if value_col else None})
+    for col in name_cols:
+        frame[col] = df[col].astype(str).to_numpy()
+    last = frame.dropna(subset=["day"]).sort_values("day", kind="stable").drop_duplicates(list(name_cols), keep="last")
+    return {tuple(row[:-2]): (row[-2].strftime("%Y-%m-%d"), row[-1])
+            for row in last[list(name_cols) + ["day", "value"]].itertuples(index=False, name=None)}
+
+
+def match_watermarks(stored, profile_ids, full_names=()):
+    """
+    {p_id: latest match date} from match rows already stored. Profiles are
+    found in the 'Last F.' p1 / p2 names by their first and last name; a
+    profile whose short name also belongs to another player (of profile_ids
+    or `full_names`) gets no watermark, since its rows cannot be told apart.
+    Returns (watermarks, number of profiles skipped).
+    """
+    from utr_common.page_parse import short_name
+
+    appearances = pd.concat([stored[["p1", "date"]].set_axis(["player", "date"], axis=1),
+                             stored[["p2", "date"]].set_axis(["player", "date"], axis=1)], ignore_index=True)
+    latest = latest_per_player(appearances, ("player",))
+
+    profile_names = (profile_ids["f_name"].astype(str).str.strip() + " " + profile_ids["l_name"].astype(str).str.strip()).tolist()
+    players = set(profile_names) | {str(name).strip() for name in full_names}
+    owners = pd.Series([short_name(name) for name in players]).value_counts()
+
+    marks, skipped = {}, 0
+    for p_id, name in zip(profile_ids["p_id"], profile_names):
+        key = short_name(name)
+        if owners.get(key, 0) > 1:
+            skipped += 1
+        elif (key,) in latest:
+            marks[p_id] = latest[(key,)][0]
+    return marks, skipped
+
+
+def merge_history(previous, new):
+    """
+    The stored UTR history plus the rows of `new` it does not have yet (same
+    player, day and rating), typed like the stored table. Rows are grouped by
+    player, newest first, as the scraper writes them and the UI reads them.
+    """
+    from utr_common.tables import to_typed
+
+    def as_plain(df):
+        df = df.copy()
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(object)
+        return df
+
+    combined = pd.concat([as_plain(previous), as_plain(new)], ignore_index=True)
+    days = pd.to_datetime(combined["date"].astype(str), errors="coerce", format="mixed")
+    keys = pd.DataFrame({
+        "first_name": combined["first_name"].astype(str),
+        "last_name": combined["last_name"].astype(str),
+        "day": days.dt.strftime("%Y-%m-%d").fillna(combined["date"].astype(str)),
+        "utr": pd.to_numeric(combined["utr"], errors="coerce").round(2),
+    })
+    keys = keys[~keys.duplicated(keep="first")]
+    order = keys.sort_values(["first_name", "last_name", "day"], ascending=[True, True, False]).index
+    return to_typed(combined.loc[order].reset_index(drop=True), "utr_history")
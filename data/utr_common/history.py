@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+
+def full_name_key(df, first_col="first_name", last_col="last_name"):
+    """'First Last' key for every row of a UTR history frame, built in one pass."""
+    return df[first_col].astype(str) + " " + df[last_col].astype(str)
+
+
+def latest_utr(df):
+    """
+    Most recent UTR for each player: rows are sorted by (player, date) and
+    the last row of every player is kept. The sort is stable so the later row
+    wins a date tie. Players come out in order of first appearance.
+    """
+    player_codes, players = pd.factorize(full_name_key(df))
+    # Sorting the distinct dates once gives integer ranks, much cheaper to sort than 'YYYY-MM-DD' strings
+    date_codes = pd.factorize(df["date"], sort=True)[0]
+    order = np.lexsort((date_codes, player_codes))
+    last = order[np.cumsum(np.bincount(player_codes, minlength=len(players))) - 1]
+    return dict(zip(players, df["utr"].to_numpy()[last].tolist()))
+
+
+class UtrHistory:
+    """
+    UTR time series of every player as grouped NumPy arrays.
+
+    Rows of player `names[k]` are `utr[indptr[k]:indptr[k + 1]]` (and the same
+    slice of `date`), kept in the order they appear in the history file.
+    """
+    def __init__(self, names, indptr, utr, date):
+        self.names = np.asarray(names, dtype=object)
+        self.index = {name: k for k, name in enumerate(self.names)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.utr = np.asarray(utr, dtype=np.float64)
+        self.date = np.asarray(date, dtype=object)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    @classmethod
+    def from_frame(cls, df):
+        """Group a utr_history.csv frame (first_name, last_name, utr, date) by player."""
+        codes, names = pd.factorize(full_name_key(df))
+        order = np.argsort(codes, kind="stable")
+        indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(names)), out=indptr[1:])
+        return cls(names, indptr, df["utr"].to_numpy(dtype=np.float64)[order], df["date"].to_numpy(dtype=object)[order])
+
+    def series(self, name):
+        """(utr, date) arrays for one player."""
+        k = self.index[name]
+        start, end = self.indptr[k], self.indptr[k + 1]
+        return self.utr[start:end], self.date[start:end]
+
+    def to_general(self):
+        """{player: {'utr': array, 'date': array}} with views into the grouped arrays."""
+        general = {}
+        for name in self.names:
+            utr, date = self.series(name)
+            general[name] = {"utr": utr, "date": date}
+        return general
+
+    def to_lists(self):
+        """{player: [[utr, date], ...]} as the scrapers use it."""
+        utr, date = self.utr.tolist(), self.date.tolist()
+        bounds = self.indptr.tolist()
+        return {name: [[utr[i], date[i]] for i in range(bounds[k], bounds[k + 1])] for k, name in enumerate(self.names)}
+
+
+class AsOfUtrIndex:
+    """
+    Point-in-time UTR lookup for match enrichment.
+
+    Dates are parsed once into day numbers and every player's ratings are
+    sorted by date, so the rating in force on a match date is one binary
+    search. The rule is the one the scrapers used on the newest-first history
+    file: the latest rating dated on or before the match (the one listed first
+    on a date tie), or the player's earliest rating if the match is older than
+    all of them.
+    """
+    def __init__(self, names, indptr, days, utr):
+        self.names = np.asarray(names, dtype=object)
+        self.index = {name: k for k, name in enumerate(self.names)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.days = np.asarray(days, dtype=np.int64)
+        self.utr = np.asarray(utr, dtype=np.float64)
+
+        # One sorted key over all players for the vectorised lookups: player * span + day offset
+        self._base = (self.days.min() if len(self.days) else 0) - 1
+        self._span = (self.days.max() if len(self.days) else 0) - self._base + 2
+        codes = np.repeat(np.arange(len(self.names), dtype=np.int64), np.diff(self.indptr))
+        self._keys = codes * self._span + (self.days - self._base)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build from a utr_history.csv frame; rows with unparseable dates are left out."""
+        return cls.from_history(UtrHistory.from_frame(df))
+
+    @classmethod
+    def from_history(cls, history):
+        """Build from a UtrHistory (file order within each player is kept for date ties)."""
+        # Parse each distinct date string once
+        date_codes, distinct = pd.factorize(history.date)
+        parsed = pd.to_datetime(pd.Series(distinct, dtype=object), format="%Y-%m-%d", errors="coerce")
+        valid = parsed.notna().to_numpy()[date_codes] & (date_codes >= 0)
+        days = parsed.to_numpy().astype("datetime64[D]").astype(np.int64)[date_codes]
+
+        codes = np.repeat(np.arange(len(history.names), dtype=np.int64), np.diff(history.indptr))
+        position = np.arange(len(days))
+        # Ascending date, and for equal dates the row listed first in the file ends up last
+        order = np.lexsort((-position, days, codes))
+        order = order[valid[order]]
+
+        indptr = np.zeros(len(history.names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes[order], minlength=len(history.names)), out=indptr[1:])
+        return cls(history.names, indptr, days[order], history.utr[order])
+
+    @staticmethod
+    def _to_day(value):
+        return np.datetime64(value, "D").astype(np.int64)
+
+    def lookup(self, name, match_date):
+        """UTR of `name` on `match_date` (date, datetime or 'YYYY-MM-DD'). KeyError for unknown players."""
+        k = self.index[name]
+        start, end = self.indptr[k], self.indptr[k + 1]
+        if start == end:
+            raise KeyError(name)
+        pos = np.searchsorted(self.days[start:end], self._to_day(match_date), side="right") - 1
+        return float(self.utr[start + max(pos, 0)])
+
+    def lookup_many(self, names, match_dates):
+        """Vectorised lookup for a batch of matches, NaN where the player is unknown."""
+        codes = pd.Index(self.names).get_indexer(pd.Index(names, dtype=object))
+        days = pd.to_datetime(pd.Series(match_dates), format="mixed").to_numpy().astype("datetime64[D]").astype(np.int64)
+
+        known = codes >= 0
+        known[known] = self.indptr[codes[known] + 1] > self.indptr[codes[known]]
+        out = np.full(len(codes), np.nan)
+        if not known.any():
+            return out
+
+        c = codes[known]
+        offset = np.clip(days[known] - self._base, 0, self._span - 1)
+        pos = np.searchsorted(self._keys, c * self._span + offset, side="right") - 1
+        # Match older than every rating of the player: fall back to their earliest one
+        pos = np.maximum(pos, self.indptr[c])
+        out[known] = self.utr[pos]
+        return out
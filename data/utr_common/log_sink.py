@@ -0,0 +1,142 @@
+"""
+Run logs shipped to the bucket as a series of new objects.
+
+Messages are queued and a background thread writes them out as numbered
+segments, `<prefix>/<run>/segment-000001.log`, whenever a segment reaches
+`max_bytes` or has been open `max_seconds`. Nothing is ever downloaded or
+rewritten, so a write costs the size of the segment only, scraping never
+waits on storage, and runs on different machines write under different
+run ids. Segments that fail to upload are kept and retried.
+
+    python -m utr_common.log_sink list --bucket utr_scraper_bucket
+    python -m utr_common.log_sink merge --bucket utr_scraper_bucket [--run <run id>] [--out run.log]
+"""
+import atexit
+import logging
+import queue
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+LOG_PREFIX = "logs/runs"
+SEGMENT_BYTES = 256 * 1024
+SEGMENT_SECONDS = 30.0
+
+_FLUSH = object()
+_CLOSE = object()
+
+
+def new_run_id():
+    """Sortable id of a run: start time (UTC) and host."""
+    return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{socket.gethostname()}"
+
+
+class LogSink:
+    def __init__(self, store, prefix=LOG_PREFIX, run_id=None, max_bytes=SEGMENT_BYTES, max_seconds=SEGMENT_SECONDS):
+        self.store = store
+        self.prefix = prefix.rstrip("/")
+        self.run_id = run_id or new_run_id()
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.segments = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, message):
+        """Queue one timestamped line; returns immediately."""
+        self._queue.put(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}")
+
+    def flush(self, timeout=30.0):
+        """Write out everything queued so far and wait (up to `timeout` seconds) until it is uploaded."""
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=30.0):
+        if self._thread.is_alive():
+            self._queue.put((_CLOSE, None))
+            self._thread.join(timeout)
+
+    def _segment_name(self, number):
+        return f"{self.prefix}/{self.run_id}/segment-{number:06d}.log"
+
+    def _upload(self, lines):
+        """Write lines as the next segment; False (lines kept for a retry) on failure."""
+        try:
+            self.store.write_bytes(self._segment_name(self.segments + 1), "\n".join(lines) + "\n", content_type="text/plain")
+        except Exception as e:
+            logger.error(f"Error saving log segment to the bucket: {str(e)}")
+            return False
+        self.segments += 1
+        return True
+
+    def _run(self):
+        lines, size, opened = [], 0, None
+        while True:
+            wait = None if opened is None else max(0.0, opened + self.max_seconds - time.monotonic())
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                item = None
+
+            control, event = item if isinstance(item, tuple) else (None, None)
+            if isinstance(item, str):
+                lines.append(item)
+                size += len(item) + 1
+                opened = opened or time.monotonic()
+
+            due = control is not None or size >= self.max_bytes or (opened is not None and time.monotonic() - opened >= self.max_seconds)
+            if lines and due and self._upload(lines):
+                lines, size, opened = [], 0, None
+            elif lines and due:
+                opened = time.monotonic()  # retry after another interval
+            if event is not None:
+                event.set()
+            if control is _CLOSE:
+                return
+
+
+### Reading ###
+def list_runs(store, prefix=LOG_PREFIX):
+    """Run ids with log segments under prefix, oldest first."""
+    prefix = prefix.rstrip("/") + "/"
+    return sorted({name[len(prefix):].split("/", 1)[0] for name in store.list(prefix)})
+
+
+def read_run(store, run_id, prefix=LOG_PREFIX):
+    """All lines of a run as one text, segments in order."""
+    names = store.list(f"{prefix.rstrip('/')}/{run_id}/")
+    return "".join(store.read_bytes(name).decode("utf-8") for name in sorted(names))
+###
+
+
+if __name__ == "__main__":
+    import argparse
+    from utr_common.storage import LocalStore, open_bucket
+
+    parser = argparse.ArgumentParser(description="Read the log segments of scraper runs")
+    parser.add_argument("command", choices=["list", "merge"])
+    parser.add_argument("--bucket", help="GCS bucket holding the logs")
+    parser.add_argument("--local", help="local directory holding the logs (instead of --bucket)")
+    parser.add_argument("--prefix", default=LOG_PREFIX)
+    parser.add_argument("--run", help="run id to merge (default: the latest run)")
+    parser.add_argument("--out", help="file to write the merged log to (default: stdout)")
+    args = parser.parse_args()
+
+    store = LocalStore(args.local) if args.local else open_bucket(args.bucket)
+    runs = list_runs(store, args.prefix)
+    if args.command == "list":
+        for run in runs:
+            print(f"{run}: {len(store.list(f'{args.prefix}/{run}/'))} segments")
+    elif runs or args.run:
+        text = read_run(store, args.run or runs[-1], args.prefix)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(text)
+        else:
+            print(text, end="")
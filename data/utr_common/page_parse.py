@@ -0,0 +1,188 @@
+"""
+HTML extraction for the UTR profile pages, shared by both scrapers.
+
+Pages are parsed with lxml and queried with XPath expressions compiled once
+at import. The selectors match exactly what the BeautifulSoup code matched
+(`class_="a b"` is the whole class attribute, `class_="a"` one of its
+classes), and the extraction functions return typed records:
+
+    parse_history(html)          -> [HistoryEntry(date, utr), ...]
+    parse_matches(html, today)   -> [MatchRecord(...), ...]
+
+Both keep page order (newest first) and skip entries the old code skipped.
+Saved pages for checking the extraction are in utr_common/fixtures/.
+"""
+import logging
+import os
+from datetime import date, datetime
+from typing import NamedTuple, Tuple
+
+from dateutil.relativedelta import relativedelta
+from lxml import etree, html as lxml_html
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _has_class(name):
+    """XPath predicate: `name` is one of the element's classes."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+### Selectors ###
+TOURNAMENTS = etree.XPath(f"//div[{_has_class('eventItem__eventItem__2Xpsd')}]")
+TOURNAMENT_NAME = etree.XPath(".//span[@class='']")
+TOURNAMENT_MATCHES = etree.XPath(".//div[normalize-space(@class)='d-none d-md-block']")
+MATCH_HEADER = etree.XPath(f".//div[{_has_class('scorecard__header__2iDdF')}]")
+WINNER = etree.XPath(".//a[normalize-space(@class)='flex-column player-name winner']")
+PLAYERS = etree.XPath(".//a[normalize-space(@class)='flex-column player-name']")
+SCORE_ITEMS = etree.XPath(f".//div[{_has_class('score-item')}]")
+
+HISTORY_CONTAINER = etree.XPath("//div[normalize-space(@class)='newStatsTabContent__section__1TQzL p0 bg-transparent']")
+HISTORY_ROWS = etree.XPath(f".//div[{_has_class('row')}]")
+HISTORY_RATING = etree.XPath(f".//div[{_has_class('newStatsTabContent__historyItemRating__GQUXw')}]")
+HISTORY_DATE = etree.XPath(f".//div[{_has_class('newStatsTabContent__historyItemDate__jFJyD')}]")
+###
+
+
+### Records ###
+class HistoryEntry(NamedTuple):
+    date: str  # as shown on the page
+    utr: str
+
+
+class MatchRecord(NamedTuple):
+    tournament: str
+    series: str
+    surface: str
+    round: str
+    date: date
+    winner: str  # full names as shown on the page
+    loser: str
+    is_tie: bool
+    sets: Tuple[Tuple[int, int], ...]  # (winner games, loser games) per set
+    score: str
+    winner_games: int
+    loser_games: int
+###
+
+
+def parse_document(page_source):
+    return lxml_html.fromstring(page_source)
+
+
+def _text(elements):
+    return elements[0].text_content() if elements else None
+
+
+### UTR History ###
+def parse_history(page_source):
+    """History entries of a stats page (the header row is skipped), or None without the history section."""
+    root = parse_document(page_source) if isinstance(page_source, (str, bytes)) else page_source
+    containers = HISTORY_CONTAINER(root)
+    if not containers:
+        return None
+    entries = []
+    for row in HISTORY_ROWS(containers[0])[1:]:
+        utr, utr_date = _text(HISTORY_RATING(row)), _text(HISTORY_DATE(row))
+        if utr is None or utr_date is None:
+            continue
+        entries.append(HistoryEntry(utr_date, utr))
+    return entries
+###
+
+
+### Player Matches ###
+def tournament_fields(tourney_name):
+    """(name, series, surface) from an event title, e.g. 'ATP 500 Basel, Switzerland' -> ('Basel', 'ATP 500', 'Hard')."""
+    tourney_name = tourney_name.split(',')[0]
+    if tourney_name == "Wimbledon":
+        return tourney_name, "Grand Slam", "Grass"
+    if tourney_name == "French Open":
+        return tourney_name, "Grand Slam", "Clay"
+    if tourney_name in ("US Open", "Austrlian Open"):
+        return tourney_name, "Grand Slam", "Hard"
+
+    # Titles starting with 'ATP' have the series up to the second space, the name after it
+    slam = ''
+    if tourney_name.startswith('ATP') and len(tourney_name) > 3:
+        second_space = tourney_name.find(' ', 4)
+        if second_space != -1:
+            slam, tourney_name = tourney_name[:second_space], tourney_name[second_space:]
+    if tourney_name[:1] == ' ':
+        tourney_name = tourney_name[1:]
+    return tourney_name, slam, "Hard"
+
+
+def split_header(header, today):
+    """(round, match date) from a scorecard header like 'Singles | Oct 24 | Quarterfinals'."""
+    first, last = header.find('|'), header.rfind('|')
+    round_name = header[last + 2:] if last != -1 else header
+    date_str = header[first + 2:last - 1] if last != first else header[first + 2:len(header) - 1]
+
+    match_date = datetime.strptime(date_str, "%b %d").replace(year=today.year).date()
+    if match_date > today:
+        match_date = match_date - relativedelta(year=today.year - 1)
+    return round_name, match_date
+
+
+def score_sets(items):
+    """(winner, loser) games per set from the score cells: winner row first, one digit per cell (tiebreaks dropped)."""
+    texts = [item.text_content() for item in items]
+    half = len(texts) // 2
+    return tuple((int(texts[k][0]), int(texts[k + half][0])) for k in range(half))
+
+
+def best_of(sets):
+    """3 or 5 from the (winner games, loser games) of each set."""
+    balance = sum(1 if w > l else -1 for w, l in sets)
+    return 3 if len(sets) < 3 or (len(sets) == 3 and abs(balance) == 1) else 5
+
+
+def short_name(full_name):
+    """'Carlos Alcaraz Garfia' -> 'AlcarazGarfia C.' (the name format of the matches table)."""
+    return full_name.partition(' ')[2].replace(' ', '') + ' ' + full_name[0] + '.'
+
+
+def parse_matches(page_source, today=None):
+    """
+    Match records of a results page in page order. Walkovers (no score) and
+    matches whose players or header cannot be read are skipped.
+    """
+    today = today or date.today()
+    root = parse_document(page_source) if isinstance(page_source, (str, bytes)) else page_source
+    records = []
+    for tourney in TOURNAMENTS(root):
+        title = _text(TOURNAMENT_NAME(tourney))
+        if title is None:
+            logger.warning("Could not find tournament name, skipping")
+            continue
+        tourney_name, slam, surface = tournament_fields(title)
+
+        for match in TOURNAMENT_MATCHES(tourney):
+            try:
+                round_name, match_date = split_header(_text(MATCH_HEADER(match)), today)
+
+                winner, is_tie = WINNER(match), False
+                players = PLAYERS(match)
+                if winner and players:
+                    winner_name, loser_name = winner[0].text_content(), players[0].text_content()
+                elif len(players) >= 2:
+                    # College team matches can end tied: neither name is marked as the winner
+                    winner_name, loser_name, is_tie = players[0].text_content(), players[1].text_content(), True
+                else:
+                    continue
+
+                sets = score_sets(SCORE_ITEMS(match))
+                if not sets:
+                    continue
+            except Exception as e:
+                logger.debug(f"Skipping unreadable match: {str(e)}")
+                continue
+
+            records.append(MatchRecord(tourney_name, slam, surface, round_name, match_date, winner_name, loser_name, is_tie,
+                                       sets, ' '.join(f"{w}-{l}" for w, l in sets),
+                                       sum(w for w, _ in sets), sum(l for _, l in sets)))
+    return records
+###
@@ -0,0 +1,346 @@
+import io
+import numpy as np
+import pandas as pd
+
+# Scalar features kept for every player, in the order preprocess_player_data uses them
+PROFILE_FEATURES = ("utr", "win_vs_lower", "win_vs_higher", "recent10", "wvl_utr", "wvh_utr")
+
+
+class ProfileStore:
+    """
+    Columnar player profiles.
+
+    Players are addressed by integer index (`store.index[name]`), every scalar
+    feature is one float64 array and head-to-head records are a CSR matrix
+    (h2h_indptr / h2h_indices with h2h_wins / h2h_totals as the data arrays).
+    """
+    def __init__(self, names, features, h2h_indptr, h2h_indices, h2h_wins, h2h_totals):
+        self.names = np.asarray(names, dtype=object)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.features = {k: np.asarray(features[k], dtype=np.float64) for k in PROFILE_FEATURES}
+        self.h2h_indptr = np.asarray(h2h_indptr, dtype=np.int64)
+        self.h2h_indices = np.asarray(h2h_indices, dtype=np.int32)
+        self.h2h_wins = np.asarray(h2h_wins, dtype=np.int32)
+        self.h2h_totals = np.asarray(h2h_totals, dtype=np.int32)
+
+        # Row-major flat keys are sorted because every CSR row is sorted
+        rows = np.repeat(np.arange(len(self.names), dtype=np.int64), np.diff(self.h2h_indptr))
+        self._h2h_keys = rows * len(self.names) + self.h2h_indices
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    @classmethod
+    def from_arrays(cls, names, features, h2h_rows, h2h_cols, h2h_wins, h2h_totals):
+        """Build a store from coordinate (row, col, wins, total) head-to-head arrays."""
+        h2h_rows = np.asarray(h2h_rows, dtype=np.int64)
+        h2h_cols = np.asarray(h2h_cols, dtype=np.int64)
+        order = np.lexsort((h2h_cols, h2h_rows))
+        indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(h2h_rows, minlength=len(names)), out=indptr[1:])
+        return cls(names, features, indptr, h2h_cols[order],
+                   np.asarray(h2h_wins)[order], np.asarray(h2h_totals)[order])
+
+    @classmethod
+    def from_profiles(cls, profiles):
+        """Convert the dict-of-dicts returned by get_set_player_profiles."""
+        names = list(profiles)
+        index = {name: i for i, name in enumerate(names)}
+        features = {k: [profiles[name][k] for name in names] for k in PROFILE_FEATURES}
+
+        rows, cols, wins, totals = [], [], [], []
+        for name in names:
+            for opponent, record in profiles[name]["h2h"].items():
+                rows.append(index[name])
+                cols.append(index[opponent])
+                wins.append(record[0])
+                totals.append(record[1])
+        return cls.from_arrays(names, features, rows, cols, wins, totals)
+
+    def to_profiles(self):
+        """Back to the dict-of-dicts layout (for comparisons and old call sites)."""
+        profiles = {}
+        for i, name in enumerate(self.names):
+            start, end = self.h2h_indptr[i], self.h2h_indptr[i + 1]
+            profiles[name] = {k: float(self.features[k][i]) for k in PROFILE_FEATURES}
+            profiles[name]["h2h"] = {
+                self.names[j]: [int(w), int(t)]
+                for j, w, t in zip(self.h2h_indices[start:end], self.h2h_wins[start:end], self.h2h_totals[start:end])
+            }
+        return profiles
+
+    def h2h(self, i, j):
+        """(wins, total) of player i against player j, (0, 0) if they never met."""
+        key = i * len(self.names) + j
+        pos = int(np.searchsorted(self._h2h_keys, key))
+        if pos < len(self._h2h_keys) and self._h2h_keys[pos] == key:
+            return int(self.h2h_wins[pos]), int(self.h2h_totals[pos])
+        return 0, 0
+
+    def h2h_many(self, i, j):
+        """Vectorised h2h for index arrays i and j, returns (wins, totals) arrays."""
+        keys = np.asarray(i, dtype=np.int64) * len(self.names) + np.asarray(j, dtype=np.int64)
+        if len(self._h2h_keys) == 0:
+            return np.zeros(len(keys), dtype=np.int32), np.zeros(len(keys), dtype=np.int32)
+        pos = np.minimum(np.searchsorted(self._h2h_keys, keys), len(self._h2h_keys) - 1)
+        found = self._h2h_keys[pos] == keys
+        return np.where(found, self.h2h_wins[pos], 0), np.where(found, self.h2h_totals[pos], 0)
+
+    def h2h_ratio(self, i, j):
+        """Win ratio of i against j with the same 0 wins / 1 match fallback preprocess uses."""
+        wins, total = self.h2h(i, j)
+        return wins / (total if total != 0 else 1)
+
+    def nbytes(self):
+        """Approximate memory held by the arrays (names excluded)."""
+        arrays = list(self.features.values()) + [self.h2h_indptr, self.h2h_indices, self.h2h_wins, self.h2h_totals, self._h2h_keys]
+        return sum(a.nbytes for a in arrays)
+
+
+RECENT_WINDOW = 10
+
+# Profile state saved next to the matches file by the matches pipeline
+PROFILE_STATE_FILE = "player_profiles.npz"
+
+# Columns that identify a match row, used to check the matches file still starts with what was absorbed
+ROW_KEY_COLUMNS = ("date", "p1", "p2", "winner")
+
+# Every matches column the accumulator reads
+PROFILE_MATCH_COLUMNS = ["date", "p1", "p1_utr", "p2", "p2_utr", "winner"]
+
+
+def _interleave(a, b):
+    """[a0, b0, a1, b1, ...] - one row per player per match, p1 first like the loop version."""
+    out = np.empty(2 * len(a), dtype=np.result_type(a, b))
+    out[0::2] = a
+    out[1::2] = b
+    return out
+
+
+def _row_key(matches, i):
+    values = [matches[c].iloc[i] for c in ROW_KEY_COLUMNS if c in matches.columns]
+    # Same key whether the date was read as text (CSV) or as a datetime (Parquet)
+    return "|".join(v.strftime("%Y-%m-%d") if isinstance(v, pd.Timestamp) else str(v) for v in values)
+
+
+class ProfileAccumulator:
+    """
+    Running profile state that absorbs new match rows without replaying history.
+
+    Per player it keeps match counts, win counts and summed beaten-opponent UTR
+    for the lower / higher buckets, a ring buffer with the last RECENT_WINDOW
+    results and the UTR from the first match seen. Head-to-head records are
+    (wins, total) counters keyed by the (player, opponent) index pair. The
+    features are the ones get_set_player_profiles computes; `to_store(history)`
+    turns the sums into a ProfileStore.
+    """
+    _STATE_ARRAYS = ("first_utr", "lower_n", "lower_wins", "lower_utr", "higher_n", "higher_wins",
+                     "higher_utr", "recent", "recent_n", "h2h_keys", "h2h_wins", "h2h_totals")
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self.first_utr = np.zeros(0)
+        self.lower_n = np.zeros(0, dtype=np.int64)
+        self.lower_wins = np.zeros(0, dtype=np.int64)
+        self.lower_utr = np.zeros(0)
+        self.higher_n = np.zeros(0, dtype=np.int64)
+        self.higher_wins = np.zeros(0, dtype=np.int64)
+        self.higher_utr = np.zeros(0)
+        self.recent = np.zeros((0, RECENT_WINDOW), dtype=np.int8)
+        self.recent_n = np.zeros(0, dtype=np.int64)
+        # Sorted (player << 32 | opponent) keys with their counters
+        self.h2h_keys = np.zeros(0, dtype=np.int64)
+        self.h2h_wins = np.zeros(0, dtype=np.int64)
+        self.h2h_totals = np.zeros(0, dtype=np.int64)
+        self.rows_seen = 0
+        self.last_row_key = ""
+
+    def __len__(self):
+        return len(self.names)
+
+    def _add_players(self, names, utrs):
+        """Register unseen players in first-appearance order, returns index codes for every name."""
+        new_utrs = []
+        for name, utr in zip(names, utrs):
+            if name not in self.index:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+                new_utrs.append(utr)
+        self.first_utr = np.concatenate([self.first_utr, new_utrs])
+        grow = len(self.names) - len(self.lower_n)
+        if grow:
+            for attr in ("lower_n", "lower_wins", "lower_utr", "higher_n", "higher_wins", "higher_utr", "recent_n"):
+                current = getattr(self, attr)
+                setattr(self, attr, np.concatenate([current, np.zeros(grow, dtype=current.dtype)]))
+            self.recent = np.concatenate([self.recent, np.zeros((grow, RECENT_WINDOW), dtype=np.int8)])
+        return np.fromiter((self.index[name] for name in names), dtype=np.int64, count=len(names))
+
+    def absorb(self, matches):
+        """Fold new match rows (in match order) into the running state. Returns self."""
+        if len(matches) == 0:
+            return self
+
+        p1 = matches["p1"].to_numpy(dtype=object)
+        p2 = matches["p2"].to_numpy(dtype=object)
+        p1_utr = matches["p1_utr"].to_numpy(dtype=np.float64)
+        p2_utr = matches["p2_utr"].to_numpy(dtype=np.float64)
+        p1_won = matches["winner"].to_numpy(dtype=object) == p1
+
+        # "p1_utr - p2_utr > 0" puts p1 in the lower bucket, anything else (ties, NaN) in higher
+        with np.errstate(invalid="ignore"):
+            p1_lower = (p1_utr - p2_utr) > 0
+
+        won = _interleave(p1_won, ~p1_won)
+        lower = _interleave(p1_lower, ~p1_lower)
+        opp_utr = _interleave(p2_utr, p1_utr)
+
+        # Only unique names go through the Python-level index lookup
+        inverse, uniq = pd.factorize(_interleave(p1, p2))
+        first_seen = np.unique(inverse, return_index=True)[1]
+        codes = self._add_players(list(uniq), _interleave(p1_utr, p2_utr)[first_seen])[inverse]
+        opp_codes = _interleave(codes[1::2], codes[0::2])
+        n = len(self.names)
+
+        # Opponent UTR when the player won, 0 when they lost
+        beaten_utr = np.where(won, opp_utr, 0.0)
+        for mask, prefix in ((lower, "lower"), (~lower, "higher")):
+            getattr(self, prefix + "_n")[:] += np.bincount(codes[mask], minlength=n)
+            getattr(self, prefix + "_wins")[:] += np.bincount(codes[mask], weights=won[mask], minlength=n).astype(np.int64)
+            getattr(self, prefix + "_utr")[:] += np.bincount(codes[mask], weights=beaten_utr[mask], minlength=n)
+
+        # Ring buffer: the k-th new result of a player goes to slot (results so far + k) % window.
+        # Only each player's last `window` new results are written so no slot is written twice.
+        codes_s = pd.Series(codes)
+        nth = codes_s.groupby(codes).cumcount().to_numpy()
+        from_end = codes_s.groupby(codes).cumcount(ascending=False).to_numpy()
+        keep = from_end < RECENT_WINDOW
+        slots = (self.recent_n[codes[keep]] + nth[keep]) % RECENT_WINDOW
+        self.recent[codes[keep], slots] = won[keep]
+        self.recent_n += np.bincount(codes, minlength=n)
+
+        pair_keys, pair_inverse = np.unique((codes << 32) | opp_codes, return_inverse=True)
+        pair_wins = np.bincount(pair_inverse, weights=won, minlength=len(pair_keys)).astype(np.int64)
+        pair_totals = np.bincount(pair_inverse, minlength=len(pair_keys))
+        pos = np.searchsorted(self.h2h_keys, pair_keys)
+        known = pos < len(self.h2h_keys)
+        known[known] = self.h2h_keys[pos[known]] == pair_keys[known]
+        self.h2h_wins[pos[known]] += pair_wins[known]
+        self.h2h_totals[pos[known]] += pair_totals[known]
+        if not known.all():
+            keys = np.concatenate([self.h2h_keys, pair_keys[~known]])
+            order = np.argsort(keys, kind="stable")
+            self.h2h_keys = keys[order]
+            self.h2h_wins = np.concatenate([self.h2h_wins, pair_wins[~known]])[order]
+            self.h2h_totals = np.concatenate([self.h2h_totals, pair_totals[~known]])[order]
+
+        self.rows_seen += len(matches)
+        self.last_row_key = _row_key(matches, len(matches) - 1)
+        return self
+
+    def sync(self, matches, start_row=0):
+        """
+        Bring the state up to date with the matches frame.
+
+        Only rows past `rows_seen` are absorbed. If the frame no longer starts
+        with the rows absorbed so far (rows removed or rewritten), the state is
+        rebuilt from scratch. `matches` may be the tail of the table starting
+        at `start_row` (at most rows_seen - 1, so the last absorbed row can be
+        checked); a tail that cannot be checked raises ValueError. Returns the
+        number of rows absorbed.
+        """
+        if start_row and (start_row > max(self.rows_seen - 1, 0) or not self.rows_seen):
+            raise ValueError(f"matches start at row {start_row}, the state needs rows from {max(self.rows_seen - 1, 0)}")
+        seen = self.rows_seen - start_row
+        if self.rows_seen and (len(matches) < seen or _row_key(matches, seen - 1) != self.last_row_key):
+            if start_row:
+                raise ValueError("matches table changed before the rows given; sync with the full table")
+            self.__init__()
+            seen = 0
+        new_rows = matches.iloc[seen:]
+        self.absorb(new_rows)
+        return len(new_rows)
+
+    def to_store(self, history=None):
+        """ProfileStore with the current features; `history` maps players to their latest UTR."""
+        history = history or {}
+
+        def mean(total, count):
+            return np.divide(total, count, out=np.zeros(len(count)), where=count > 0)
+
+        window = np.minimum(self.recent_n, RECENT_WINDOW)
+        features = {
+            "utr": [history[name] if name in history else self.first_utr[i] for i, name in enumerate(self.names)],
+            "win_vs_lower": mean(self.lower_wins, self.lower_n),
+            "win_vs_higher": mean(self.higher_wins, self.higher_n),
+            "recent10": mean(self.recent.sum(axis=1), window),
+            "wvl_utr": mean(self.lower_utr, self.lower_n),
+            "wvh_utr": mean(self.higher_utr, self.higher_n),
+        }
+        # h2h_keys are sorted by (player, opponent) already, so the CSR arrays need no extra sort
+        indptr = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.h2h_keys >> 32, minlength=len(self.names)), out=indptr[1:])
+        return ProfileStore(self.names, features, indptr, self.h2h_keys & 0xFFFFFFFF, self.h2h_wins, self.h2h_totals)
+
+    def save(self, file):
+        """Write the state as a compressed .npz to a path or binary file object."""
+        np.savez_compressed(file, names=np.array(self.names, dtype=str), rows_seen=self.rows_seen,
+                            last_row_key=self.last_row_key,
+                            **{attr: getattr(self, attr) for attr in self._STATE_ARRAYS})
+
+    @classmethod
+    def load(cls, file):
+        """Read state written by `save`."""
+        acc = cls()
+        with np.load(file) as state:
+            acc.names = state["names"].tolist()
+            acc.index = {name: i for i, name in enumerate(acc.names)}
+            for attr in cls._STATE_ARRAYS:
+                setattr(acc, attr, state[attr])
+            acc.rows_seen = int(state["rows_seen"])
+            acc.last_row_key = str(state["last_row_key"])
+        return acc
+
+
+def download_profile_state(store, file_path=PROFILE_STATE_FILE):
+    """ProfileAccumulator saved in a store, or an empty one if nothing has been saved yet."""
+    if not store.exists(file_path):
+        return ProfileAccumulator()
+    return ProfileAccumulator.load(io.BytesIO(store.read_bytes(file_path)))
+
+
+def upload_profile_state(accumulator, store, file_path=PROFILE_STATE_FILE):
+    """Save a ProfileAccumulator to a store."""
+    buffer = io.BytesIO()
+    accumulator.save(buffer)
+    store.write_bytes(file_path, buffer.getvalue())
+
+
+def sync_with_dataset(accumulator, dataset, columns=PROFILE_MATCH_COLUMNS):
+    """
+    Sync a ProfileAccumulator with a PartitionedDataset, reading only the
+    partitions past the rows already absorbed. Falls back to reading the
+    whole table when the stored state does not match it.
+    """
+    start_row = max(accumulator.rows_seen - 1, 0)
+    if start_row:
+        try:
+            return accumulator.sync(dataset.read(columns=columns, start_row=start_row), start_row=start_row)
+        except ValueError:
+            pass
+    return accumulator.sync(dataset.read(columns=columns))
+
+
+def build_profile_store(matches, history):
+    """
+    Vectorised get_set_player_profiles: the same features computed with
+    whole-column operations over the matches frame, returned as a ProfileStore.
+
+    Every match is expanded into two "perspective" rows (player, opponent),
+    then win_vs_lower / win_vs_higher, wvl_utr / wvh_utr, the last-10 form and
+    head-to-head counts are per-player (or per-pair) sums and counts.
+    """
+    return ProfileAccumulator().absorb(matches).to_store(history)
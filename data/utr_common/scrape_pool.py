@@ -0,0 +1,78 @@
+"""
+Worker pool for the browser scrapers.
+
+The profile list is split into contiguous shards and each shard is scraped
+by its own process with its own signed-in browser session. Results come
+back per shard and are merged in shard order, so the output has the same
+rows in the same order as a single sequential run.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Number of browser sessions (processes) and minimum seconds between page loads per session
+WORKERS_ENV = "SCRAPER_WORKERS"
+PAGE_INTERVAL_ENV = "SCRAPER_PAGE_INTERVAL"
+
+
+def workers_from_env(default=1):
+    return max(1, int(os.getenv(WORKERS_ENV, default)))
+
+
+def page_interval_from_env(default=0.0):
+    return float(os.getenv(PAGE_INTERVAL_ENV, default))
+
+
+class RateLimiter:
+    """Spaces calls to wait() at least `min_interval` seconds apart."""
+    def __init__(self, min_interval=0.0):
+        self.min_interval = min_interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def shard(profile_ids, n_shards):
+    """Contiguous shards of the profile frame, each re-indexed from 0 (the scrapers index by position)."""
+    n_shards = max(1, min(n_shards, len(profile_ids)))
+    bounds = np.linspace(0, len(profile_ids), n_shards + 1).astype(int)
+    return [profile_ids.iloc[bounds[k]:bounds[k + 1]].reset_index(drop=True) for k in range(n_shards)]
+
+
+def run_sharded(worker, profile_ids, n_workers, *args, max_concurrency=None, start_stagger=0.0, **kwargs):
+    """
+    Call worker(shard, *args, **kwargs) for n_workers shards of profile_ids,
+    at most max_concurrency at a time (default: all), and return the shard
+    results in shard order. Worker k starts k * start_stagger seconds late so
+    the sessions do not all sign in at once. One worker runs in-process.
+    """
+    shards = shard(profile_ids, n_workers)
+    if len(shards) == 1:
+        return [worker(shards[0], *args, **kwargs)]
+
+    concurrency = min(max_concurrency or len(shards), len(shards))
+    logger.info(f"Scraping {len(profile_ids)} profiles in {len(shards)} shards, {concurrency} browser sessions at a time")
+    with ProcessPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_staggered, worker, k * start_stagger if k < concurrency else 0.0, part, args, kwargs)
+                   for k, part in enumerate(shards)]
+        return [future.result() for future in futures]
+
+
+def _staggered(worker, delay, part, args, kwargs):
+    time.sleep(delay)
+    return worker(part, *args, **kwargs)
@@ -0,0 +1,145 @@
+"""
+Record sinks the scrapers emit their rows into.
+
+A sink takes the rows of one table (matches or UTR history, in the table's
+column order) through `writerow`, like the csv.writer it replaces, and
+turns every `batch_rows` rows into a frame for its backend:
+
+    MemorySink    keeps the batches in memory (pool workers, small runs)
+    ParquetSink   appends each batch as a typed row group to a Parquet object
+    CsvSink       appends each batch to a CSV object
+
+The file sinks hold one batch at a time, so memory stays bounded however
+many rows a run produces. `frame()` returns everything written as a typed
+table; from Parquet that is a plain read, no text is parsed again.
+"""
+import logging
+
+import pandas as pd
+
+from utr_common.tables import TABLES, TableWriter, frame_from_bytes, parquet_available, to_typed
+
+logger = logging.getLogger(__name__)
+
+BATCH_ROWS = 10_000
+
+# Fixed dtypes of the numeric columns tables.to_typed leaves alone, so every batch has the same dtypes
+BATCH_DTYPES = {table: {col: kind for col, kind in spec["types"].items() if kind != "string"} for table, spec in TABLES.items()}
+
+
+class RecordSink:
+    def __init__(self, table, batch_rows=BATCH_ROWS):
+        self.table = table
+        self.columns = list(TABLES[table]["columns"])
+        self.batch_rows = batch_rows
+        self.dtypes = BATCH_DTYPES.get(table, {})
+        self.rows = 0
+        self._batch = []
+
+    def writerow(self, row):
+        """Add one row (a sequence in column order); a full batch goes to the backend."""
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_rows:
+            self.flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def write_frame(self, df):
+        """Add a frame of rows at once (e.g. the output of a pool worker), after the rows queued so far."""
+        self.flush()
+        if len(df):
+            self._write(df[self.columns].astype(self.dtypes))
+            self.rows += len(df)
+
+    def flush(self):
+        if self._batch:
+            self._write(pd.DataFrame(self._batch, columns=self.columns).astype(self.dtypes))
+            self.rows += len(self._batch)
+            self._batch = []
+
+    def frame(self):
+        """Everything written so far as one typed frame (a file sink is closed by it)."""
+        self.flush()
+        return self._read()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write(self, df):
+        raise NotImplementedError
+
+    def _read(self):
+        raise NotImplementedError
+
+
+class MemorySink(RecordSink):
+    def __init__(self, table, batch_rows=BATCH_ROWS):
+        super().__init__(table, batch_rows)
+        self._frames = []
+
+    def _write(self, df):
+        self._frames.append(df)
+
+    def _read(self):
+        if not self._frames:
+            return to_typed(pd.DataFrame(columns=self.columns), self.table)
+        # Typed once over all batches, so every category column has one set of categories
+        return to_typed(pd.concat(self._frames, ignore_index=True), self.table)
+
+
+class _FileSink(RecordSink):
+    fmt = None
+
+    def __init__(self, store, name, table, batch_rows=BATCH_ROWS):
+        super().__init__(table, batch_rows)
+        self.store = store
+        self.name = name
+        self._writer = None
+        self._closed = False
+
+    def _write(self, df):
+        if self._writer is None:
+            # Schema from the table's fixed types (tables.arrow_schema), not from an empty slice of the batch
+            self._writer = TableWriter(self.store, self.name, self.table, self.fmt)
+        self._writer.write(df)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        if self._writer is None:
+            # No rows: still leave a readable object with the table's columns
+            self._write(pd.DataFrame(columns=self.columns).astype(self.dtypes))
+        self._writer.close()
+        self._closed = True
+
+    def _read(self):
+        self.close()
+        return frame_from_bytes(self.store.read_bytes(self.name), self.table, self.fmt)
+
+
+class ParquetSink(_FileSink):
+    fmt = "parquet"
+
+    def _read(self):
+        return to_typed(super()._read(), self.table)
+
+
+class CsvSink(_FileSink):
+    fmt = "csv"
+
+
+def file_sink(store, name, table, batch_rows=BATCH_ROWS):
+    """ParquetSink writing `name`.parquet, or CsvSink writing `name`.csv when pyarrow is not installed."""
+    if parquet_available():
+        return ParquetSink(store, f"{name}.parquet", table, batch_rows)
+    logger.warning("pyarrow is not installed, scraped rows are buffered as CSV")
+    return CsvSink(store, f"{name}.csv", table, batch_rows)
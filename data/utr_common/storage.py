@@ -0,0 +1,225 @@
+"""
+Object storage used by every pipeline stage.
+
+`open_bucket(name)` returns a store for a bucket; all stores have the same
+methods (exists, read_bytes with optional byte range, write_bytes, streaming
+open_read / open_write, list, size, delete, upload_file / download_file).
+The backend is chosen by the UTR_STORAGE environment variable:
+
+    gcs (default)      Google Cloud Storage, one shared client per credentials
+    local:<directory>  files under <directory>/<bucket>/ (offline runs)
+    memory             process-local dicts (tests and benchmarks)
+"""
+import io
+import os
+import threading
+
+STORAGE_ENV = "UTR_STORAGE"
+
+# Streaming uploads to GCS go out as resumable-upload chunks of this size (multiple of 256 KB)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(credentials_dict=None):
+    """
+    storage.Client for a service-account dict (default credentials if None),
+    created once per process and reused; clients are thread-safe.
+    """
+    key = (credentials_dict or {}).get("client_email", "default")
+    with _clients_lock:
+        if key not in _clients:
+            from google.cloud import storage
+            if credentials_dict is None:
+                _clients[key] = storage.Client()
+            else:
+                from google.oauth2 import service_account
+                credentials = service_account.Credentials.from_service_account_info(credentials_dict)
+                _clients[key] = storage.Client(credentials=credentials, project=credentials_dict["project_id"])
+        return _clients[key]
+
+
+def open_bucket(bucket_name, credentials_dict=None, backend=None):
+    """Store for `bucket_name` on the configured backend (see module docstring)."""
+    backend = backend or os.getenv(STORAGE_ENV, "gcs")
+    if backend.startswith("local:"):
+        return LocalStore(os.path.join(backend[len("local:"):], bucket_name))
+    if backend == "memory":
+        return MemoryStore.named(bucket_name)
+    if backend != "gcs":
+        raise ValueError(f"Unknown {STORAGE_ENV} backend: {backend}")
+    return GCSStore(get_client(credentials_dict).bucket(bucket_name))
+
+
+def read_csv(store, name, **kwargs):
+    """pandas DataFrame from a CSV object, streamed rather than downloaded whole."""
+    import pandas as pd
+    with store.open_read(name) as f:
+        return pd.read_csv(f, **kwargs)
+
+
+class GCSStore:
+    """Objects in a Google Cloud Storage bucket."""
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def exists(self, name):
+        return self.bucket.blob(name).exists()
+
+    def read_bytes(self, name, start=None, end=None):
+        """Whole object, or bytes [start, end) of it."""
+        # GCS ranges include the end byte
+        return self.bucket.blob(name).download_as_bytes(start=start, end=None if end is None else end - 1)
+
+    def write_bytes(self, name, data, content_type="application/octet-stream"):
+        self.bucket.blob(name).upload_from_string(data, content_type=content_type)
+
+    def open_read(self, name):
+        return self.bucket.blob(name).open("rb")
+
+    def open_write(self, name, content_type="application/octet-stream"):
+        """Writable binary file; the object is sent as a resumable upload in UPLOAD_CHUNK_SIZE chunks."""
+        return self.bucket.blob(name).open("wb", chunk_size=UPLOAD_CHUNK_SIZE, content_type=content_type, ignore_flush=True)
+
+    def upload_file(self, name, path, content_type=None):
+        self.bucket.blob(name).upload_from_filename(path, content_type=content_type)
+
+    def download_file(self, name, path):
+        self.bucket.blob(name).download_to_filename(path)
+
+    def list(self, prefix=""):
+        return sorted(blob.name for blob in self.bucket.list_blobs(prefix=prefix))
+
+    def size(self, name):
+        blob = self.bucket.get_blob(name)
+        return blob.size if blob is not None else None
+
+    def delete(self, name):
+        self.bucket.blob(name).delete()
+
+
+class LocalStore:
+    """Objects as files under a local directory (offline runs and benchmarks)."""
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def exists(self, name):
+        return os.path.exists(self._path(name))
+
+    def read_bytes(self, name, start=None, end=None):
+        with open(self._path(name), "rb") as f:
+            f.seek(start or 0)
+            return f.read() if end is None else f.read(end - (start or 0))
+
+    def write_bytes(self, name, data, content_type=None):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self.open_write(name) as f:
+            f.write(data)
+
+    def open_read(self, name):
+        return open(self._path(name), "rb")
+
+    def open_write(self, name, content_type=None):
+        """Writable binary file; the object only appears (atomically) once it is closed."""
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return _LocalWriter(path)
+
+    def upload_file(self, name, path, content_type=None):
+        with open(path, "rb") as src, self.open_write(name) as dst:
+            while chunk := src.read(1 << 20):
+                dst.write(chunk)
+
+    def download_file(self, name, path):
+        with self.open_read(name) as src, open(path, "wb") as dst:
+            while chunk := src.read(1 << 20):
+                dst.write(chunk)
+
+    def list(self, prefix=""):
+        names = []
+        for dirpath, _, files in os.walk(self.root):
+            for file in files:
+                name = os.path.relpath(os.path.join(dirpath, file), self.root).replace(os.sep, "/")
+                if name.startswith(prefix) and not name.endswith(".tmp"):
+                    names.append(name)
+        return sorted(names)
+
+    def size(self, name):
+        return os.path.getsize(self._path(name)) if self.exists(name) else None
+
+    def delete(self, name):
+        os.remove(self._path(name))
+
+
+class _LocalWriter(io.FileIO):
+    """File written as <path>.tmp and renamed over <path> on close."""
+    def __init__(self, path):
+        self._final_path = path
+        super().__init__(path + ".tmp", "wb")
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            os.replace(self._final_path + ".tmp", self._final_path)
+
+
+class _CommitOnClose(io.BytesIO):
+    """In-memory write buffer handed to `commit` when closed."""
+    def __init__(self, commit):
+        super().__init__()
+        self._commit = commit
+
+    def close(self):
+        if not self.closed:
+            self._commit(self.getvalue())
+        super().close()
+
+
+class MemoryStore:
+    """Objects in a dict; `named` gives every caller in the process the same bucket."""
+    _buckets = {}
+
+    def __init__(self):
+        self.objects = {}
+
+    @classmethod
+    def named(cls, bucket_name):
+        return cls._buckets.setdefault(bucket_name, cls())
+
+    def exists(self, name):
+        return name in self.objects
+
+    def read_bytes(self, name, start=None, end=None):
+        return self.objects[name][start:end]
+
+    def write_bytes(self, name, data, content_type=None):
+        self.objects[name] = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+
+    def open_read(self, name):
+        return io.BytesIO(self.objects[name])
+
+    def open_write(self, name, content_type=None):
+        return _CommitOnClose(lambda data: self.write_bytes(name, data))
+
+    def upload_file(self, name, path, content_type=None):
+        with open(path, "rb") as f:
+            self.write_bytes(name, f.read())
+
+    def download_file(self, name, path):
+        with open(path, "wb") as f:
+            f.write(self.objects[name])
+
+    def list(self, prefix=""):
+        return sorted(name for name in self.objects if name.startswith(prefix))
+
+    def size(self, name):
+        return len(self.objects[name]) if name in self.objects else None
+
+    def delete(self, name):
+        del self.objects[name]
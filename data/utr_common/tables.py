@@ -0,0 +1,190 @@
+"""
+Typed table storage for the matches file and UTR history.
+
+Tables are written as Parquet (player names as categoricals, dates as real
+datetime columns) next to the CSV the older readers use. Readers load only the
+columns they ask for from Parquet, and fall back to the CSV when there is no
+Parquet copy yet or pyarrow is not installed.
+"""
+import io
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TABLES = {
+    "atp_utr_tennis_matches": {
+        "columns": ("tournament", "date", "series", "court", "surface", "round", "best_of", "p1", "p1_utr", "p2", "p2_utr",
+                    "winner", "p1_games", "p2_games", "score", "p_win"),
+        "categories": ("tournament", "series", "court", "surface", "round", "p1", "p2", "winner"),
+        "dates": ("date",),
+        "numbers": ("p1_utr", "p2_utr"),
+        # Fixed types of the remaining columns (p_win is 0.5 for a tied college match)
+        "types": {"best_of": "int64", "p1_games": "int64", "p2_games": "int64", "score": "string", "p_win": "float64"},
+    },
+    "utr_history": {
+        "columns": ("first_name", "last_name", "date", "utr"),
+        "categories": ("first_name", "last_name"),
+        "dates": ("date",),
+        "numbers": ("utr",),
+        "types": {},
+    },
+}
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# Rows per Parquet row group / CSV block when streaming a table to a store
+CHUNK_ROWS = 100_000
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def to_typed(df, table):
+    """Categorical names, datetime dates and numeric ratings for the columns of `table` present in df."""
+    spec = TABLES[table]
+    df = df.copy()
+    for col in spec["categories"]:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in spec["dates"]:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            try:
+                df[col] = pd.to_datetime(df[col], format=DATE_FORMAT)
+            except (ValueError, TypeError):
+                # Leave unexpected date formats as they are rather than losing them
+                logger.warning(f"{table}.{col} is not all {DATE_FORMAT}, kept as text")
+    for col in spec["numbers"]:
+        if col in df.columns and not pd.api.types.is_float_dtype(df[col]):
+            try:
+                df[col] = pd.to_numeric(df[col]).astype("float64")
+            except (ValueError, TypeError):
+                logger.warning(f"{table}.{col} has non-numeric values, kept as text")
+    return df
+
+
+def arrow_schema(table, inferred):
+    """
+    Parquet schema of `table`: the fixed type of every column the table
+    defines (names as int32 dictionaries, dates as timestamps, ratings as
+    float64, the rest from "types"), and the type pyarrow inferred for any
+    other column. Never taken from the data alone: an empty or all-text
+    batch would give null or int64 columns the later batches cannot be cast to.
+    """
+    import pyarrow as pa
+
+    spec = TABLES[table]
+    fixed = {"int64": pa.int64(), "float64": pa.float64(), "string": pa.string()}
+    fields = []
+    for f in inferred:
+        if f.name in spec["categories"]:
+            kind = pa.dictionary(pa.int32(), pa.string())
+        elif f.name in spec["dates"] and (pa.types.is_timestamp(f.type) or pa.types.is_null(f.type)):
+            kind = pa.timestamp("ns")
+        elif f.name in spec["numbers"] and not pa.types.is_string(f.type):
+            kind = pa.float64()
+        elif f.name in spec["types"]:
+            kind = fixed[spec["types"][f.name]]
+        else:
+            # Dates or ratings kept as text by to_typed, or a column the table does not define
+            kind = pa.string() if pa.types.is_null(f.type) or pa.types.is_large_string(f.type) else f.type
+        fields.append(pa.field(f.name, kind))
+    # No pandas metadata: it records the dtypes of the frame inferred from, which read_parquet would restore
+    return pa.schema(fields)
+
+
+class TableWriter:
+    """
+    Streams frames of `table` into one store object as they arrive: each
+    write() becomes a Parquet row group (typed) or a block of CSV rows, and
+    the store uploads the bytes in chunks, so memory stays at one chunk
+    whatever the total size. Use as a context manager; the object is complete
+    once closed.
+
+    The Parquet schema is the table's fixed schema (arrow_schema) for the
+    columns of the first write, or of `like` if given.
+    """
+    def __init__(self, store, name, table, fmt="parquet", like=None):
+        self.table = table
+        self.fmt = fmt
+        self.like = like
+        self.rows = 0
+        content_type = "text/csv" if fmt == "csv" else "application/octet-stream"
+        self._file = store.open_write(name, content_type=content_type)
+        self._text = io.TextIOWrapper(self._file, encoding="utf-8", newline="") if fmt == "csv" else None
+        self._parquet = None
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self._text, index=False, header=self.rows == 0, date_format=DATE_FORMAT)
+        else:
+            self._write_row_group(df)
+        self.rows += len(df)
+
+    def _write_row_group(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        chunk = pa.Table.from_pandas(to_typed(df, self.table), preserve_index=False)
+        if self._parquet is None:
+            like = chunk.schema if self.like is None else pa.Schema.from_pandas(to_typed(self.like, self.table), preserve_index=False)
+            self._schema = arrow_schema(self.table, like)
+            self._parquet = pq.ParquetWriter(self._file, self._schema)
+        self._parquet.write_table(chunk.cast(self._schema))
+
+    def close(self):
+        if self.fmt == "csv":
+            self._text.close()
+            return
+        if self._parquet is None:
+            # No rows written: still leave a readable (empty) file
+            self._write_row_group(pd.DataFrame())
+        self._parquet.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_frame(store, name, df, table, fmt="parquet", chunk_rows=CHUNK_ROWS):
+    """Stream a frame of `table` to `name` in chunks of chunk_rows rows."""
+    with TableWriter(store, name, table, fmt) as writer:
+        for start in range(0, len(df), chunk_rows):
+            writer.write(df.iloc[start:start + chunk_rows])
+        if len(df) == 0:
+            writer.write(df)
+
+
+def frame_from_bytes(data, table, fmt="parquet", columns=None):
+    """Frame from a Parquet or CSV object; CSV input is typed the same way Parquet was written."""
+    if fmt == "parquet":
+        return pd.read_parquet(io.BytesIO(data), columns=columns)
+    return to_typed(pd.read_csv(io.BytesIO(data), usecols=columns), table)
+
+
+def write_table(store, table, df, keep_csv=True):
+    """Write `table` as Parquet (when pyarrow is available) and, unless keep_csv is False, as CSV."""
+    written = []
+    if parquet_available():
+        write_frame(store, f"{table}.parquet", df, table, "parquet")
+        written.append(f"{table}.parquet")
+    if keep_csv or not written:
+        write_frame(store, f"{table}.csv", df, table, "csv")
+        written.append(f"{table}.csv")
+    return written
+
+
+def read_table(store, table, columns=None):
+    """Load `table` (only `columns`, if given) as a typed DataFrame, from Parquet or else the CSV."""
+    if parquet_available() and store.exists(f"{table}.parquet"):
+        return frame_from_bytes(store.read_bytes(f"{table}.parquet"), table, "parquet", columns)
+    return frame_from_bytes(store.read_bytes(f"{table}.csv"), table, "csv", columns)
@@ -0,0 +1,156 @@
+"""
+Condition-based waits for the Selenium scrapers.
+
+Each scraping step waits for the DOM element it actually needs instead of
+sleeping a fixed time. Every step keeps its recent latencies: the timeout
+for the next wait is a multiple of the observed 90th percentile (within
+[min, max] bounds), and the latencies are bucketed into a histogram that
+the scrapers log at the end of a run.
+"""
+import bisect
+import logging
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+### Page Elements ###
+LOGIN_FORM = (By.ID, "emailInput")
+TOURNAMENT_ITEMS = (By.CSS_SELECTOR, "div.eventItem__eventItem__2Xpsd")
+HISTORY_CONTAINER = (By.CSS_SELECTOR, "div.newStatsTabContent__section__1TQzL")
+HISTORY_ROWS = (By.CSS_SELECTOR, "div.newStatsTabContent__section__1TQzL div.row")
+HISTORY_DATES = (By.CSS_SELECTOR, "div.newStatsTabContent__historyItemDate__jFJyD")
+SHOW_ALL = (By.LINK_TEXT, "Show all")
+###
+
+# Histogram bucket upper bounds in seconds (the last bucket is open-ended)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+
+POLL_SECONDS = 0.1
+
+
+class StepTimeouts:
+    """
+    Adaptive timeout and latency record for each named step. `bounds` maps a
+    step to its own (default, minimum, maximum) timeouts.
+    """
+    def __init__(self, default=10.0, minimum=1.0, maximum=30.0, factor=3.0, window=50, bounds=None):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.bounds = bounds or {}
+        self.recent = defaultdict(lambda: deque(maxlen=window))
+        self.counts = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self.timeouts = defaultdict(int)
+        self.total = defaultdict(float)
+
+    def timeout(self, step):
+        default, minimum, maximum = self.bounds.get(step, (self.default, self.minimum, self.maximum))
+        recent = self.recent[step]
+        if len(recent) < 5:
+            return default
+        return float(np.clip(self.factor * np.percentile(recent, 90), minimum, maximum))
+
+    def record(self, step, seconds, ok=True):
+        self.counts[step][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total[step] += seconds
+        if ok:
+            self.recent[step].append(seconds)
+        else:
+            self.timeouts[step] += 1
+
+    def summary(self):
+        """One line per step: count, timeouts, mean and the latency histogram."""
+        labels = [f"<={b:g}s" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]:g}s"]
+        lines = []
+        for step, counts in sorted(self.counts.items()):
+            n = sum(counts)
+            histogram = " ".join(f"{label}:{c}" for label, c in zip(labels, counts) if c)
+            lines.append(f"{step}: n={n} timeouts={self.timeouts[step]} mean={self.total[step] / n:.2f}s "
+                         f"next_timeout={self.timeout(step):.1f}s [{histogram}]")
+        return lines
+
+
+# Shared by all waits in a scraper process. Scrolling and the "Show all" expansion
+# often end with nothing new to wait for, so their timeouts stay short
+STEP_TIMEOUTS = StepTimeouts(bounds={"scroll": (1.0, 0.25, 3.0), "history_rows": (3.0, 0.5, 6.0)})
+
+
+def wait_for(driver, step, condition, timeout=None, timeouts=STEP_TIMEOUTS):
+    """
+    Block until condition(driver) is truthy and return its value, or raise
+    TimeoutException after the step's adaptive timeout. Records the latency.
+    """
+    timeout = timeout or timeouts.timeout(step)
+    start = time.perf_counter()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=POLL_SECONDS).until(condition)
+    except TimeoutException:
+        timeouts.record(step, time.perf_counter() - start, ok=False)
+        raise
+    timeouts.record(step, time.perf_counter() - start)
+    return result
+
+
+def try_wait_for(driver, step, condition, timeout=None, timeouts=STEP_TIMEOUTS):
+    """wait_for that returns None instead of raising on timeout."""
+    try:
+        return wait_for(driver, step, condition, timeout, timeouts)
+    except TimeoutException:
+        return None
+
+
+### Conditions ###
+def document_ready(driver):
+    """DOM parsed. With the eager page-load strategy the scrapers stop waiting for subresources here."""
+    return driver.execute_script("return document.readyState") in ("interactive", "complete")
+
+
+def present(locator):
+    """Document loaded and at least one element matching locator present."""
+    def condition(driver):
+        return document_ready(driver) and EC.presence_of_element_located(locator)(driver)
+    return condition
+
+
+def signed_in(driver):
+    """Login form gone or a post-login marker on the page."""
+    return not driver.find_elements(*LOGIN_FORM) or "Sign Out" in driver.page_source
+
+
+def session_state(driver):
+    """'out' once the login form shows, 'in' once a post-login marker does, False while neither has rendered."""
+    if driver.find_elements(*LOGIN_FORM):
+        return "out"
+    if not document_ready(driver):
+        return False
+    source = driver.page_source
+    return "in" if "Sign Out" in source or "My Account" in source else False
+
+
+def height_changed(previous_height):
+    """Page grew past previous_height (lazy-loaded content arrived after a scroll)."""
+    def condition(driver):
+        height = driver.execute_script("return document.body.scrollHeight")
+        return height if height != previous_height else False
+    return condition
+
+
+def more_than(locator, count):
+    """More than `count` elements match locator (e.g. rows added after "Show all")."""
+    def condition(driver):
+        return len(driver.find_elements(*locator)) > count
+    return condition
+###
+
+
+def log_wait_summary():
+    for line in STEP_TIMEOUTS.summary():
+        logger.info(f"wait {line}")
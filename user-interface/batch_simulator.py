@@ -0,0 +1,94 @@
+"""
+Vectorised Monte Carlo version of `create_score` / `find_winner`.
+
+All N matches x M replicates are played at once: every game of every match
+is one uniform draw against a dense tensor of game-win probabilities
+(match x server x tiebreak) built from the exact hold and tiebreak
+probabilities in `score_engine`. Playing games instead of points keeps the
+same distribution as the point-by-point MarkovModel while removing the
+inner Python loops entirely.
+"""
+import numpy as np
+from score_engine import serve_point_probability, hold_probability, tiebreak_probability
+
+MAX_GAMES_PER_SET = 13
+
+
+def game_win_tensor(props):
+    """
+    Probability that player 1 wins the next game, shape (len(props), 2, 2),
+    indexed by [match, p1 serving, tiebreak].
+    """
+    props = np.asarray(props, dtype=np.float64)
+    uniq, inverse = np.unique(props, return_inverse=True)
+
+    sp1 = np.clip(0.66 * (0.5 + uniq), 0.0, 1.0)
+    sp2 = np.clip(0.66 * (0.5 + (1 - uniq)), 0.0, 1.0)
+    h1 = hold_probability(sp1)
+    h2 = hold_probability(sp2)
+    tb_p1_first = np.array([tiebreak_probability(serve_point_probability(p), serve_point_probability(1 - p)) for p in uniq])
+    tb_p2_first = np.array([1 - tiebreak_probability(serve_point_probability(1 - p), serve_point_probability(p)) for p in uniq])
+
+    tensor = np.empty((len(uniq), 2, 2))
+    tensor[:, 1, 0] = h1            # p1 serving, regular game
+    tensor[:, 0, 0] = 1 - h2        # p2 serving, regular game
+    tensor[:, 1, 1] = tb_p1_first   # p1 serves first point of the tiebreak
+    tensor[:, 0, 1] = tb_p2_first   # p2 serves first point of the tiebreak
+    return tensor[inverse]
+
+
+def simulate_matches(props, best_of=3, replicates=1, seed=None):
+    """
+    Simulate `replicates` matches for every prop.
+
+    props: array of length N with player 1's win probability.
+    best_of: scalar or array of length N with 3 or 5.
+
+    Returns (games, p1_won):
+        games  int8 array (N, replicates, max(best_of), 2) of p1/p2 games per set, -1 for sets not played
+        p1_won bool array (N, replicates), True when player 1 wins (find_winner == 'p1')
+    """
+    rng = np.random.default_rng(seed)
+    props = np.atleast_1d(np.asarray(props, dtype=np.float64))
+    n = len(props)
+    best_of = np.broadcast_to(np.asarray(best_of, dtype=np.int64), (n,))
+    max_sets = int(best_of.max())
+
+    total = n * replicates
+    tensor = np.repeat(game_win_tensor(props), replicates, axis=0)
+    need = np.repeat(best_of // 2 + 1, replicates)
+    rows = np.arange(total)
+
+    games = np.full((total, max_sets, 2), -1, dtype=np.int8)
+    sets1 = np.zeros(total, dtype=np.int64)
+    sets2 = np.zeros(total, dtype=np.int64)
+
+    for s in range(max_sets):
+        playing = (sets1 < need) & (sets2 < need)
+        if not playing.any():
+            break
+        p1_first = rng.random(total) < 0.5
+        g1 = np.zeros(total, dtype=np.int64)
+        g2 = np.zeros(total, dtype=np.int64)
+        for g in range(MAX_GAMES_PER_SET):
+            set_over = ((np.maximum(g1, g2) >= 6) & (np.abs(g1 - g2) >= 2)) | (g1 == 7) | (g2 == 7)
+            in_play = playing & ~set_over
+            p1_serving = (g % 2 == 0) == p1_first
+            tiebreak = (g1 == 6) & (g2 == 6)
+            p1_game = rng.random(total) < tensor[rows, p1_serving.astype(np.int64), tiebreak.astype(np.int64)]
+            g1 += in_play & p1_game
+            g2 += in_play & ~p1_game
+
+        games[playing, s, 0] = g1[playing]
+        games[playing, s, 1] = g2[playing]
+        sets1 += playing & (g1 > g2)
+        sets2 += playing & (g2 > g1)
+
+    return games.reshape(n, replicates, max_sets, 2), (sets1 > sets2).reshape(n, replicates)
+
+
+def format_scores(games):
+    """Turn a games array from simulate_matches into create_score style strings."""
+    flat = games.reshape(-1, games.shape[-2], 2)
+    scores = [' '.join(f'{g1}-{g2}' for g1, g2 in match if g1 >= 0) for match in flat.tolist()]
+    return np.array(scores, dtype=object).reshape(games.shape[:-2])
@@ -0,0 +1,304 @@
+"""
+Benchmarks for the prediction helpers.
+
+Usage:
+    python benchmarks.py                 # run everything
+    python benchmarks.py batch_simulator # run one benchmark by name
+
+Data pipeline and scraper benchmarks are in data/utr_common/benchmarks.py.
+"""
+import sys
+import os
+import random
+import numpy as np
+
+# Shared data helpers live in data/utr_common
+data_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+if data_root not in sys.path:
+    sys.path.insert(0, data_root)
+
+from utr_common.benchmarks import timed, synthetic_matches, synthetic_utr_history, assert_same_profiles
+
+
+### Batch Score Simulator ###
+def bench_batch_simulator(n_matches=200, replicates=50):
+    from predict_utils import create_score, find_winner
+    from batch_simulator import simulate_matches
+    from score_engine import match_win_probability
+
+    props = np.random.default_rng(0).uniform(0.35, 0.65, n_matches)
+    best_of = np.where(np.arange(n_matches) % 4 == 0, 5, 3)
+
+    # Reference path: one create_score call per match per replicate
+    loop_sample = 20
+    _, loop_seconds = timed(lambda: [find_winner(create_score(p, b)) for p, b in zip(props[:loop_sample], best_of[:loop_sample]) for _ in range(replicates)])
+    loop_rate = loop_sample * replicates / loop_seconds
+
+    (games, p1_won), batch_seconds = timed(simulate_matches, props, best_of, replicates, seed=0)
+    batch_rate = n_matches * replicates / batch_seconds
+
+    print(f"create_score loop : {loop_rate:12,.0f} matches/s")
+    print(f"simulate_matches  : {batch_rate:12,.0f} matches/s ({batch_rate / loop_rate:.0f}x)")
+
+    # Distribution check against create_score and the exact engine
+    prop, bo, reps = 0.55, 3, 4000
+    loop_p1 = np.mean([find_winner(create_score(prop, bo)) == 'p1' for _ in range(reps)])
+    _, batch_won = simulate_matches([prop], bo, reps, seed=1)
+    print(f"P(p1 wins) prop={prop}: create_score {loop_p1:.3f}, simulate_matches {batch_won.mean():.3f}, exact {match_win_probability(prop, bo):.3f}")
+###
+
+
+### Cached Transition Matrices ###
+def bench_pt_matrix_cache(n_games=20000):
+    from predict_utils import game, cached_pt_matrix
+
+    def cold():
+        for _ in range(n_games):
+            cached_pt_matrix.cache_clear()
+            game(0.55)
+
+    _, cold_seconds = timed(cold)
+    _, warm_seconds = timed(lambda: [game(0.55) for _ in range(n_games)])
+    print(f"game() rebuilding matrix : {n_games / cold_seconds:10,.0f} games/s")
+    print(f"game() cached matrix     : {n_games / warm_seconds:10,.0f} games/s ({cold_seconds / warm_seconds:.1f}x)")
+    print(cached_pt_matrix.cache_info())
+###
+
+
+### Batch Inference ###
+def synthetic_profiles(n_players=300, seed=0):
+    """Profiles dict shaped like get_set_player_profiles output."""
+    rng = np.random.default_rng(seed)
+    names = [f"Player {i}" for i in range(n_players)]
+    profiles = {}
+    for name in names:
+        profiles[name] = {
+            "utr": float(rng.uniform(12, 16.5)),
+            "win_vs_lower": float(rng.random()), "win_vs_higher": float(rng.random()),
+            "recent10": float(rng.random()), "wvl_utr": float(rng.uniform(0, 15)), "wvh_utr": float(rng.uniform(0, 15)),
+            "h2h": {},
+        }
+    for _ in range(n_players * 5):
+        a, b = rng.choice(n_players, 2, replace=False)
+        total = int(rng.integers(1, 6))
+        wins = int(rng.integers(0, total + 1))
+        profiles[names[a]]["h2h"][names[b]] = [wins, total]
+        profiles[names[b]]["h2h"][names[a]] = [total - wins, total]
+    return profiles
+
+
+def bench_batch_predict(n_players=100):
+    import torch
+    from predict_utils import TennisPredictor, ProfileStore, get_prop, predict_pairs, N_FEATURES
+
+    torch.manual_seed(0)
+    model = TennisPredictor(N_FEATURES)
+    model.eval()
+    profiles = ProfileStore.from_profiles(synthetic_profiles())
+    names = list(profiles.names[:n_players])
+    pairs = [(p1, p2) for p1 in names for p2 in names if p1 != p2]
+
+    with torch.no_grad():
+        loop_probs, loop_seconds = timed(lambda: np.array([float(get_prop(model, p1, p2, profiles)) for p1, p2 in pairs]))
+    batch_df, batch_seconds = timed(predict_pairs, model, pairs, profiles)
+
+    print(f"get_prop per pair : {len(pairs) / loop_seconds:12,.0f} pairs/s")
+    print(f"predict_pairs     : {len(pairs) / batch_seconds:12,.0f} pairs/s ({loop_seconds / batch_seconds:.0f}x)")
+    print(f"max |difference|  : {np.abs(batch_df['prob'].to_numpy() - loop_probs).max():.2e}")
+###
+
+
+### Columnar Profile Store ###
+def dict_feature_vector(p1, p2, profiles):
+    """preprocess_player_data as it would work on the dict-of-dicts profiles."""
+    def h2h_ratio(player, opponent):
+        h2h_stats = profiles[player]["h2h"].get(opponent, [0, 1])
+        return h2h_stats[0] / (h2h_stats[1] if h2h_stats[1] != 0 else 1)
+
+    return [profiles[p1]['utr']-profiles[p2]['utr'],
+            profiles[p1]['win_vs_lower']-profiles[p2]['win_vs_lower'],
+            profiles[p1]['win_vs_higher']-profiles[p2]['win_vs_higher'],
+            profiles[p1]['recent10']-profiles[p2]['recent10'],
+            profiles[p1]['wvl_utr']-profiles[p2]['wvl_utr'],
+            profiles[p1]['wvh_utr']-profiles[p2]['wvh_utr'],
+            h2h_ratio(p1, p2)-h2h_ratio(p2, p1)]
+
+
+def bench_profile_store(n_players=30000, n_lookups=100000):
+    import tracemalloc
+    from predict_utils import ProfileStore, preprocess_player_data
+
+    tracemalloc.start()
+    profiles = synthetic_profiles(n_players)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = ProfileStore.from_profiles(profiles)
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"dict profiles memory : {dict_bytes / 1e6:8.1f} MB")
+    print(f"ProfileStore memory  : {store_bytes / 1e6:8.1f} MB (arrays {store.nbytes() / 1e6:.1f} MB)")
+
+    rng = np.random.default_rng(1)
+    names = list(profiles)
+    pairs = [(names[a], names[b]) for a, b in rng.integers(0, n_players, (n_lookups, 2))]
+    dict_rows, dict_seconds = timed(lambda: [dict_feature_vector(p1, p2, profiles) for p1, p2 in pairs])
+    store_rows, store_seconds = timed(lambda: [preprocess_player_data(p1, p2, store) for p1, p2 in pairs])
+    assert np.allclose(np.array(dict_rows, dtype=np.float64), np.array(store_rows, dtype=np.float64))
+    print(f"dict lookups         : {n_lookups / dict_seconds:12,.0f} vectors/s")
+    print(f"ProfileStore lookups : {n_lookups / store_seconds:12,.0f} vectors/s")
+
+    from predict_utils import build_feature_matrix
+    batch_rows, batch_seconds = timed(build_feature_matrix, pairs, store)
+    assert np.allclose(batch_rows, np.array(dict_rows, dtype=np.float32))
+    print(f"ProfileStore batch   : {n_lookups / batch_seconds:12,.0f} vectors/s")
+###
+
+
+### Vectorised Profile Build ###
+def bench_build_profiles(n_matches=1_000_000, n_check=50_000):
+    from predict_utils import ProfileStore, get_set_player_profiles, build_profile_store
+
+    matches = synthetic_matches(n_matches)
+    history = {name: 14.0 for name in matches["p1"].unique()[::3]}
+
+    # Loop timed on a slice (it takes minutes on the full frame); equivalence is checked in tests/test_profiles.py
+    check = matches.iloc[:n_check]
+    _, loop_seconds = timed(lambda: ProfileStore.from_profiles(get_set_player_profiles(check, history)))
+    _, vector_seconds = timed(build_profile_store, check, history)
+    print(f"{n_check:,} matches: loop {loop_seconds:.2f}s, vectorised {vector_seconds:.2f}s ({loop_seconds / vector_seconds:.0f}x)")
+
+    store, seconds = timed(build_profile_store, matches, history)
+    print(f"{n_matches:,} matches: vectorised {seconds:.2f}s for {len(store):,} players")
+###
+
+
+### Incremental Profile Updates ###
+def bench_profile_updates(n_matches=1_000_000, n_new=1000):
+    import io
+    from predict_utils import build_profile_store
+    from utr_common.profiles import ProfileAccumulator
+
+    matches = synthetic_matches(n_matches + n_new)
+    history = {name: 14.0 for name in matches["p1"].unique()[::3]}
+    old, new = matches.iloc[:n_matches], matches.iloc[:n_matches + n_new]
+
+    # State as the matches pipeline leaves it after the previous run
+    buffer = io.BytesIO()
+    ProfileAccumulator().absorb(old).save(buffer)
+    print(f"saved state: {buffer.tell() / 1e6:.1f} MB")
+
+    def incremental():
+        buffer.seek(0)
+        state = ProfileAccumulator.load(buffer)
+        state.sync(new)
+        return state.to_store(history)
+
+    full_store, full_seconds = timed(build_profile_store, new, history)
+    inc_store, inc_seconds = timed(incremental)
+    assert_same_profiles(full_store, inc_store)
+    print(f"full rebuild of {len(new):,} matches: {full_seconds:.2f}s")
+    print(f"load state + sync {n_new:,} new rows: {inc_seconds:.2f}s ({full_seconds / inc_seconds:.0f}x), profiles identical")
+###
+
+
+### Player History ###
+def loop_latest_utr(df):
+    """predict_utils.get_player_history before vectorising."""
+    out = {}
+    for row in df.itertuples():
+        out.setdefault(f"{row.first_name} {row.last_name}", []).append((row.utr, row.date))
+    result = {}
+    for player, utr_list in out.items():
+        utr_list.sort(key=lambda tup: tup[1])
+        result[player] = utr_list[-1][0]
+    return result
+
+
+def loop_history_lists(utr_history):
+    """matches.get_player_history before vectorising (get_player_history_general has the same loop)."""
+    history = {}
+    for i in range(len(utr_history)):
+        key = utr_history['first_name'][i]+' '+utr_history['last_name'][i]
+        if key not in history.keys():
+            history[key] = [[utr_history['utr'][i], utr_history['date'][i]]]
+        else:
+            history[key].append([utr_history['utr'][i], utr_history['date'][i]])
+    return history
+
+
+def bench_player_history(n_rows=3_000_000, n_check=200_000):
+    from predict_utils import get_player_history, get_player_history_general
+    from utr_common.history import UtrHistory
+
+    utr_history = synthetic_utr_history(n_rows)
+    check = utr_history.iloc[:n_check].reset_index(drop=True)
+
+    # Equivalence on a slice (the index-per-cell loop is far too slow for the full frame)
+    loop_latest, latest_loop_seconds = timed(loop_latest_utr, check)
+    loop_lists, lists_loop_seconds = timed(loop_history_lists, check)
+    assert list(loop_latest.items()) == list(get_player_history(check).items())
+    assert loop_lists == UtrHistory.from_frame(check).to_lists()
+    general = get_player_history_general(check)
+    assert all(np.array_equal(general[k]["utr"], [row[0] for row in v]) and list(general[k]["date"]) == [row[1] for row in v]
+               for k, v in loop_lists.items())
+    print(f"{n_check:,} rows: latest loop {latest_loop_seconds:.2f}s, per-row history loop {lists_loop_seconds:.2f}s, results identical")
+
+    latest, latest_seconds = timed(get_player_history, utr_history)
+    grouped, grouped_seconds = timed(UtrHistory.from_frame, utr_history)
+    _, general_seconds = timed(grouped.to_general)
+    _, lists_seconds = timed(grouped.to_lists)
+    print(f"{n_rows:,} rows, {len(latest):,} players:")
+    print(f"  latest UTR (sort + last) : {latest_seconds:.2f}s")
+    print(f"  grouped arrays           : {grouped_seconds:.2f}s (+{general_seconds:.2f}s per-player views, +{lists_seconds:.2f}s as lists)")
+    print(f"  loops extrapolated       : latest {latest_loop_seconds * n_rows / n_check:.1f}s, history {lists_loop_seconds * n_rows / n_check:.1f}s")
+###
+
+
+### Training Features ###
+MATCHES_CSV = "../data/automated-matches-scraper/atp_utr_tennis_matches.csv"
+
+
+def bench_feature_builder(repeat=10):
+    import pandas as pd
+    from predict_utils import build_profile_store, preprocess_match_data
+    from utr_common.features import match_feature_matrix
+    from utr_common.tables import to_typed
+
+    # The full matches file, typed the way model.py reads it
+    matches = to_typed(pd.read_csv(MATCHES_CSV), "atp_utr_tennis_matches")
+    store = build_profile_store(matches, {})
+    profiles = store.to_profiles()
+
+    # model.py before: one .iloc row and one preprocess_match_data call per match (the loop ran twice)
+    loop_X, loop_seconds = timed(lambda: np.array([preprocess_match_data(matches.iloc[i], profiles) for i in range(len(matches))]))
+    vector_X, vector_seconds = timed(lambda: [match_feature_matrix(matches, store) for _ in range(repeat)][-1])
+    vector_seconds /= repeat
+
+    assert vector_X.dtype == np.float32 and vector_X.shape == loop_X.shape
+    assert np.allclose(vector_X, loop_X.astype(np.float32), rtol=1e-6, atol=1e-6)
+    print(f"{len(matches):,} matches, {len(store):,} players, {vector_X.shape[1]} features")
+    print(f"iloc loop            : {loop_seconds:8.3f}s (x2 in model.py: {2 * loop_seconds:.3f}s)")
+    print(f"match_feature_matrix : {vector_seconds:8.4f}s ({loop_seconds / vector_seconds:,.0f}x, {2 * loop_seconds / vector_seconds:,.0f}x against the doubled loop), features identical")
+###
+
+
+BENCHMARKS = {
+    'batch_simulator': bench_batch_simulator,
+    'pt_matrix_cache': bench_pt_matrix_cache,
+    'batch_predict': bench_batch_predict,
+    'profile_store': bench_profile_store,
+    'build_profiles': bench_build_profiles,
+    'profile_updates': bench_profile_updates,
+    'player_history': bench_player_history,
+    'feature_builder': bench_feature_builder,
+}
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        print(f"=== {name}")
+        BENCHMARKS[name]()
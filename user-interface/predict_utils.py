@@ -1,3 +1,5 @@
+import sys
+import os
 import numpy as np
 import random
 import pandas as pd
@@ -9,18 +11,30 @@ import torch.nn as nn
 from st_files_connection import FilesConnection
 import streamlit as st
 import joblib
-from google.cloud import storage
 import io
-from google.oauth2 import service_account
+from functools import lru_cache
 import matplotlib.pyplot as plt
+from score_engine import most_likely_score
+
+# Shared data helpers live in data/utr_common
+data_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+if data_root not in sys.path:
+    sys.path.insert(0, data_root)
+
+from utr_common.dataset import PartitionedDataset
+from utr_common.features import N_FEATURES, feature_matrix
+from utr_common.profiles import ProfileStore, build_profile_store, download_profile_state, sync_with_dataset, PROFILE_STATE_FILE, PROFILE_MATCH_COLUMNS
+from utr_common.history import UtrHistory, latest_utr
+from utr_common.storage import open_bucket, read_csv
+from utr_common.tables import read_table
 
 # GCS Buckets and files
 MODEL_BUCKET = "utr-model-training-bucket"
 MODEL_BLOB = "model.sav"
 UTR_BUCKET = "utr_scraper_bucket"
-UTR_FILE = "utr_history.csv"
+UTR_TABLE = "utr_history"
 MATCHES_BUCKET = "matches-scraper-bucket"
-MATCHES_FILE = "atp_utr_tennis_matches.csv"
+MATCHES_TABLE = "atp_utr_tennis_matches"
 
 # Tennis Predictor Model
 class TennisPredictor(nn.Module):
@@ -49,46 +63,73 @@ class TennisPredictor(nn.Module):
         return x
 
 
+# Point states of a service game (row/column order of the transition matrix)
+GAME_STATES = ['0-0', '0-15', '15-0', '15-15', '0-30', '30-0', '15-30', '30-15', '0-40', '40-0',
+               '15-40', '40-15', '30-30(DEUCE)', '30-40(40-A)', '40-30(A-40)', '40-40(NO AD)', 'HOLD', 'BREAK']
+STATE_INDEX = {state: i for i, state in enumerate(GAME_STATES)}
+
+# Props are rounded to this many decimals before looking up a cached matrix
+PROP_DECIMALS = 6
+PT_MATRIX_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=PT_MATRIX_CACHE_SIZE)
+def cached_pt_matrix(prop):
+    """Dense transition matrix for a (quantized) serve prop and its cumulative rows."""
+    if round(0.66*(0.5+prop),10)+round(1-(0.66*(0.5+prop)),10) == 1:
+        pprop = round(0.66*(0.5+prop),10)
+        inv_prop = round(1-(0.66*(0.5+prop)),10)
+    else:
+        pprop = round(0.66*(0.5+prop),10) + 0.0000000001
+        inv_prop = round(1-(0.66*(0.5+prop)),10)
+    deuce = round((pprop**2) / (1 - 2*pprop*inv_prop),10)
+    inv_deuce = round(1-((pprop**2) / (1 - (2*pprop*inv_prop))),10)
+
+    # (from state, server wins point -> state, server loses point -> state)
+    transitions = [
+        ('0-0', '15-0', '0-15'),
+        ('0-15', '15-15', '0-30'),
+        ('15-0', '30-0', '15-15'),
+        ('15-15', '30-15', '15-30'),
+        ('0-30', '15-30', '0-40'),
+        ('30-0', '40-0', '30-15'),
+        ('15-30', '30-30(DEUCE)', '15-40'),
+        ('30-15', '40-15', '30-30(DEUCE)'),
+        ('0-40', '15-40', 'BREAK'),
+        ('40-0', 'HOLD', '40-15'),
+        ('15-40', '30-40(40-A)', 'BREAK'),
+        ('40-15', 'HOLD', '40-30(A-40)'),
+        ('30-40(40-A)', '30-30(DEUCE)', 'BREAK'),
+        ('40-30(A-40)', 'HOLD', '30-30(DEUCE)'),
+        ('40-40(NO AD)', 'HOLD', 'BREAK'),
+    ]
+    pt_matrix = np.zeros((len(GAME_STATES), len(GAME_STATES)))
+    for state, won, lost in transitions:
+        pt_matrix[STATE_INDEX[state], STATE_INDEX[won]] = pprop
+        pt_matrix[STATE_INDEX[state], STATE_INDEX[lost]] = inv_prop
+    pt_matrix[STATE_INDEX['30-30(DEUCE)'], STATE_INDEX['HOLD']] = deuce
+    pt_matrix[STATE_INDEX['30-30(DEUCE)'], STATE_INDEX['BREAK']] = inv_deuce
+    pt_matrix[STATE_INDEX['HOLD'], STATE_INDEX['HOLD']] = 1.0
+    pt_matrix[STATE_INDEX['BREAK'], STATE_INDEX['BREAK']] = 1.0
+
+    # Normalised so the last entry of every row is exactly 1 for searchsorted
+    cum_matrix = np.cumsum(pt_matrix, axis=1)
+    cum_matrix /= cum_matrix[:, -1:]
+
+    pt_matrix.setflags(write=False)
+    cum_matrix.setflags(write=False)
+    return pt_matrix, cum_matrix
+
+
 class MarkovModel:
     def __init__(self, prop):
         self.curr_state = '0-0'
         self.prop = prop
-        if round(0.66*(0.5+prop),10)+round(1-(0.66*(0.5+prop)),10) == 1:
-            self.pprop = round(0.66*(0.5+prop),10)
-            self.inv_prop = round(1-(0.66*(0.5+prop)),10)
-        else:
-            self.pprop = round(0.66*(0.5+prop),10) + 0.0000000001
-            self.inv_prop = round(1-(0.66*(0.5+prop)),10)
-        self.deuce = round((self.pprop**2) / (1 - 2*self.pprop*self.inv_prop),10)
-        self.inv_deuce = round(1-((self.pprop**2) / (1 - (2*self.pprop*self.inv_prop))),10)
-
-        self.pt_matrix = {
-            '0-0': {'0-0': 0, '0-15': self.inv_prop, '15-0': self.pprop, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': 0},
-            '0-15': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': self.pprop, '0-30': self.inv_prop, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': 0},
-            '15-0': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': self.inv_prop, '0-30': 0, '30-0': self.pprop, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': 0},
-            '15-15': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': self.inv_prop, '30-15': self.pprop, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': 0},
-            '0-30': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': self.pprop, '30-15': 0, '0-40': self.inv_prop, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': 0},
-            '30-0': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': self.inv_prop, '0-40': 0, '40-0': self.pprop, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': 0},
-            '15-30': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': self.inv_prop, '40-15': 0, '30-30(DEUCE)': self.pprop, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': 0},
-            '30-15': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': self.pprop, '30-30(DEUCE)': self.inv_prop, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': 0},
-            '0-40': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': self.pprop, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': self.inv_prop},
-            '40-0': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': self.inv_prop, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': self.pprop, 'BREAK': 0},
-            '15-40': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': self.pprop, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': self.inv_prop},
-            '40-15': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': self.inv_prop, '40-40(NO AD)': 0, 'HOLD': self.pprop, 'BREAK': 0},
-            '30-30(DEUCE)': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': self.deuce, 'BREAK': self.inv_deuce},
-            '30-40(40-A)': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': self.pprop, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': self.inv_prop},
-            '40-30(A-40)': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': self.inv_prop, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': self.pprop, 'BREAK': 0},
-            '40-40(NO AD)': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': self.pprop, 'BREAK': self.inv_prop},
-            'HOLD': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 1.0, 'BREAK': 0},
-            'BREAK': {'0-0': 0, '0-15': 0, '15-0': 0, '15-15': 0, '0-30': 0, '30-0': 0, '15-30': 0, '30-15': 0, '0-40': 0, '40-0': 0, '15-40': 0, '40-15': 0, '30-30(DEUCE)': 0, '30-40(40-A)': 0, '40-30(A-40)': 0, '40-40(NO AD)': 0, 'HOLD': 0, 'BREAK': 1.0},
-        }
-    
+        self.pt_matrix, self.cum_matrix = cached_pt_matrix(round(float(prop), PROP_DECIMALS))
+
     def next_state(self):
-        try:
-            self.curr_state = np.random.choice(list(self.pt_matrix.keys()), p=list(self.pt_matrix[self.curr_state].values()))
-        except:
-            print(list(self.pt_matrix[self.curr_state].values()))
-            quit()
+        row = self.cum_matrix[STATE_INDEX[self.curr_state]]
+        self.curr_state = GAME_STATES[int(np.searchsorted(row, np.random.random(), side='right'))]
         return self.curr_state
 
 
@@ -99,12 +140,33 @@ def game(prop):
     return model.curr_state
 
 
+def tiebreak(prop, p1_serves_first):
+    # First to 7 points (win by 2), serve changes after the first point and then every two points
+    p1_points = 0
+    p2_points = 0
+    p1_serve_prop = 0.66*(0.5+prop)
+    p2_serve_prop = 0.66*(0.5+(1-prop))
+    while True:
+        if (p1_points >= 7 or p2_points >= 7) and abs(p1_points-p2_points) >= 2:
+            break
+        p1_serving = (((p1_points+p2_points+1) // 2) % 2 == 0) == p1_serves_first
+        if p1_serving:
+            p1_won = random.random() < p1_serve_prop
+        else:
+            p1_won = random.random() >= p2_serve_prop
+        if p1_won:
+            p1_points += 1
+        else:
+            p2_points += 1
+    return 'p1' if p1_points > p2_points else 'p2'
+
+
 def create_score(prop, best_of):
     score = ''
-    first_serve = random.randint(0,1)
     sets_won = 0
     num_sets = 0
     for _ in range(best_of):
+        first_serve = random.randint(0,1)
         p1_games = 0
         p2_games = 0
         done = True
@@ -113,30 +175,26 @@ def create_score(prop, best_of):
                 break
             elif p1_games == 7 or p2_games == 7:
                 break
-            
-            if (p1_games+p2_games) % 2 == 0: # Good
+
+            # first_serve == 0 means p1 serves the even games of the set
+            p1_serving = ((p1_games+p2_games) % 2 == 0) == (first_serve == 0)
+
+            if p1_games == 6 and p2_games == 6:
+                if tiebreak(prop, p1_serving) == 'p1':
+                    p1_games += 1
+                else:
+                    p2_games += 1
+                continue
+
+            if p1_serving:
                 hb = game(prop)
             else:
                 hb = game(1-prop)
 
-            if first_serve == 0: # Good
-                if hb == 'HOLD' and (p1_games+p2_games) % 2 == 0:
-                    p1_games += 1
-                elif hb == 'HOLD' and (p1_games+p2_games) % 2 == 1:
-                    p2_games += 1
-                elif hb == 'BREAK' and (p1_games+p2_games) % 2 == 0:
-                    p2_games += 1
-                elif hb == 'BREAK' and (p1_games+p2_games) % 2 == 1:
-                    p1_games += 1
+            if (hb == 'HOLD') == p1_serving:
+                p1_games += 1
             else:
-                if hb == 'HOLD' and (p1_games+p2_games) % 2 == 0:
-                    p2_games += 1
-                elif hb == 'HOLD' and (p1_games+p2_games) % 2 == 1:
-                    p1_games += 1
-                elif hb == 'BREAK' and (p1_games+p2_games) % 2 == 0:
-                    p1_games += 1
-                elif hb == 'BREAK' and (p1_games+p2_games) % 2 == 1:
-                    p2_games += 1
+                p2_games += 1
 
         num_sets += 1 # Good
         if p1_games > p2_games:
@@ -154,28 +212,8 @@ def create_score(prop, best_of):
 
 
 def preprocess_player_data(p1, p2, profiles):
-    # Helper that returns win-ratio with a safe fallback (0 wins / 1 match)
-    def h2h_ratio(player, opponent):
-        h2h_stats = profiles[player]["h2h"].get(opponent, [0, 1])
-        wins = h2h_stats[0]
-        total = h2h_stats[1] if h2h_stats[1] != 0 else 1  # prevent division by zero
-        return wins / total
-        
-    match_vector = [profiles[p1]['utr']-profiles[p2]['utr'], 
-                    profiles[p1]['win_vs_lower'],
-                    profiles[p2]['win_vs_lower'],
-                    profiles[p1]['win_vs_higher'],
-                    profiles[p2]['win_vs_higher'],
-                    profiles[p1]['recent10'],
-                    profiles[p2]['recent10'],
-                    profiles[p1]['wvl_utr'],
-                    profiles[p2]['wvl_utr'],
-                    profiles[p1]['wvh_utr'],
-                    profiles[p2]['wvh_utr'],
-                    h2h_ratio(p1, p2),
-                    h2h_ratio(p2, p1)
-                    ]
-    return match_vector
+    # profiles is a ProfileStore; same features model.py trains on
+    return feature_matrix(profiles, [p1], [p2])[0].tolist()
 
 
 def get_prop(model, p1, p2, player_profiles):
@@ -188,6 +226,27 @@ def get_prop(model, p1, p2, player_profiles):
     return prop
 
 
+def build_feature_matrix(pairs, profiles):
+    """Feature matrix (one preprocess_player_data row per (p1, p2) pair) built in one pass."""
+    return feature_matrix(profiles, [p1 for p1, _ in pairs], [p2 for _, p2 in pairs])
+
+
+def predict_pairs(model, pairs, profiles, chunk_size=4096):
+    """
+    Win probabilities for many (p1, p2) pairs with one forward pass per chunk.
+    Returns a DataFrame with columns p1, p2 and prob (probability p1 wins).
+    """
+    pairs = list(pairs)
+    X = torch.from_numpy(build_feature_matrix(pairs, profiles))
+
+    probs = np.empty(len(pairs), dtype=np.float32)
+    with torch.no_grad():
+        for start in range(0, len(pairs), chunk_size):
+            probs[start:start + chunk_size] = model(X[start:start + chunk_size]).reshape(-1).numpy()
+
+    return pd.DataFrame({"p1": [p1 for p1, _ in pairs], "p2": [p2 for _, p2 in pairs], "prob": probs})
+
+
 def find_winner(score):
     p1_sets_won = 0
     p2_sets_won = 0
@@ -435,64 +494,36 @@ def get_set_player_profiles_general(data, history):
 
 def get_player_history(df):
     """Latest UTR for each player."""
-    out = {}
-    for row in df.itertuples():
-        key = f"{row.first_name} {row.last_name}"
-        out.setdefault(key, []).append((row.utr, row.date))
-
-    result = {}
-    for player, utr_list in out.items():
-        # Sort the list of (utr, date) tuples by the date (index 1)
-        utr_list.sort(key=lambda tup: tup[1])  # lambda here is safe and readable
-        result[player] = utr_list[-1][0]  # Most recent UTR
-
-    return result
+    return latest_utr(df)
 
 
 def get_player_history_general(utr_history):
-    history = {}
-
-    for i in range(len(utr_history)):
-        if utr_history['first_name'][i]+' '+utr_history['last_name'][i] not in history:
-            history[utr_history['first_name'][i]+' '+utr_history['last_name'][i]] = {
-                'utr': [utr_history['utr'][i]],
-                'date': [utr_history['date'][i]]
-            }
-        else:
-            history[utr_history['first_name'][i]+' '+utr_history['last_name'][i]]['utr'].append(utr_history['utr'][i])
-            history[utr_history['first_name'][i]+' '+utr_history['last_name'][i]]['date'].append(utr_history['date'][i])
-
-    return history
+    """Full UTR series per player: {player: {'utr': array, 'date': array}}."""
+    return UtrHistory.from_frame(utr_history).to_general()
 
 
 def download_model_from_gcs(credentials_dict, bucket_name, source_blob_name, destination_file_name):
     """Download a joblib model file from a GCS bucket to the local filesystem."""
-    credentials = service_account.Credentials.from_service_account_info(credentials_dict)
-    client = storage.Client(credentials=credentials, project=credentials_dict["project_id"])
-    
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(source_blob_name)
-    blob.download_to_filename(destination_file_name)
+    open_bucket(bucket_name, credentials_dict).download_file(source_blob_name, destination_file_name)
     # print(f"Downloaded {source_blob_name} to {destination_file_name}")
 
 
+def check_model_inputs(model):
+    """Raise ValueError if the model was trained on a different feature layout than utr_common.features builds."""
+    if model.fc1.in_features != N_FEATURES:
+        raise ValueError(f"model takes {model.fc1.in_features} features, the feature builder makes {N_FEATURES}; retrain it with model.py")
+
+
 def load_model(credentials_dict):
-    bucket_name = "utr-model-training-bucket"              
-    source_blob_name = "model.sav"            
-    local_path = "/model.sav"      
-               
-    credentials = service_account.Credentials.from_service_account_info(credentials_dict)
-    client = storage.Client(credentials=credentials, project=credentials_dict["project_id"])
-    
-    download_model_from_gcs(credentials_dict, bucket_name, source_blob_name, local_path)
-    model = joblib.load(local_path)
+    # Loaded straight from the downloaded bytes, no local copy
+    model = joblib.load(io.BytesIO(open_bucket(MODEL_BUCKET, credentials_dict).read_bytes(MODEL_BLOB)))
+    check_model_inputs(model)
     return model
 
 
 def make_prediction(credentials_dict, p1, p2, location, best_of=3):
-    conn = st.connection('gcs', type=FilesConnection)
-    data = conn.read("matches-scraper-bucket/atp_utr_tennis_matches.csv", input_format="csv", ttl=600)
-    utr_history = conn.read("utr_scraper_bucket/utr_history.csv", input_format="csv", ttl=600)
+    data = PartitionedDataset(open_bucket(MATCHES_BUCKET, credentials_dict), MATCHES_TABLE).read()
+    utr_history = read_table(open_bucket(UTR_BUCKET, credentials_dict), UTR_TABLE)
 
     # model = joblib.load('model.sav')
 
@@ -501,18 +532,14 @@ def make_prediction(credentials_dict, p1, p2, location, best_of=3):
     history = get_player_history(utr_history)
     player_profiles = get_player_profiles(data, history, p1, p2)
 
-    prop = get_prop(model, p1, p2, player_profiles)
-    score = create_score(prop, best_of)
-
-    pred_winner = find_winner(score)
+    prop = float(get_prop(model, p1, p2, player_profiles))
     if prop >= 0.5:
         true_winner = 'p1'
     else:
         true_winner = 'p2'
 
-    while true_winner != pred_winner:
-        score = create_score(prop, best_of)
-        pred_winner = find_winner(score)
+    # Exact most likely scoreline for the predicted winner (no rejection sampling)
+    score = most_likely_score(prop, best_of, winner=true_winner)
 
     prediction = ""
 
@@ -531,23 +558,9 @@ def make_prediction(credentials_dict, p1, p2, location, best_of=3):
     return prediction
 
 
-def download_csv_from_gcs(credentials_dict, bucket, file_path):
+def download_csv_from_gcs(credentials_dict, bucket_name, file_path):
     """Downloads a CSV from GCS and returns a pandas DataFrame."""
-    
-    try:
-        # use global credentials dict
-        # Initialize client (credentials are picked up from st.secrets)
-        credentials = service_account.Credentials.from_service_account_info(credentials_dict)
-        
-        # Initialize the GCS client with credentials and project
-        client = storage.Client(credentials=credentials, project=credentials_dict["project_id"])
-        
-        blob = bucket.blob(file_path)
-        data = blob.download_as_string()
-        df = pd.read_csv(io.BytesIO(data))
-        return df
-    except Exception as e:
-        raise
+    return read_csv(open_bucket(bucket_name, credentials_dict), file_path)
 
 
 
@@ -566,29 +579,21 @@ def preprocess_match_data(matches, profiles): # log_predict?
 
 def display_player_metrics(player1, player2, history, profiles):
     if player1 != "" and player2 != "":
-        profile = profiles[player1]
-        # st.markdown(profile)
-
-        # Assuming you want to take the average of the list if it's a list
-        utr_value = profile.get("utr", 0)
-
-        # Check if utr_value is a list and calculate the average if it is
-        if isinstance(utr_value, list):
-            utr_value = sum(utr_value) / len(utr_value) if utr_value else 0  # Avoid division by zero
+        i = profiles.index[player1]
+        j = profiles.index.get(player2)
+        f = profiles.features
 
         st.markdown(f"### {player1}")
         
         # Limit utr value to 2 decimal places
-        utr_value = round(utr_value, 2)
+        utr_value = round(float(f["utr"][i]), 2)
         
         st.metric("Current UTR", utr_value)
-        st.metric("Win Rate Vs. Lower UTRs", f"{round(profile.get('win_vs_lower', 0) * 100, 2)}%")
-        st.metric("Win Rate Vs. Higher UTRs", f"{round(profile.get('win_vs_higher', 0) * 100, 2)}%")
-        st.metric("Win Rate Last 10 Matches", f"{round(profile.get('recent10', 0) * 100, 2)}%")
-        try:
-            st.metric("Head-To-Head (W-L)", f"{profile.get('h2h')[player2][0]} - {profile.get('h2h')[player2][1]-profile.get('h2h')[player2][0]}")
-        except:
-            st.metric("Head-To-Head (W-L)", "0 - 0")
+        st.metric("Win Rate Vs. Lower UTRs", f"{round(f['win_vs_lower'][i] * 100, 2)}%")
+        st.metric("Win Rate Vs. Higher UTRs", f"{round(f['win_vs_higher'][i] * 100, 2)}%")
+        st.metric("Win Rate Last 10 Matches", f"{round(f['recent10'][i] * 100, 2)}%")
+        wins, total = profiles.h2h(i, j) if j is not None else (0, 0)
+        st.metric("Head-To-Head (W-L)", f"{wins} - {total-wins}")
 
 def display_graph(player1, player2, history):
     # Plot both UTR histories
@@ -599,7 +604,7 @@ def display_graph(player1, player2, history):
         utrs2 = history[player2].get("utr", [])
         dates2 = history[player2].get("date", [])
 
-        if utrs1 and dates1 and utrs2 and dates2:
+        if len(utrs1) and len(dates1) and len(utrs2) and len(dates2):
             df1 = pd.DataFrame({"Date": pd.to_datetime(dates1), "UTR": utrs1, "Player": player1})
             df2 = pd.DataFrame({"Date": pd.to_datetime(dates2), "UTR": utrs2, "Player": player2})
             df_plot = pd.concat([df1, df2]).sort_values("Date")
@@ -0,0 +1,144 @@
+"""
+Exact (closed-form / dynamic programming) version of the serve-return Markov
+model that `create_score` simulates point by point.
+
+Every function here takes `prop`, the model's probability that player 1 wins,
+and maps it to serve-point probabilities exactly like `MarkovModel` does, so
+the numbers line up with the Monte Carlo path in `predict_utils`.
+"""
+from math import comb
+
+# Final game scores of a set that player 1 wins (player 2's are the mirror)
+SET_SCORES = [(6, 0), (6, 1), (6, 2), (6, 3), (6, 4), (7, 5), (7, 6)]
+
+
+def serve_point_probability(prop):
+    """Probability the server wins a point, same mapping as MarkovModel."""
+    return min(max(0.66 * (0.5 + prop), 0.0), 1.0)
+
+
+def hold_probability(p):
+    """Probability the server holds a standard (advantage) game with point probability p."""
+    q = 1 - p
+    deuce = p**2 / (1 - 2*p*q)
+    return p**4 * (1 + 4*q + 10*q**2) + 20 * p**3 * q**3 * deuce
+
+
+def tiebreak_probability(pa, pb):
+    """
+    Probability that player A wins a first-to-7 (win by 2) tiebreak.
+    A serves the first point, then serve alternates every two points.
+    pa and pb are A's and B's serve-point probabilities.
+    """
+    reach = {(0, 0): 1.0}
+    a_wins = 0.0
+    for n in range(12):
+        a_serving = ((n + 1) // 2) % 2 == 0
+        a_point = pa if a_serving else 1 - pb
+        nxt = {}
+        for (a, b), pr in reach.items():
+            if a + 1 == 7:
+                a_wins += pr * a_point
+            else:
+                nxt[(a + 1, b)] = nxt.get((a + 1, b), 0.0) + pr * a_point
+            if b + 1 < 7:
+                nxt[(a, b + 1)] = nxt.get((a, b + 1), 0.0) + pr * (1 - a_point)
+        reach = nxt
+
+    # From 6-6 each pair of points has one serve each, so it is a geometric race
+    a_pair = pa * (1 - pb)
+    b_pair = (1 - pa) * pb
+    from_six_all = 0.5 if a_pair + b_pair == 0 else a_pair / (a_pair + b_pair)
+    return a_wins + reach.get((6, 6), 0.0) * from_six_all
+
+
+def set_score_distribution(prop, first_server=None):
+    """
+    Distribution of final set scores as {(p1_games, p2_games): probability}.
+
+    first_server is 'p1' or 'p2'; None averages over both (create_score
+    draws the first server of every set at random).
+    """
+    if first_server is None:
+        d1 = set_score_distribution(prop, 'p1')
+        d2 = set_score_distribution(prop, 'p2')
+        return {score: 0.5 * (d1[score] + d2[score]) for score in d1}
+
+    sp1 = serve_point_probability(prop)
+    sp2 = serve_point_probability(1 - prop)
+    h1 = hold_probability(sp1)
+    h2 = hold_probability(sp2)
+    if first_server == 'p1':
+        tb1 = tiebreak_probability(sp1, sp2)
+    else:
+        tb1 = 1 - tiebreak_probability(sp2, sp1)
+
+    dist = {score: 0.0 for score in SET_SCORES}
+    dist.update({(g2, g1): 0.0 for g1, g2 in SET_SCORES})
+
+    reach = {(0, 0): 1.0}
+    for n in range(12):
+        p1_serving = (n % 2 == 0) == (first_server == 'p1')
+        p1_game = h1 if p1_serving else 1 - h2
+        nxt = {}
+        for (g1, g2), pr in reach.items():
+            for (n1, n2), step in (((g1 + 1, g2), p1_game), ((g1, g2 + 1), 1 - p1_game)):
+                if (n1, n2) in dist:
+                    dist[(n1, n2)] += pr * step
+                else:
+                    nxt[(n1, n2)] = nxt.get((n1, n2), 0.0) + pr * step
+        reach = nxt
+
+    six_all = reach.get((6, 6), 0.0)
+    dist[(7, 6)] += six_all * tb1
+    dist[(6, 7)] += six_all * (1 - tb1)
+    return dist
+
+
+def set_win_probability(prop, first_server=None):
+    """Probability player 1 wins a set."""
+    return sum(pr for (g1, g2), pr in set_score_distribution(prop, first_server).items() if g1 > g2)
+
+
+def match_outcome_distribution(prop, best_of=3):
+    """Distribution of final set counts as {(p1_sets, p2_sets): probability}."""
+    need = best_of // 2 + 1
+    s = set_win_probability(prop)
+    dist = {}
+    for lost in range(need):
+        ways = comb(need - 1 + lost, lost)
+        dist[(need, lost)] = ways * s**need * (1 - s)**lost
+        dist[(lost, need)] = ways * (1 - s)**need * s**lost
+    return dist
+
+
+def match_win_probability(prop, best_of=3):
+    """Probability player 1 wins a best-of-3 or best-of-5 match."""
+    return sum(pr for (s1, s2), pr in match_outcome_distribution(prop, best_of).items() if s1 > s2)
+
+
+def most_likely_score(prop, best_of=3, winner=None):
+    """
+    Most likely full scoreline (e.g. '6-4 3-6 6-3') in create_score's format.
+
+    Sets are independent, so the best scoreline for a given set count is the
+    most likely set score for each player repeated. winner ('p1'/'p2')
+    restricts the search to matches that player wins.
+    """
+    need = best_of // 2 + 1
+    dist = set_score_distribution(prop)
+    best_p1 = max((score for score in dist if score[0] > score[1]), key=dist.get)
+    best_p2 = max((score for score in dist if score[1] > score[0]), key=dist.get)
+
+    candidates = []
+    for side in ('p1', 'p2'):
+        if winner is not None and side != winner:
+            continue
+        win_set, lose_set = (best_p1, best_p2) if side == 'p1' else (best_p2, best_p1)
+        for lost in range(need):
+            pr = dist[win_set]**need * dist[lose_set]**lost
+            sets = [win_set] * (need - 1) + [lose_set] * lost + [win_set]
+            candidates.append((pr, sets))
+
+    _, sets = max(candidates, key=lambda c: c[0])
+    return ' '.join(f'{g1}-{g2}' for g1, g2 in sets)
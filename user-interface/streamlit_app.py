@@ -2,8 +2,6 @@ import streamlit as st
 import pandas as pd
 from predict_utils import *
 import matplotlib.pyplot as plt
-from google.cloud import storage
-from google.oauth2 import service_account
 import torch
 import numpy as np
 from bs4 import BeautifulSoup
@@ -42,33 +40,30 @@ credentials_dict = {
 @st.cache_resource(show_spinner="🔄  Loading Data & Model from the Cloud...")
 def load_everything(credentials_dict):
 
-    # Initialize client (credentials are picked up from st.secrets)
-    credentials = service_account.Credentials.from_service_account_info(credentials_dict)
-    
-    # Initialize the GCS client with credentials and project
-    client = storage.Client(credentials=credentials, project=credentials_dict["project_id"])
+    # Bucket stores share one GCS client built from the credentials in st.secrets
+    model_store = open_bucket(MODEL_BUCKET, credentials_dict)
+    utr_store = open_bucket(UTR_BUCKET, credentials_dict)
+    matches_store = open_bucket(MATCHES_BUCKET, credentials_dict)
 
     # Download model from GCS
-    model_bucket = client.bucket(MODEL_BUCKET)
-    model_blob = model_bucket.blob(MODEL_BLOB)
-    model_bytes = model_blob.download_as_bytes()
+    model_bytes = model_store.read_bytes(MODEL_BLOB)
 
     # Load model from bytes
     model = joblib.load(io.BytesIO(model_bytes))
+    check_model_inputs(model)
     model.eval()
     
-    # Get buckets 
-    utr_bucket = client.bucket(UTR_BUCKET)
-    matches_bucket = client.bucket(MATCHES_BUCKET)
-
-    # Download data from GCS and return dataframes
-    utr_df     = download_csv_from_gcs(credentials_dict, utr_bucket, UTR_FILE)
-    matches_df = download_csv_from_gcs(credentials_dict, matches_bucket, MATCHES_FILE)
+    # Download data from GCS (Parquet, CSV if there is no Parquet copy yet) and return dataframes
+    utr_df     = read_table(utr_store, UTR_TABLE)
     
     # Get player history and profiles
     history    = get_player_history(utr_df)
     graph_hist = get_player_history_general(utr_df)
-    profiles   = get_set_player_profiles(matches_df, history, st=st)
+
+    # Profiles: start from the state the matches pipeline keeps, read only the match partitions it has not seen yet
+    profile_state = download_profile_state(matches_store, PROFILE_STATE_FILE)
+    sync_with_dataset(profile_state, PartitionedDataset(matches_store, MATCHES_TABLE))
+    profiles   = profile_state.to_store(history)
     
     return model, utr_df, history, profiles, graph_hist
 
@@ -78,7 +73,7 @@ def color_func(word, **kwargs):
 
 
 model, utr_df, history, profiles, graph_hist = load_everything(credentials_dict)
-player_names = sorted(set(profiles.keys()) & set(history.keys()))
+player_names = sorted(set(profiles.index) & set(history.keys()))
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -155,7 +150,9 @@ with tabs[0]:
                         winner = p1
                     else:
                         winner = p2
+                score = most_likely_score(float(prob), 3, winner='p1' if winner == p1 else 'p2')
                 st.metric(label="Winner", value=winner)
+                st.metric(label="Most Likely Score", value=score)
     else:
         st.write("Please select both players to view UTRs and make a prediction.")
 
@@ -231,10 +228,7 @@ with tabs[2]:
     st.write("This tab will highlight matches where players gained or lost a large amount of UTR since the previous week.")
 
     # Load the CSV from your bucket
-    credentials = service_account.Credentials.from_service_account_info(credentials_dict)
-    client = storage.Client(credentials=credentials, project=credentials_dict["project_id"])
-    utr_bucket = client.bucket(UTR_BUCKET)
-    df = download_csv_from_gcs(credentials_dict, utr_bucket, UTR_FILE)
+    df = read_table(open_bucket(UTR_BUCKET, credentials_dict), UTR_TABLE, columns=["first_name", "last_name", "utr"])
 
     content = {}
     prev_name = ''
@@ -0,0 +1,7 @@
+import sys
+import os
+
+# Test modules import the UI helpers (predict_utils adds ../data for utr_common)
+ui_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ui_root not in sys.path:
+    sys.path.insert(0, ui_root)
@@ -0,0 +1,54 @@
+"""The vectorised profile builder against the get_set_player_profiles loop."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from predict_utils import ProfileStore, build_profile_store, get_set_player_profiles
+
+
+def random_matches(n_matches, n_players, seed):
+    """Matches frame with the columns the profile builders read, including UTR ties."""
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Player {i}" for i in range(n_players)], dtype=object)
+    a = rng.integers(0, n_players, n_matches)
+    b = (a + rng.integers(1, n_players, n_matches)) % n_players
+    p1_utr = np.round(rng.uniform(11, 16.5, n_matches), 2)
+    p2_utr = np.round(rng.uniform(11, 16.5, n_matches), 2)
+    p2_utr[::7] = p1_utr[::7]
+    p1_won = rng.random(n_matches) < 0.5
+    return pd.DataFrame({
+        "p1": names[a], "p2": names[b],
+        "p1_utr": p1_utr, "p2_utr": p2_utr,
+        "winner": np.where(p1_won, names[a], names[b]),
+    })
+
+
+def assert_same_profiles(expected, actual):
+    assert list(expected.names) == list(actual.names)
+    for key in expected.features:
+        np.testing.assert_allclose(actual.features[key], expected.features[key], rtol=1e-12, atol=1e-12, err_msg=key)
+    for attr in ("h2h_indptr", "h2h_indices", "h2h_wins", "h2h_totals"):
+        np.testing.assert_array_equal(getattr(actual, attr), getattr(expected, attr), err_msg=attr)
+
+
+@pytest.mark.parametrize("n_matches, n_players, seed", [(1, 2, 0), (300, 5, 1), (2000, 60, 2)])
+def test_vectorised_profiles_match_loop(n_matches, n_players, seed):
+    matches = random_matches(n_matches, n_players, seed)
+    # Some players have a latest UTR in the history, the rest keep the UTR of their first match
+    history = {name: 14.0 for name in matches["p1"].unique()[::3]}
+
+    expected = ProfileStore.from_profiles(get_set_player_profiles(matches, history))
+    assert_same_profiles(expected, build_profile_store(matches, history))
+
+
+def test_recent_form_keeps_last_ten_results():
+    # Player 0 loses the first five matches and wins the last ten
+    matches = pd.DataFrame({
+        "p1": ["Player 0"] * 15, "p2": ["Player 1"] * 15,
+        "p1_utr": [14.0] * 15, "p2_utr": [13.0] * 15,
+        "winner": ["Player 1"] * 5 + ["Player 0"] * 10,
+    })
+    store = build_profile_store(matches, {})
+    assert store.features["recent10"][store.index["Player 0"]] == 1.0
+    assert store.features["recent10"][store.index["Player 1"]] == 0.0
+    assert store.h2h(store.index["Player 0"], store.index["Player 1"]) == (10, 15)